@@ -1,11 +1,19 @@
 import os
+import inspect
 import importlib
 
-from config import INPUT_DIR, OUTPUT_DIR
-from pattern_detector import detect_pattern
+from config import (
+    INPUT_DIR, OUTPUT_DIR, COMBINED_EXTRACTION, EXTRACTION_BACKEND, PATTERN_BACKENDS,
+    DELTA_EXTRACTION
+)
+from dxf_extractor import process_dxf
+from manifest import load_manifest, lookup, overrides as manifest_overrides
+from memory_profile import StageProfiler
+from scheduler import schedule
 
 
-def run_pattern(pattern_number, pdf_path):
+def run_pattern(pattern_number, pdf_path, pages=None, output_name=None, output_dir=None,
+                overrides=None):
 
     module_name = f"main_{pattern_number}"
     module = importlib.import_module(module_name)
@@ -13,7 +21,163 @@ def run_pattern(pattern_number, pdf_path):
     print(f"🔎 Detected Pattern: {pattern_number}")
     print(f"🚀 Running {module_name}.py")
 
-    module.process_pdf(pdf_path)
+    # Only patterns that slice accept num_slices
+    accepted = inspect.signature(module.process_pdf).parameters
+    options = {}
+
+    for key, value in (overrides or {}).items():
+        if key in accepted:
+            options[key] = value
+        else:
+            print(f"⚠ {module_name} has no '{key}' setting, ignoring override")
+
+    delta = None
+
+    # 🔁 Re-issued drawing → only bands that changed are extracted again
+    if DELTA_EXTRACTION:
+        from revisions import RevisionDelta
+        from vision_extractor import get_extractor, resolve_backend
+
+        output_name = output_name or os.path.splitext(os.path.basename(pdf_path))[0]
+        backend = resolve_backend(pattern_number, options.get("backend"))
+
+        delta = RevisionDelta(pdf_path, pattern_number, output_name, output_dir, backend)
+        options["extract"] = delta.wrap(
+            options.get("extract") or get_extractor(pattern_number, backend)
+        )
+
+    module.process_pdf(
+        pdf_path, pages=pages, output_name=output_name, output_dir=output_dir, **options
+    )
+
+    if delta:
+        delta.finish()
+
+
+def _report(progress, stage, **detail):
+    if progress:
+        progress(stage, **detail)
+
+
+def run_document(pdf_path, temp_folder, progress=None, output_dir=None, overrides=None):
+    """
+    Detects and extracts one PDF. Returns the output names written
+    (folders under `output_dir`, OUTPUT_DIR by default).
+    `progress(stage, **detail)` is called as each stage starts.
+    """
+
+    # Detection pulls in numpy, PIL and PyMuPDF; DXF-only runs skip them
+    from pattern_detector import (
+        detect_page_patterns, group_pages_by_pattern, classify_and_extract
+    )
+    from vision_extractor import prefetched_extractor
+
+    file_name = os.path.splitext(os.path.basename(pdf_path))[0]
+    overrides = overrides or {}
+
+    _report(progress, "detecting")
+
+    # One request classifies and extracts; needs the default render DPI
+    # so the pattern module's crop matches the one already sent, and the
+    # vision backend to make use of the answer
+    vision = overrides.get("backend", EXTRACTION_BACKEND) == "vision"
+
+    if COMBINED_EXTRACTION and "dpi" not in overrides and vision:
+        combined = classify_and_extract(pdf_path, temp_folder)
+
+        if combined:
+            pattern_number, responses = combined
+            options = dict(overrides)
+
+            if responses and PATTERN_BACKENDS.get(pattern_number, "vision") == "vision":
+                options["extract"] = prefetched_extractor(responses)
+
+            _report(progress, "extracting", pattern=pattern_number, group=1, groups=1)
+            run_pattern(pattern_number, pdf_path, output_dir=output_dir, overrides=options)
+
+            # Answers are popped when used; one left over was paid twice
+            if "extract" in options and responses:
+                print(f"⚠ Prefetched extraction went unused for {file_name}: "
+                      f"the pattern's crop differed, the table was requested again")
+
+            return [file_name]
+
+    page_patterns = detect_page_patterns(pdf_path, temp_folder)
+    groups = group_pages_by_pattern(page_patterns)
+
+    # Single-pattern document → unchanged output layout
+    if len(groups) == 1:
+        pattern_number = next(iter(groups))
+        _report(progress, "extracting", pattern=pattern_number, group=1, groups=1)
+        run_pattern(pattern_number, pdf_path, output_dir=output_dir, overrides=overrides)
+        return [file_name]
+
+    # Mixed document → each page set goes to its own module
+    output_names = []
+
+    for index, (pattern_number, pages) in enumerate(groups.items(), start=1):
+        print(f"📑 Pages {pages} → Pattern {pattern_number}")
+
+        _report(progress, "extracting", pattern=pattern_number,
+                group=index, groups=len(groups), pages=pages)
+
+        output_name = f"{file_name}_pattern-{pattern_number}"
+        run_pattern(pattern_number, pdf_path, pages=pages, output_name=output_name,
+                    output_dir=output_dir, overrides=overrides)
+        output_names.append(output_name)
+
+    return output_names
+
+
+def process_file(file_path, temp_folder=None, progress=None, output_dir=None):
+    """
+    Runs one input file end to end: DXF exports go straight to the CAD
+    extractor, PDFs mapped in the manifest straight to their pattern,
+    other PDFs through per-page detection.
+    Returns the output names written. With MEMORY_PROFILE each stage's
+    time and peak memory are printed at the end.
+    """
+
+    profiler = StageProfiler(os.path.basename(file_path))
+
+    def profiled(stage, **detail):
+        profiler.mark(stage)
+        _report(progress, stage, **detail)
+
+    try:
+        return _process_file(file_path, temp_folder, profiled, output_dir)
+    finally:
+        profiler.finish()
+
+
+def _process_file(file_path, temp_folder, progress, output_dir):
+
+    if file_path.lower().endswith(".dxf"):
+        _report(progress, "extracting", pattern=None, group=1, groups=1)
+        process_dxf(file_path, output_dir=output_dir)
+        return [os.path.splitext(os.path.basename(file_path))[0]]
+
+    entry = lookup(load_manifest(), file_path)
+    options = manifest_overrides(entry)
+
+    # 📋 Known drawing → no detection request
+    if entry and entry.get("pattern"):
+        pattern_number = entry["pattern"]
+        print(f"\n📋 Manifest: {os.path.basename(file_path)} → Pattern {pattern_number}")
+
+        _report(progress, "extracting", pattern=pattern_number, group=1, groups=1)
+        run_pattern(pattern_number, file_path, output_dir=output_dir, overrides=options)
+
+        return [os.path.splitext(os.path.basename(file_path))[0]]
+
+    temp_folder = temp_folder or os.path.join(OUTPUT_DIR, "temp_detection")
+    os.makedirs(temp_folder, exist_ok=True)
+
+    print(f"\n📄 Detecting pattern for {os.path.basename(file_path)}...")
+
+    return run_document(
+        file_path, temp_folder, progress=progress, output_dir=output_dir, overrides=options
+    )
 
 
 def main():
@@ -25,22 +189,19 @@ def main():
         if f.lower().endswith(".pdf")
     ]
 
-    if not pdf_files:
+    # CAD exports skip rendering and detection entirely
+    dxf_files = [
+        f for f in os.listdir(INPUT_DIR)
+        if f.lower().endswith(".dxf")
+    ]
+
+    if not pdf_files and not dxf_files:
         print("⚠ No PDF files found.")
         return
 
-    for pdf in pdf_files:
-
-        pdf_path = os.path.join(INPUT_DIR, pdf)
-        temp_folder = os.path.join(OUTPUT_DIR, "temp_detection")
-
-        os.makedirs(temp_folder, exist_ok=True)
-
-        print(f"\n📄 Detecting pattern for {pdf}...")
-
-        pattern_number = detect_pattern(pdf_path, temp_folder)
-
-        run_pattern(pattern_number, pdf_path)
+    # ⏱ Cheapest first, by priority and fairly across projects
+    for path in schedule([os.path.join(INPUT_DIR, f) for f in dxf_files + pdf_files]):
+        process_file(path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,130 @@
+import re
+
+
+# ==============================
+# BEAM ID CANONICALIZATION
+# ==============================
+
+def canonical_beam_id(beam_id):
+    """
+    Folds OCR noise so near-duplicate IDs share one merge key.
+    'b 12', 'B-12', 'B12 ' → 'B12'   |   'B1O' → 'B10'
+    Separators inside the number are kept: 'B1.1', 'B1-1' and 'B11'
+    are different beams.
+    """
+
+    key = str(beam_id).strip().upper()
+
+    # Spacing / dash / dot noise between prefix and number
+    key = re.sub(r"^([A-Z]+)[\s\-_.]+(?=\d)", r"\1", key)
+
+    # Letters misread inside a digit run (1O → 10, 1I2 → 112)
+    key = re.sub(
+        r"(?<=\d)[OIL](?=\d)",
+        lambda m: "0" if m.group(0) == "O" else "1",
+        key
+    )
+
+    # Trailing O after digits is a misread zero (B1O → B10)
+    key = re.sub(r"(?<=\d)O$", "0", key)
+
+    return key
+
+
+# ==============================
+# MERGE ENGINE
+# ==============================
+
+class BeamMerger:
+    """
+    Accumulates beam fragments from slices / pages keyed by beam ID.
+
+    Fragment values are collected in insertion-ordered sets, so every
+    add is O(fragment size). Normalization is left to the caller and
+    runs exactly once per beam on the merged result.
+    """
+
+    def __init__(self):
+        self._beams = {}
+        self._reinforcement = {}
+        self._dia = {}
+        self._spacing = {}
+        self._seen_ids = {}
+
+        self.stats = {
+            "fragments": 0,
+            "beams": 0,
+            "merged": 0,
+            "near_duplicates": 0,
+            "skipped": 0
+        }
+
+    def add(self, beam):
+        beam_id = beam.get("beam_id")
+
+        self.stats["fragments"] += 1
+
+        if not beam_id:
+            self.stats["skipped"] += 1
+            return
+
+        key = canonical_beam_id(beam_id)
+        stirrups = beam.get("stirrups") or {}
+
+        if key not in self._beams:
+            beam["stirrups"] = dict(stirrups)
+            self._beams[key] = beam
+            self._reinforcement[key] = {}
+            self._dia[key] = {}
+            self._spacing[key] = {}
+            self._seen_ids[key] = {beam_id}
+            self.stats["beams"] += 1
+        else:
+            self.stats["merged"] += 1
+
+            if beam_id not in self._seen_ids[key]:
+                self._seen_ids[key].add(beam_id)
+                self.stats["near_duplicates"] += 1
+
+            # Fill size fields the first fragment could not read
+            existing_size = self._beams[key].get("size")
+            new_size = beam.get("size") or {}
+
+            if isinstance(existing_size, dict):
+                for field, value in new_size.items():
+                    if existing_size.get(field) is None and value is not None:
+                        existing_size[field] = value
+
+        self._reinforcement[key].update(
+            dict.fromkeys(beam.get("reinforcement") or [])
+        )
+        self._dia[key].update(dict.fromkeys(stirrups.get("dia") or []))
+        self._spacing[key].update(dict.fromkeys(stirrups.get("spacing") or []))
+
+    def extend(self, beams):
+        for beam in beams:
+            self.add(beam)
+
+    def merged_beams(self):
+        """
+        Returns merged beams in first-seen order.
+        Lists are de-duplicated but NOT normalized.
+        """
+
+        merged = []
+
+        for key, beam in self._beams.items():
+            beam["reinforcement"] = list(self._reinforcement[key])
+            beam["stirrups"]["dia"] = list(self._dia[key])
+            beam["stirrups"]["spacing"] = list(self._spacing[key])
+            merged.append(beam)
+
+        return merged
+
+    def report(self):
+        s = self.stats
+        print(
+            f"🔗 Merged {s['fragments']} fragments into {s['beams']} beams "
+            f"({s['merged']} merged, {s['near_duplicates']} near-duplicate IDs, "
+            f"{s['skipped']} without ID)"
+        )
@@ -0,0 +1,245 @@
+import os
+import json
+import sqlite3
+from datetime import datetime
+
+from config import OUTPUT_DIR, BEAM_DB_PATH
+from beam_merger import canonical_beam_id
+from rebar import parse_bar, parse_stirrup, parse_spacing
+
+
+# ==============================
+# SCHEMA
+# ==============================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    pattern INTEGER,
+    beam_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS beams (
+    id INTEGER PRIMARY KEY,
+    document_id INTEGER NOT NULL REFERENCES documents(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    beam_id TEXT NOT NULL,
+    beam_key TEXT NOT NULL,
+    width REAL,
+    depth REAL,
+    length REAL,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS bars (
+    beam_row_id INTEGER NOT NULL REFERENCES beams(id) ON DELETE CASCADE,
+    spec TEXT NOT NULL,
+    qty INTEGER,
+    dia INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS stirrups (
+    beam_row_id INTEGER NOT NULL REFERENCES beams(id) ON DELETE CASCADE,
+    kind TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    legs INTEGER,
+    dia INTEGER,
+    count INTEGER,
+    spacing INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS idx_beams_key ON beams(beam_key);
+CREATE INDEX IF NOT EXISTS idx_beams_size ON beams(width, depth);
+CREATE INDEX IF NOT EXISTS idx_beams_document ON beams(document_id);
+CREATE INDEX IF NOT EXISTS idx_bars_dia ON bars(dia, beam_row_id);
+CREATE INDEX IF NOT EXISTS idx_bars_beam ON bars(beam_row_id);
+CREATE INDEX IF NOT EXISTS idx_stirrups_dia ON stirrups(dia, beam_row_id);
+CREATE INDEX IF NOT EXISTS idx_stirrups_beam ON stirrups(beam_row_id);
+"""
+
+# Rows per executemany batch inside the single document transaction
+BATCH_SIZE = 1000
+
+
+def connect(db_path=None):
+    db_path = db_path or BEAM_DB_PATH or os.path.join(OUTPUT_DIR, "beams.db")
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+
+    return conn
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# ==============================
+# BULK INSERT
+# ==============================
+
+def _flush(conn, beam_rows, bar_rows, stirrup_rows):
+    conn.executemany(
+        "INSERT INTO beams (id, document_id, position, beam_id, beam_key, "
+        "width, depth, length, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        beam_rows
+    )
+    conn.executemany(
+        "INSERT INTO bars (beam_row_id, spec, qty, dia) VALUES (?, ?, ?, ?)",
+        bar_rows
+    )
+    conn.executemany(
+        "INSERT INTO stirrups (beam_row_id, kind, spec, legs, dia, count, spacing) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        stirrup_rows
+    )
+
+    beam_rows.clear()
+    bar_rows.clear()
+    stirrup_rows.clear()
+
+
+def store_document(conn, name, beams, pattern=None):
+    """
+    Replaces a document's beams in one transaction.
+    `beams` may be any iterable, so NDJSON output can be streamed in.
+    """
+
+    with conn:
+        conn.execute("DELETE FROM documents WHERE name = ?", (name,))
+
+        cursor = conn.execute(
+            "INSERT INTO documents (name, pattern, updated_at) VALUES (?, ?, ?)",
+            (name, pattern, datetime.now().isoformat(timespec="seconds"))
+        )
+        document_id = cursor.lastrowid
+
+        # Assign beam row ids up front so bars/stirrups can be batched
+        next_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM beams").fetchone()[0] + 1
+
+        beam_rows, bar_rows, stirrup_rows = [], [], []
+        count = 0
+
+        for position, beam in enumerate(beams):
+            beam_id = beam.get("beam_id") or ""
+            size = beam.get("size") or {}
+            stirrups = beam.get("stirrups") or {}
+            row_id = next_id + position
+
+            beam_rows.append((
+                row_id, document_id, position, beam_id, canonical_beam_id(beam_id),
+                _number(size.get("width")), _number(size.get("depth")),
+                _number(size.get("length")), json.dumps(beam)
+            ))
+
+            for spec in beam.get("reinforcement") or []:
+                qty, dia = parse_bar(spec)
+                bar_rows.append((row_id, spec, qty, dia))
+
+            for spec in stirrups.get("dia") or []:
+                legs, dia, stirrup_count = parse_stirrup(spec)
+                stirrup_rows.append((row_id, "dia", spec, legs, dia, stirrup_count, None))
+
+            for spec in stirrups.get("spacing") or []:
+                stirrup_rows.append((row_id, "spacing", spec, None, None, None, parse_spacing(spec)))
+
+            count += 1
+
+            if len(beam_rows) >= BATCH_SIZE:
+                _flush(conn, beam_rows, bar_rows, stirrup_rows)
+
+        _flush(conn, beam_rows, bar_rows, stirrup_rows)
+
+        conn.execute(
+            "UPDATE documents SET beam_count = ? WHERE id = ?",
+            (count, document_id)
+        )
+
+    return count
+
+
+# ==============================
+# QUERIES
+# ==============================
+
+def find_beams(conn, beam_id=None, width=None, depth=None, bar_dia=None, stirrup_dia=None):
+    """
+    Finds beams across all stored documents.
+    find_beams(conn, width=300, depth=600, bar_dia=25)
+    find_beams(conn, beam_id="B12")
+    """
+
+    query = (
+        "SELECT d.name, b.beam_id, b.width, b.depth, b.length, b.data "
+        "FROM beams b JOIN documents d ON d.id = b.document_id WHERE 1 = 1"
+    )
+    params = []
+
+    if beam_id is not None:
+        query += " AND b.beam_key = ?"
+        params.append(canonical_beam_id(beam_id))
+
+    if width is not None:
+        query += " AND b.width = ?"
+        params.append(width)
+
+    if depth is not None:
+        query += " AND b.depth = ?"
+        params.append(depth)
+
+    if bar_dia is not None:
+        query += " AND EXISTS (SELECT 1 FROM bars r WHERE r.dia = ? AND r.beam_row_id = b.id)"
+        params.append(bar_dia)
+
+    if stirrup_dia is not None:
+        query += " AND EXISTS (SELECT 1 FROM stirrups s WHERE s.dia = ? AND s.beam_row_id = b.id)"
+        params.append(stirrup_dia)
+
+    query += " ORDER BY d.name, b.position"
+
+    return [
+        {
+            "document": name,
+            "beam_id": found_id,
+            "size": {"width": w, "depth": d, "length": length},
+            "beam": json.loads(data)
+        }
+        for name, found_id, w, d, length, data in conn.execute(query, params)
+    ]
+
+
+# ==============================
+# MAIN ENTRY (BACKFILL FROM OUTPUT JSON)
+# ==============================
+
+def main():
+    conn = connect()
+
+    folders = [
+        f for f in os.listdir(OUTPUT_DIR)
+        if os.path.isfile(os.path.join(OUTPUT_DIR, f, f"{f}.json"))
+    ]
+
+    if not folders:
+        print("⚠ No output JSON files found.")
+        return
+
+    for name in folders:
+        with open(os.path.join(OUTPUT_DIR, name, f"{name}.json"), "r", encoding="utf-8") as f:
+            beams = json.load(f).get("beams", [])
+
+        count = store_document(conn, name, beams)
+        print(f"🗄 Stored {count} beams from {name}")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import re
+import json
+
+from config import VALIDATION_RETRIES
+from beam_merger import canonical_beam_id
+from rebar import parse_bar, parse_stirrup, parse_spacing
+
+
+# ==============================
+# DOMAIN LIMITS
+# ==============================
+
+# Bar diameters (mm) that are actually rolled
+STANDARD_DIAMETERS = {6, 8, 10, 12, 16, 20, 25, 28, 32, 36, 40}
+
+# Plausible section sizes (mm)
+WIDTH_RANGE = (100, 2000)
+DEPTH_RANGE = (150, 3000)
+
+# More bars than this in one layer is a misread row
+MAX_BAR_QTY = 12
+
+# Plausible stirrup spacing (mm)
+SPACING_RANGE = (50, 450)
+
+# B12 / AB3 / CB1a / RB-4 / B1.1: prefix letters + number (with an
+# optional sub-number) + optional suffix
+BEAM_ID = re.compile(r"^[A-Z]+\d+(?:[.\-_/]\d+)?[A-Z]?$")
+
+# Grouped IDs: "AB3,4,8" / "B11 & B122" / "AB11,33 BB11,33" / "B279 TO B282"
+ID_SEPARATOR = re.compile(r"\s*(?:,|&|\bAND\b|\bTO\b|\s)\s*")
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# ==============================
+# VALIDATION
+# ==============================
+
+def _check_id(beam_id):
+    tokens = [t for t in ID_SEPARATOR.split(str(beam_id or "").upper()) if t]
+
+    if not tokens:
+        return "missing beam_id"
+
+    # First ID must be complete, the rest may be bare continuation numbers
+    first = canonical_beam_id(tokens[0])
+    if not BEAM_ID.match(first):
+        return f"beam_id '{beam_id}' is not a beam mark"
+
+    for token in tokens[1:]:
+        token = canonical_beam_id(token)
+        if not (token.isdigit() or BEAM_ID.match(token)):
+            return f"beam_id '{beam_id}' is not a beam mark"
+
+    return None
+
+
+def validate_beam(beam):
+    """
+    Returns a list of problems with one extracted beam ([] when clean).
+    """
+
+    issues = []
+    beam_id = beam.get("beam_id")
+    label = beam_id or "?"
+
+    problem = _check_id(beam_id)
+    if problem:
+        issues.append(problem)
+
+    size = beam.get("size") or {}
+    reinforcement = beam.get("reinforcement") or []
+
+    for key, (low, high) in (("width", WIDTH_RANGE), ("depth", DEPTH_RANGE)):
+        value = _number(size.get(key))
+
+        if value is None:
+            # Rows without size or bars are blank table lines, not beams
+            if not reinforcement:
+                issues.append(f"{label}: no {key} and no reinforcement")
+        elif not low <= value <= high:
+            issues.append(f"{label}: {key} {size.get(key)} outside {low}-{high}")
+
+    for spec in reinforcement:
+        qty, dia = parse_bar(spec)
+
+        if qty is None:
+            issues.append(f"{label}: unreadable bar '{spec}'")
+        elif qty > MAX_BAR_QTY:
+            issues.append(f"{label}: {qty} bars in '{spec}'")
+
+        if dia is not None and dia not in STANDARD_DIAMETERS:
+            issues.append(f"{label}: non-standard diameter in '{spec}'")
+
+    stirrups = beam.get("stirrups") or {}
+
+    for spec in stirrups.get("dia") or []:
+        legs, dia, count = parse_stirrup(spec)
+
+        if legs is None and dia is None and count is None:
+            issues.append(f"{label}: unreadable stirrup '{spec}'")
+        elif dia is not None and dia not in STANDARD_DIAMETERS:
+            issues.append(f"{label}: non-standard stirrup diameter in '{spec}'")
+
+    for spec in stirrups.get("spacing") or []:
+        mm = parse_spacing(spec)
+
+        if mm is None or not SPACING_RANGE[0] <= mm <= SPACING_RANGE[1]:
+            issues.append(f"{label}: implausible spacing '{spec}'")
+
+    return issues
+
+
+def _id_position(beam_id):
+    """
+    (prefix, number) of a single beam mark: "B13a" → ("B", 13).
+    None for grouped IDs ("AB3,4,8", "B11 & B122"), which group beams
+    by design rather than by number.
+    """
+
+    tokens = [t for t in ID_SEPARATOR.split(str(beam_id or "").upper()) if t]
+    match = re.match(r"^([A-Z]+)(\d+)", canonical_beam_id(tokens[0])) if len(tokens) == 1 else None
+
+    return (match.group(1), int(match.group(2))) if match else None
+
+
+def check_sequence(beams):
+    """
+    IDs that break the run of their neighbours: schedules list beams in
+    ascending order, so between B12 and B15 a "B73" (misread number) or
+    a "BB13" (misread prefix) is suspect. Only single marks whose two
+    neighbours are single marks sharing a prefix and ascending are
+    judged; unsorted tables give no issues.
+    """
+
+    positions = [_id_position(beam.get("beam_id")) for beam in beams]
+    issues = []
+
+    for i in range(1, len(positions) - 1):
+        before, current, after = positions[i - 1], positions[i], positions[i + 1]
+
+        if not (before and current and after) or before[0] != after[0] or before[1] > after[1]:
+            continue
+
+        in_range = before[1] <= current[1] <= after[1]
+
+        if current[0] == before[0] and not in_range:
+            issues.append(f"{beams[i].get('beam_id')}: out of sequence between "
+                          f"{beams[i - 1].get('beam_id')} and {beams[i + 1].get('beam_id')}")
+        elif current[0] != before[0] and in_range:
+            issues.append(f"{beams[i].get('beam_id')}: prefix breaks the {before[0]} run")
+
+    return issues
+
+
+def validate_beams(beams):
+    """
+    Problems across one slice's beams, including the same ID read twice
+    with different sizes (a row bleeding into its neighbour) and IDs
+    that don't fit the sequence of their neighbours.
+    """
+
+    issues = []
+    sizes = {}
+
+    for beam in beams:
+        issues.extend(validate_beam(beam))
+
+        key = canonical_beam_id(beam.get("beam_id"))
+        size = beam.get("size") or {}
+        size = (_number(size.get("width")), _number(size.get("depth")))
+
+        if key and key in sizes and None not in size and None not in sizes[key] \
+                and sizes[key] != size:
+            issues.append(f"{beam.get('beam_id')}: read twice with different sizes")
+
+        sizes.setdefault(key, size)
+
+    issues.extend(check_sequence(beams))
+
+    return issues
+
+
+def parse_beams(result):
+    """
+    Beams from a raw model response, tolerating text around the JSON.
+    None when no JSON object can be read.
+    """
+
+    if not result:
+        return None
+
+    start, end = result.find("{"), result.rfind("}")
+
+    try:
+        return json.loads(result[start:end + 1]).get("beams") or []
+    except Exception:
+        return None
+
+
+# ==============================
+# SELECTIVE RE-EXTRACTION
+# ==============================
+
+RETRY_NOTE = """
+
+A previous reading of this image had these problems:
+{issues}
+Re-read the image carefully, row by row, and return corrected JSON in
+exactly the same format. Do not invent values that are not visible.
+"""
+
+
+def _score(result):
+    beams = parse_beams(result)
+
+    if beams is None:
+        return ["response is not valid JSON"]
+
+    return validate_beams(beams)
+
+
+def extract_validated(image_path, prompt, extract, retries=VALIDATION_RETRIES):
+    """
+    Extracts one slice and validates it. Only a slice that fails is sent
+    again (with its problems listed), up to `retries` times. Returns the
+    raw response with the fewest problems, so callers parse it as before.
+    """
+
+    result = extract(image_path, prompt)
+    issues = _score(result)
+
+    for _ in range(retries):
+        if not issues:
+            break
+
+        print(f"🔁 Re-extracting slice ({len(issues)} issues: {issues[0]})")
+
+        note = RETRY_NOTE.format(issues="\n".join(f"- {i}" for i in issues[:20]))
+        retry = extract(image_path, prompt + note)
+        retry_issues = _score(retry)
+
+        if len(retry_issues) < len(issues):
+            result, issues = retry, retry_issues
+
+    if issues:
+        print(f"⚠ Slice kept with {len(issues)} validation issues")
+
+    return result
@@ -1,10 +1,161 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+
+def _find_env_file():
+    # Same lookup as load_dotenv(): this folder, then each parent
+    folder = os.path.dirname(os.path.abspath(__file__))
+
+    while True:
+        path = os.path.join(folder, ".env")
+        if os.path.isfile(path):
+            return path
+
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return None
+        folder = parent
+
+
+# python-dotenv is only imported when there is a .env file to read
+_env_file = _find_env_file()
+
+if _env_file:
+    from dotenv import load_dotenv
+    load_dotenv(_env_file)
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 INPUT_DIR = os.path.join(BASE_DIR, "input")
 OUTPUT_DIR = os.path.join(BASE_DIR, "output")
+
+# "json" buffers beams per document, "ndjson" streams them as they finish
+OUTPUT_MODE = os.getenv("OUTPUT_MODE", "json")
+
+# Optional SQLite store that every finished document is also written into
+BEAM_DB_PATH = os.getenv("BEAM_DB_PATH")
+
+# Concurrent page classification requests per document
+DETECTION_WORKERS = int(os.getenv("DETECTION_WORKERS", "4"))
+
+# Crop each detected schedule table before slicing / upload
+CROP_TABLES = os.getenv("CROP_TABLES", "1") == "1"
+
+
+# Header fingerprint → pattern cache; set to an empty string to disable
+HEADER_CACHE_PATH = os.getenv("HEADER_CACHE_PATH", os.path.join(OUTPUT_DIR, "header_cache.json"))
+
+# Least recently used headers are evicted past this many entries
+HEADER_CACHE_SIZE = int(os.getenv("HEADER_CACHE_SIZE", "500"))
+
+# Minimum similarity (0-1) for a cached header to count as the same header
+HEADER_CACHE_SIMILARITY = float(os.getenv("HEADER_CACHE_SIMILARITY", "0.9"))
+
+# Watch service: seconds between INPUT_DIR scans and warm worker threads
+WATCH_INTERVAL = float(os.getenv("WATCH_INTERVAL", "0.5"))
+WATCH_WORKERS = int(os.getenv("WATCH_WORKERS", "2"))
+
+# Local HTTP job API
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8080"))
+API_WORKERS = int(os.getenv("API_WORKERS", "2"))
+API_QUEUE_SIZE = int(os.getenv("API_QUEUE_SIZE", "20"))
+API_REQUEST_TIMEOUT = float(os.getenv("API_REQUEST_TIMEOUT", "30"))
+API_MAX_UPLOAD_MB = int(os.getenv("API_MAX_UPLOAD_MB", "100"))
+# Finished jobs (and their jobs/<job_id>/ folders) are dropped after this
+# many hours, or oldest first beyond API_MAX_FINISHED_JOBS
+API_JOB_TTL_HOURS = float(os.getenv("API_JOB_TTL_HOURS", "24"))
+API_MAX_FINISHED_JOBS = int(os.getenv("API_MAX_FINISHED_JOBS", "200"))
+
+# Shared work queue: SQLite file every node can reach, per-job workspaces,
+# lease length before an unfinished job is handed to another worker
+QUEUE_DB_PATH = os.getenv("QUEUE_DB_PATH", os.path.join(OUTPUT_DIR, "work_queue.db"))
+WORK_DIR = os.getenv("WORK_DIR", os.path.join(OUTPUT_DIR, "work"))
+LEASE_SECONDS = int(os.getenv("LEASE_SECONDS", "600"))
+MAX_ATTEMPTS = int(os.getenv("MAX_ATTEMPTS", "3"))
+
+# Drawing register: file names / globs → pattern and per-document overrides
+MANIFEST_PATH = os.getenv("MANIFEST_PATH", os.path.join(INPUT_DIR, "manifest.json"))
+
+# Single-page PDFs: classify and extract in one request (patterns 3, 5-8)
+COMBINED_EXTRACTION = os.getenv("COMBINED_EXTRACTION", "0") == "1"
+
+# Re-extraction attempts for a slice whose beams fail validation (0 disables)
+VALIDATION_RETRIES = int(os.getenv("VALIDATION_RETRIES", "1"))
+
+# Vision model for every extraction request
+VISION_MODEL = os.getenv("VISION_MODEL", "gpt-4.1-mini")
+
+# "fixed": num_slices equal strips; "tiled": bands sized to the model's
+# image tiling at SLICE_SCALE of the rendered resolution
+SLICE_MODE = os.getenv("SLICE_MODE", "fixed")
+SLICE_SCALE = float(os.getenv("SLICE_SCALE", "0.5"))
+
+# "page": render whole pages at full DPI; "bands": render pages only as a
+# PREVIEW_DPI preview and each table / slice straight from the PDF
+RENDER_MODE = os.getenv("RENDER_MODE", "page")
+PREVIEW_DPI = int(os.getenv("PREVIEW_DPI", "75"))
+
+# Extraction backend: "vision" (hosted model) or "ocr" (local tesseract).
+# PATTERN_BACKENDS overrides it per pattern, e.g. "5:ocr,6:ocr"
+EXTRACTION_BACKEND = os.getenv("EXTRACTION_BACKEND", "vision")
+
+
+def _pattern_backends(value):
+    backends = {}
+
+    for item in value.split(","):
+        if not item.strip():
+            continue
+
+        pattern, _, backend = item.strip().partition(":")
+
+        if not (pattern.strip().isdigit() and int(pattern) in range(1, 9)) \
+                or not backend.strip() or ":" in backend:
+            raise Exception(
+                f"PATTERN_BACKENDS item '{item.strip()}' must be <pattern 1-8>:<backend>, e.g. '5:ocr'"
+            )
+
+        if int(pattern) == 8 and backend.strip() == "ocr":
+            raise Exception("PATTERN_BACKENDS: the OCR backend cannot read pattern 8 (beams along columns)")
+
+        backends[int(pattern)] = backend.strip()
+
+    return backends
+
+
+PATTERN_BACKENDS = _pattern_backends(os.getenv("PATTERN_BACKENDS", ""))
+
+# Tesseract page segmentation (11: sparse text, cells read independently)
+# and the lowest word confidence kept
+OCR_CONFIG = os.getenv("OCR_CONFIG", "--psm 11")
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "30"))
+
+# Re-issued drawings: reuse the previous issue's answers for unchanged
+# bands and write a beam change report. Off by default: a plain re-run
+# should ask the model again
+DELTA_EXTRACTION = os.getenv("DELTA_EXTRACTION", "0") == "1"
+
+# Per-stage time / heap / RSS report (tracemalloc slows extraction a little)
+MEMORY_PROFILE = os.getenv("MEMORY_PROFILE", "0") == "1"
+RSS_SAMPLE_SECONDS = float(os.getenv("RSS_SAMPLE_SECONDS", "0.05"))
+
+# Process memory budget; a page that would exceed it is rendered at a
+# lower DPI and its tables from the PDF band by band (0 disables)
+MEMORY_BUDGET_MB = int(os.getenv("MEMORY_BUDGET_MB", "0"))
+
+# Header template the Excel export copies each pattern's header from
+EXCEL_TEMPLATE = os.getenv("EXCEL_TEMPLATE", os.path.join(BASE_DIR, "Beam Formats.xlsx"))
+
+# Account limits shared by every process on this host (0 = unlimited) and
+# the SQLite file holding the token buckets
+API_REQUESTS_PER_MINUTE = int(os.getenv("API_REQUESTS_PER_MINUTE", "0"))
+API_TOKENS_PER_MINUTE = int(os.getenv("API_TOKENS_PER_MINUTE", "0"))
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", os.path.join(OUTPUT_DIR, "rate_limit.db"))
+
+# Worker processes for the parallel runner (0 = one per CPU core)
+PARALLEL_WORKERS = int(os.getenv("PARALLEL_WORKERS", "0"))
+
+# Batch order: "cost" (shortest first, manifest priorities, fair across
+# projects) or "name"
+SCHEDULING = os.getenv("SCHEDULING", "cost")
@@ -0,0 +1,677 @@
+import os
+import re
+
+from config import INPUT_DIR, OUTPUT_DIR, EXCEL_TEMPLATE
+from output_writer import BeamWriter
+
+
+# ==============================
+# TEXT PATTERNS
+# ==============================
+
+BEAM_ID = re.compile(r"^[A-Z]{1,4}\d+[A-Za-z]?(?:\s*[,&]\s*[A-Z]{0,4}\d+[A-Za-z]?)*$")
+SIZE_IN_BRACKETS = re.compile(r"\(\s*(\d+)\s*[xX×]\s*(\d+)\s*\)")
+SIZE_PLAIN = re.compile(r"^(\d+)\s*[xX×]\s*(\d+)")
+BAR_SPEC = re.compile(r"\d+\s*-?\s*(?:[TYR]\d+|\d+[TYR])")
+NUMBER = re.compile(r"\d+")
+
+# Header words that never carry beam data
+IGNORED_HEADERS = ("S.NO", "SR.NO", "ELEVATION", "TYPE", "GRID", "D1(MM)", "D2(MM)", "SIDE FACE", "REMARK")
+
+# Coordinates closer than this fraction of the median text height collapse together
+GRID_TOLERANCE = 0.5
+
+# Least share of header words a schedule must have in common with a
+# template header to take its pattern
+MIN_TEMPLATE_SIMILARITY = 0.3
+
+
+# ==============================
+# READ CAD ENTITIES
+# ==============================
+
+def _text_position(entity):
+    if entity.dxftype() == "TEXT" and (entity.dxf.halign or entity.dxf.valign):
+        point = entity.dxf.align_point
+    else:
+        point = entity.dxf.insert
+    return float(point.x), float(point.y)
+
+
+def _add_segment(start, end, h_lines, v_lines):
+    (x0, y0), (x1, y1) = start, end
+    dx, dy = abs(x1 - x0), abs(y1 - y0)
+
+    if dy <= dx * 0.01 and dx > 0:
+        h_lines.append(((y0 + y1) / 2, min(x0, x1), max(x0, x1)))
+    elif dx <= dy * 0.01 and dy > 0:
+        v_lines.append(((x0 + x1) / 2, min(y0, y1), max(y0, y1)))
+
+
+def _collect(entities, texts, h_lines, v_lines):
+    for e in entities:
+        kind = e.dxftype()
+
+        if kind == "TEXT":
+            text = e.dxf.text.strip()
+            if text:
+                x, y = _text_position(e)
+                texts.append((x, y, text, float(e.dxf.height or 0)))
+
+        elif kind == "MTEXT":
+            x, y = _text_position(e)
+            height = float(e.dxf.char_height or 0)
+            # Stacked lines in one MTEXT become separate texts
+            for i, line in enumerate(e.plain_text().split("\n")):
+                if line.strip():
+                    texts.append((x, y - i * height * 1.5, line.strip(), height))
+
+        elif kind == "LINE":
+            _add_segment(
+                (e.dxf.start.x, e.dxf.start.y), (e.dxf.end.x, e.dxf.end.y),
+                h_lines, v_lines
+            )
+
+        elif kind == "LWPOLYLINE":
+            points = [tuple(p) for p in e.get_points("xy")]
+            if e.closed and points:
+                points.append(points[0])
+            for start, end in zip(points, points[1:]):
+                _add_segment(start, end, h_lines, v_lines)
+
+        elif kind == "INSERT":
+            # Schedules are often drawn inside blocks
+            _collect(e.virtual_entities(), texts, h_lines, v_lines)
+
+
+def read_entities(dxf_path):
+    """
+    Returns (texts, h_lines, v_lines) from model space.
+    texts   → (x, y, text, height)
+    h_lines → (y, x_start, x_end)
+    v_lines → (x, y_start, y_end)
+    """
+
+    import ezdxf  # optional, only needed for CAD input
+
+    doc = ezdxf.readfile(dxf_path)
+
+    texts, h_lines, v_lines = [], [], []
+    _collect(doc.modelspace(), texts, h_lines, v_lines)
+
+    return texts, h_lines, v_lines
+
+
+def _cluster(values, tolerance):
+    clusters = []
+
+    for value in sorted(values):
+        if clusters and value - clusters[-1][-1] <= tolerance:
+            clusters[-1].append(value)
+        else:
+            clusters.append([value])
+
+    return [sum(c) / len(c) for c in clusters]
+
+
+def _tolerance(texts):
+    heights = sorted(t[3] for t in texts if t[3] > 0)
+    return heights[len(heights) // 2] * GRID_TOLERANCE if heights else 1.0
+
+
+def split_tables(texts, h_lines, v_lines):
+    """
+    Splits the ruling into connected tables, as table_detector does for
+    rasters: lines belong together when they cross or touch. Returns
+    [(texts, h_lines, v_lines)] per table, texts inside its bounds.
+    """
+
+    import numpy as np
+
+    if not h_lines or not v_lines:
+        return []
+
+    tolerance = _tolerance(texts)
+    h = np.array(h_lines, dtype=float)
+    v = np.array(v_lines, dtype=float)
+
+    # Union-find over h lines first, then v lines
+    parent = list(range(len(h) + len(v)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, (y, x0, x1) in enumerate(h):
+        touching = np.flatnonzero(
+            (v[:, 0] >= x0 - tolerance) & (v[:, 0] <= x1 + tolerance) &
+            (v[:, 1] <= y + tolerance) & (v[:, 2] >= y - tolerance)
+        )
+        for j in touching:
+            parent[find(len(h) + int(j))] = find(i)
+
+    groups = {}
+    for i in range(len(parent)):
+        groups.setdefault(find(i), []).append(i)
+
+    tables = []
+
+    for members in groups.values():
+        table_h = [h_lines[i] for i in members if i < len(h)]
+        table_v = [v_lines[i - len(h)] for i in members if i >= len(h)]
+
+        if not table_h or not table_v:
+            continue
+
+        x0 = min(x for x, _, _ in table_v) - tolerance
+        x1 = max(x for x, _, _ in table_v) + tolerance
+        y0 = min(y for y, _, _ in table_h) - tolerance
+        y1 = max(y for y, _, _ in table_h) + tolerance
+
+        inside = [t for t in texts if x0 <= t[0] <= x1 and y0 <= t[1] <= y1]
+        tables.append((inside, table_h, table_v))
+
+    # Top → bottom, left → right, as the sheet reads
+    return sorted(tables, key=lambda t: (-max(y for y, _, _ in t[1]), min(x for x, _, _ in t[2])))
+
+
+# ==============================
+# VALUE CLEANUP
+# ==============================
+
+def split_reinforcement(text):
+    """
+    '2-16T+1-12T TH' → ['2-16T', '1-12T']   |   '7T25' → ['7-T25']
+    """
+
+    text = text.upper().replace(" ", "")
+    text = re.sub(r"(TH|EX)$", "", text)
+
+    items = []
+
+    for part in text.split("+"):
+        if not part or part == "-":
+            continue
+
+        if "-" not in part:
+            m = re.match(r"^(\d+)([TYR]\d+)$", part)
+            if m:
+                part = f"{m.group(1)}-{m.group(2)}"
+
+        items.append(part)
+
+    return items
+
+
+def split_stirrup(text):
+    """
+    '2L-T8@100 C/C' → (['2L-T8'], ['100 C/C'])
+    """
+
+    text = text.upper().replace("±", "").replace(" ", "")
+    dia, _, spacing = text.partition("@")
+
+    spacings = [f"{n} C/C" for n in NUMBER.findall(spacing.replace("C/C", "")) if n != "0"]
+
+    return ([dia] if dia else []), spacings
+
+
+def _format_stirrup_dia(legs, dia):
+    dia = dia.upper().replace(" ", "")
+
+    if dia.isdigit():
+        dia = f"T{dia}"
+
+    legs = NUMBER.search(legs or "")
+
+    return f"{legs.group(0)}L-{dia}" if legs else dia
+
+
+def _empty_beam(beam_id):
+    return {
+        "beam_id": beam_id,
+        "size": {"width": None, "depth": None, "length": None},
+        "reinforcement": [],
+        "stirrups": {"dia": [], "spacing": []}
+    }
+
+
+def _to_number(text):
+    m = NUMBER.search(text or "")
+    return int(m.group(0)) if m else None
+
+
+# ==============================
+# SCHEDULE TABLE
+# ==============================
+
+def _column_role(label):
+    label = label.upper()
+
+    if not label or any(word in label for word in IGNORED_HEADERS):
+        return None
+    if re.search(r"STIRRUP|SHEAR|LEGS|STRP", label):
+        if "LEG" in label:
+            return "stirrup_legs"
+        if "SPAC" in label:
+            return "stirrup_spacing"
+        if re.search(r"\bDIA\b", label):
+            return "stirrup_dia"
+        return "stirrup"
+    if re.search(r"REINF|TOP|BOTTOM|BOT\b|LAYER|CURTAIL|STRAIGHT|SUPPORT|MID", label):
+        return "reinforcement"
+    if re.search(r"B\s*[X×]\s*D", label):
+        return "size"
+    if re.search(r"WIDTH|BREADTH|\(W\)|\(B\)|^B$", label):
+        return "width"
+    if re.search(r"DEPTH|\(D\)|^D$", label):
+        return "depth"
+    if re.search(r"SPAN|\(L\)", label):
+        return "length"
+    if re.search(r"BEAM|MARK", label):
+        return "beam_id"
+    return None
+
+
+def build_grid(texts, h_lines, v_lines):
+    """
+    Snaps texts into cells formed by the ruling lines.
+    Returns rows (top → bottom) of (cells, spans):
+    cells → {column_index: text}, spans → {column_index: width in columns}.
+    Cells merged across columns are keyed by their leftmost column.
+    """
+
+    tolerance = _tolerance(texts)
+
+    rows_y = sorted(_cluster([y for y, _, _ in h_lines], tolerance), reverse=True)
+    cols_x = _cluster([x for x, _, _ in v_lines], tolerance)
+
+    if len(rows_y) < 2 or len(cols_x) < 2:
+        return []
+
+    n_cols = len(cols_x) - 1
+    grid = []
+
+    for i in range(len(rows_y) - 1):
+        mid = (rows_y[i] + rows_y[i + 1]) / 2
+
+        # Interior boundaries that really have a ruling line in this row
+        walls = {
+            j for j in range(1, n_cols)
+            if any(
+                abs(x - cols_x[j]) <= tolerance and y0 - tolerance <= mid <= y1 + tolerance
+                for x, y0, y1 in v_lines
+            )
+        }
+
+        spans = {}
+        start = 0
+        for j in range(1, n_cols + 1):
+            if j == n_cols or j in walls:
+                spans[start] = j - start
+                start = j
+
+        grid.append(({}, spans, rows_y[i + 1], rows_y[i]))
+
+    for x, y, text, _ in sorted(texts, key=lambda t: (-t[1], t[0])):
+        row = next((r for r in grid if r[2] < y <= r[3]), None)
+        col = next((j for j in range(n_cols) if cols_x[j] <= x < cols_x[j + 1]), None)
+
+        if row is None or col is None:
+            continue
+
+        cells, spans = row[0], row[1]
+        col = max(c for c in spans if c <= col)
+
+        cells[col] = f"{cells[col]}\n{text}" if col in cells else text
+
+    return [(cells, spans) for cells, spans, _, _ in grid if cells]
+
+
+def extract_table(texts, h_lines, v_lines):
+    """
+    Beams of one schedule table. Returns (beams, header labels), or
+    None when the table has no BEAM header or no beam rows.
+    """
+
+    grid = build_grid(texts, h_lines, v_lines)
+
+    header_start = next(
+        (i for i, (cells, _) in enumerate(grid) if any(re.search(r"\bBEAM", v.upper()) for v in cells.values())),
+        None
+    )
+
+    if header_start is None:
+        return None
+
+    # Header runs until the first row whose beam cell holds a beam ID
+    n_cols = max(c + s for _, spans in grid for c, s in spans.items())
+    labels = [""] * n_cols
+    roles = {}
+    data_start = None
+
+    for i in range(header_start, len(grid)):
+        cells, spans = grid[i]
+
+        beam_col = next((c for c, r in roles.items() if r == "beam_id"), None)
+        if beam_col is not None:
+            beam_cell = next((v for c, v in cells.items() if c <= beam_col < c + spans[c]), "")
+            if BEAM_ID.match(beam_cell.split("\n")[0].strip()):
+                data_start = i
+                break
+
+        # Group labels cover every column of their merged cell
+        for c, text in cells.items():
+            for k in range(c, c + spans[c]):
+                labels[k] = f"{labels[k]} {text}".replace("\n", " ").strip()
+
+        roles = {c: _column_role(label) for c, label in enumerate(labels)}
+
+    if data_start is None:
+        return None
+
+    beams = []
+    current = []
+
+    for row, _ in grid[data_start:]:
+        ids = []
+        for c, role in roles.items():
+            if role == "beam_id" and c in row:
+                ids = [t.strip() for t in row[c].split("\n") if BEAM_ID.match(t.strip())]
+                break
+
+        # Stacked IDs share one data row, continuation rows extend the last beam
+        if ids:
+            current = [_empty_beam(beam_id) for beam_id in ids]
+            beams.extend(current)
+
+        if not current:
+            continue
+
+        legs = None
+        stirrup_dia = None
+
+        for c, value in row.items():
+            role = roles.get(c)
+
+            for beam in current:
+                if role == "width":
+                    beam["size"]["width"] = _to_number(value)
+                elif role == "depth":
+                    beam["size"]["depth"] = _to_number(value)
+                elif role == "length":
+                    beam["size"]["length"] = _to_number(value)
+                elif role == "size":
+                    m = SIZE_PLAIN.match(value.replace(" ", ""))
+                    if m:
+                        beam["size"]["width"] = int(m.group(1))
+                        beam["size"]["depth"] = int(m.group(2))
+                elif role == "reinforcement":
+                    for line in value.split("\n"):
+                        beam["reinforcement"].extend(split_reinforcement(line))
+                elif role == "stirrup":
+                    dia, spacing = split_stirrup(value.replace("\n", ""))
+                    beam["stirrups"]["dia"].extend(dia)
+                    beam["stirrups"]["spacing"].extend(spacing)
+                elif role == "stirrup_spacing":
+                    beam["stirrups"]["spacing"].extend(
+                        f"{n} C/C" for n in NUMBER.findall(value) if n != "0"
+                    )
+
+            if role == "stirrup_legs":
+                legs = value
+            elif role == "stirrup_dia":
+                stirrup_dia = value
+
+        if stirrup_dia:
+            for beam in current:
+                beam["stirrups"]["dia"].append(_format_stirrup_dia(legs, stirrup_dia))
+
+    header = [
+        text for cells, _ in grid[header_start:data_start] for text in cells.values()
+    ]
+
+    return beams, header
+
+
+# ==============================
+# PATTERN
+# ==============================
+
+def detect_pattern(header):
+    """
+    Pattern of a schedule from its header labels: the header cache
+    first (headers vision classified before), then the closest header
+    block of the Excel template. None when nothing is close.
+    """
+
+    # header_cache brings numpy and PIL, which entry points load late
+    from header_cache import HEADER_SPLIT, KEY_TOKEN, header_signature
+
+    words = header_signature(header)
+
+    if not words:
+        return None
+
+    from pattern_detector import get_header_cache
+
+    pattern = get_header_cache().lookup("", words)
+
+    if pattern is not None or not os.path.isfile(EXCEL_TEMPLATE):
+        return pattern
+
+    from excel_export import load_header_blocks
+
+    found = set(words.split())
+    keys = {t for t in found if KEY_TOKEN.search(t)}
+    best, best_score = None, (False, MIN_TEMPLATE_SIMILARITY)
+
+    for number, block in load_header_blocks().items():
+        tokens = {
+            t for row in block["rows"] for value in row[2:] if value is not None
+            for t in HEADER_SPLIT.split(str(value).upper()) if t
+        }
+
+        # Matching sub-column letters (A B C D1 …) outrank shared words
+        score = (
+            {t for t in tokens if KEY_TOKEN.search(t)} == keys,
+            len(found & tokens) / len(found | tokens)
+        )
+
+        if score[1] >= MIN_TEMPLATE_SIMILARITY and score > best_score:
+            best, best_score = number, score
+
+    return best
+
+
+def clean_beams(beams, pattern):
+    """
+    The final cleanup main_<pattern> gives its beams, so CAD output
+    matches the JSON of the PDF route.
+    """
+
+    if pattern is None:
+        return [_finish(beam) for beam in beams]
+
+    import importlib
+
+    clean_beam = importlib.import_module(f"main_{pattern}").clean_beam
+
+    return [b for b in (clean_beam(_finish(beam)) for beam in beams) if b]
+
+
+# ==============================
+# STRIP BEAM LAYOUT (PATTERN 8)
+# ==============================
+
+def extract_strip(texts):
+    tolerance = _tolerance(texts)
+
+    labels = []
+    for x, y, text, height in texts:
+        head = SIZE_IN_BRACKETS.split(text)[0].strip()
+        if re.match(r"^[A-Z]{1,4}\d+[a-z]?$", head):
+            labels.append([x, y, head, None, None])
+
+    # Size is written in the label or just below it
+    for label in labels:
+        x, y, text = label[0], label[1], label[2]
+        candidates = [
+            t for t in texts
+            if SIZE_IN_BRACKETS.search(t[2]) and abs(t[0] - x) < tolerance * 20 and 0 <= y - t[1] < tolerance * 6
+        ]
+        if candidates:
+            m = SIZE_IN_BRACKETS.search(min(candidates, key=lambda t: (y - t[1], abs(t[0] - x)))[2])
+            label[3], label[4] = int(m.group(1)), int(m.group(2))
+
+    if not labels:
+        return []
+
+    # Row headers of the stirrup table under the strip
+    row_headers = {}
+    header_texts = set()
+    for x, y, text, _ in texts:
+        key = text.upper().replace(" ", "")
+        for name, prefix in (("legs", "LEGGED"), ("nos", "NOS"), ("spacing", "SPAC"), ("dia", "STRP")):
+            if key.startswith(prefix):
+                row_headers[name] = y
+                header_texts.add((x, y))
+
+    label_rows = _cluster([label[1] for label in labels], tolerance * 2)
+    beams = []
+
+    for row_y in label_rows:
+        row = sorted((l for l in labels if abs(l[1] - row_y) <= tolerance * 2), key=lambda l: l[0])
+        xs = [l[0] for l in row]
+
+        # Segment boundaries halfway between neighbouring labels,
+        # end segments mirror the neighbouring half-width
+        bounds = []
+        for i, x in enumerate(xs):
+            half = (xs[1] - xs[0]) / 2 if len(xs) > 1 else float("inf")
+            left = (xs[i - 1] + x) / 2 if i else x - half
+            right = (x + xs[i + 1]) / 2 if i < len(xs) - 1 else x + half
+            bounds.append((left, right))
+
+        upper = min((y for y in label_rows if y > row_y), default=float("inf"))
+        lower = max((y for y in label_rows if y < row_y), default=float("-inf"))
+
+        for label, (left, right) in zip(row, bounds):
+            beam = _empty_beam(label[2])
+            beam["size"]["width"], beam["size"]["depth"] = label[3], label[4]
+            beam["nos"] = {"left": None, "mid_span": None, "right": None}
+
+            column = [t for t in texts if left <= t[0] < right and (t[0], t[1]) not in header_texts]
+
+            legs, dia, nos = None, None, []
+
+            for x, y, text, _ in column:
+                if row_y < y < upper and BAR_SPEC.search(text):
+                    beam["reinforcement"].extend(split_reinforcement(text))
+                    continue
+
+                if not lower < y < row_y or not row_headers:
+                    continue
+
+                row_name = min(row_headers, key=lambda name: abs(row_headers[name] - y))
+                if abs(row_headers[row_name] - y) > tolerance * 2:
+                    continue
+
+                if row_name == "legs":
+                    legs = text
+                elif row_name == "dia":
+                    dia = text
+                elif row_name == "nos":
+                    nos.append((x, text.strip().upper()))
+                elif row_name == "spacing":
+                    beam["stirrups"]["spacing"].extend(
+                        f"{n} C/C" for n in NUMBER.findall(text) if n != "0"
+                    )
+
+            if dia:
+                beam["stirrups"]["dia"].append(_format_stirrup_dia(legs, dia))
+
+            nos = [text for _, text in sorted(nos)]
+            if len(nos) == 1 and nos[0] == "ALL":
+                nos = ["ALL"] * 3
+            for key, value in zip(("left", "mid_span", "right"), nos):
+                beam["nos"][key] = value
+
+            beams.append(beam)
+
+    return beams
+
+
+# ==============================
+# PROCESS SINGLE DXF
+# ==============================
+
+def _finish(beam):
+    beam["reinforcement"] = sorted(set(beam["reinforcement"]))
+    beam["stirrups"]["dia"] = sorted(set(beam["stirrups"]["dia"]))
+    beam["stirrups"]["spacing"] = sorted(set(beam["stirrups"]["spacing"]))
+    return beam
+
+
+def process_dxf(dxf_path, output_name=None, output_dir=None):
+    file_name = output_name or os.path.splitext(os.path.basename(dxf_path))[0]
+
+    file_output_folder = os.path.join(output_dir or OUTPUT_DIR, file_name)
+    os.makedirs(file_output_folder, exist_ok=True)
+
+    print(f"\n📐 Reading CAD entities from {os.path.basename(dxf_path)}...")
+    texts, h_lines, v_lines = read_entities(dxf_path)
+
+    # Each schedule on its own: side-by-side tables must not share a grid
+    tables = []
+
+    for table in split_tables(texts, h_lines, v_lines):
+        found = extract_table(*table)
+
+        if found:
+            beams, header = found
+            tables.append((detect_pattern(header), beams))
+
+    if not tables:
+        tables = [(8, extract_strip(texts))]
+
+    # One JSON per document: the pattern most of its beams came from
+    counts = {}
+    for pattern, beams in tables:
+        counts[pattern] = counts.get(pattern, 0) + len(beams)
+    pattern = max(counts, key=counts.get)
+
+    print(f"📐 {len(tables)} tables, pattern {pattern or 'unknown'}")
+
+    writer = BeamWriter(file_output_folder, file_name, pattern=pattern)
+
+    for table_pattern, beams in tables:
+        writer.write(clean_beams(beams, table_pattern))
+
+    writer.finalize()
+
+
+# ==============================
+# MAIN ENTRY
+# ==============================
+
+def main():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    dxf_files = [
+        f for f in os.listdir(INPUT_DIR)
+        if f.lower().endswith(".dxf")
+    ]
+
+    if not dxf_files:
+        print("⚠ No DXF files found in input folder.")
+        return
+
+    for dxf in dxf_files:
+        process_dxf(os.path.join(INPUT_DIR, dxf))
+
+
+if __name__ == "__main__":
+    main()
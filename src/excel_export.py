@@ -0,0 +1,366 @@
+import os
+import re
+import sys
+import json
+
+from config import OUTPUT_DIR, EXCEL_TEMPLATE
+
+
+# ==============================
+# COLUMN MAPPING
+# ==============================
+
+# Template column → beam field, per pattern. The JSON keeps bars and
+# stirrups as lists (not per LEFT / MID / RIGHT cell), so each goes in
+# the first column of its group, under the group's merged header
+# (HEADER_GROUPS).
+EXPORT_COLUMNS = {
+    1: {"C": "beam_id", "D": "width", "E": "depth", "F": "reinforcement", "L": "stirrups"},
+    2: {"C": "beam_id", "D": "size", "E": "reinforcement", "K": "stirrups"},
+    3: {"C": "beam_id", "D": "size", "E": "reinforcement", "J": "stirrups"},
+    4: {"D": "beam_id", "G": "width", "H": "depth", "I": "length", "J": "reinforcement",
+        "Q": "stirrups"},
+    5: {"D": "beam_id", "G": "width", "H": "depth", "I": "length", "J": "reinforcement",
+        "L": "stirrups"},
+    6: {"C": "beam_id", "D": "width", "E": "depth", "F": "reinforcement", "O": "legs",
+        "P": "stirrup_dia", "Q": "spacing"},
+    7: {"C": "beam_id", "D": "width", "E": "depth", "G": "reinforcement", "P": "legs",
+        "Q": "stirrup_dia", "R": "spacing"},
+    8: {"C": "beam_and_size", "D": "legs", "E": "nos", "F": "spacing", "G": "stirrup_dia"},
+}
+
+# Template columns (first, last) whose sub-headers (BOTTOM / TOP,
+# LEFT / MID / RIGHT, ...) the export cannot fill separately: merged into
+# one header cell with this label
+HEADER_GROUPS = {
+    1: [("F", "K", "REINFORCEMENT"), ("L", "N", "SHEAR STIRRUPS")],
+    2: [("E", "J", "REINFORCEMENT"), ("K", "L", "STIRRUPS")],
+    3: [("E", "I", "REINFORCEMENT"), ("J", "K", "STIRRUPS")],
+    4: [("J", "P", "REINFORCEMENT")],
+    5: [("J", "K", "REINFORCEMENT")],
+    6: [("F", "N", "REINFORCEMENT"), ("Q", "S", "SPACING")],
+    7: [("G", "O", "REINFORCEMENT"), ("R", "T", "SPACING")],
+}
+
+# Documents whose pattern is unknown (outputs written before the JSON
+# recorded it, with no pattern in the folder name)
+GENERIC_HEADER = ["NO.", "DOCUMENT", "BEAM", "WIDTH", "DEPTH", "LENGTH",
+                  "REINFORCEMENT", "STIRRUPS"]
+GENERIC_COLUMNS = {"C": "beam_id", "D": "width", "E": "depth", "F": "length",
+                   "G": "reinforcement", "H": "stirrups"}
+
+# Header labels for mapped columns the template leaves blank
+FIELD_LABELS = {"stirrups": "STIRRUPS"}
+
+PATTERN_IN_NAME = re.compile(r"pattern-(\d)$")
+
+SHEET_TITLE = re.compile(r"[\[\]:*?/\\]")
+
+
+def _column_index(letter):
+    index = 0
+    for char in letter:
+        index = index * 26 + ord(char) - 64
+    return index
+
+
+# ==============================
+# TEMPLATE
+# ==============================
+
+def load_header_blocks(template_path=EXCEL_TEMPLATE):
+    """
+    Reads the per-pattern header blocks of the template.
+    Returns {pattern: {"rows": [[value, ...]], "merges": [(r0, c0, r1, c1)]}}
+    with rows and merges relative to the block (1-based).
+    """
+
+    from openpyxl import load_workbook
+
+    ws = load_workbook(template_path).worksheets[0]
+
+    # Pattern number in column A, merged down over the header's rows
+    a_merges = {
+        r.min_row: r.max_row for r in ws.merged_cells.ranges
+        if r.min_col == 1 and r.max_col == 1
+    }
+
+    blocks = {}
+
+    for row in range(1, ws.max_row + 1):
+        pattern = ws.cell(row, 1).value
+
+        if not isinstance(pattern, int):
+            continue
+
+        last = a_merges.get(row, row)
+        width = max(
+            (c.column for r in ws.iter_rows(min_row=row, max_row=last, max_col=40)
+             for c in r if c.value is not None),
+            default=2
+        )
+
+        rows = [
+            [ws.cell(r, c).value for c in range(1, width + 1)]
+            for r in range(row, last + 1)
+        ]
+
+        # Column-wide spacer merges (A:XFD) are not part of the header
+        merges = [
+            (r.min_row - row + 1, r.min_col, r.max_row - row + 1, r.max_col)
+            for r in ws.merged_cells.ranges
+            if r.min_row >= row and r.max_row <= last and r.min_col > 2 and r.max_col <= width
+        ]
+
+        blocks[pattern] = {"rows": rows, "merges": merges}
+
+    return blocks
+
+
+def merge_header_groups(rows, merges, groups):
+    """
+    Collapses each (first, last, label) column group of a header block
+    into one labelled cell, from below the last heading that spans
+    beyond the group (SPAN over bars and stirrups) down to the block's
+    last row. Edits `rows` in place; returns the new merges.
+    """
+
+    for first, last, label in groups:
+        c0, c1 = _column_index(first), _column_index(last)
+
+        inside = [m for m in merges if m[1] >= c0 and m[3] <= c1]
+        crossing = [m for m in merges if m not in inside and m[1] <= c1 and m[3] >= c0]
+        top = max((m[2] for m in crossing), default=0) + 1
+
+        for row in rows[top - 1:]:
+            row[c0 - 1:c1] = [None] * (c1 - c0 + 1)
+
+        rows[top - 1][c0 - 1] = label
+        merges = [m for m in merges if m not in inside or m[2] < top]
+        merges.append((top, c0, len(rows), c1))
+
+    return merges
+
+
+# ==============================
+# CELL VALUES
+# ==============================
+
+def _field(beam, field):
+    size = beam.get("size") or {}
+    stirrups = beam.get("stirrups") or {}
+
+    if field in ("width", "depth", "length"):
+        return size.get(field)
+
+    if field == "size":
+        if size.get("width") is None and size.get("depth") is None:
+            return None
+        return f"{size.get('width') or ''} X {size.get('depth') or ''}"
+
+    if field == "beam_and_size":
+        return f"{beam.get('beam_id') or ''} ({_field(beam, 'size') or '-'})"
+
+    if field == "reinforcement":
+        return ", ".join(beam.get("reinforcement") or []) or None
+
+    if field == "stirrups":
+        dia = " / ".join(stirrups.get("dia") or [])
+        spacing = " / ".join(stirrups.get("spacing") or [])
+        return f"{dia} @ {spacing}" if dia and spacing else (dia or spacing or None)
+
+    if field == "stirrup_dia":
+        return " / ".join(stirrups.get("dia") or []) or None
+
+    if field == "spacing":
+        return " / ".join(stirrups.get("spacing") or []) or None
+
+    if field == "legs":
+        legs = {re.match(r"(\d+)L", d).group(1) for d in stirrups.get("dia") or []
+                if re.match(r"\d+L", d)}
+        return ", ".join(sorted(legs)) or None
+
+    if field == "nos":
+        nos = beam.get("nos") or {}
+        return " / ".join(str(v) for v in nos.values() if v) or None
+
+    return beam.get(field)
+
+
+# ==============================
+# WRITE-ONLY WORKBOOK
+# ==============================
+
+class WorkbookExporter:
+    """
+    Streams beams into a write-only workbook, one sheet per pattern or
+    per document, each under its pattern's template header. Rows go
+    straight to disk, so memory stays flat however many beams pass.
+    """
+
+    def __init__(self, group_by="pattern", template_path=EXCEL_TEMPLATE):
+        from openpyxl import Workbook
+
+        if group_by not in ("pattern", "document"):
+            raise Exception(f"Unknown grouping: {group_by}")
+
+        self.group_by = group_by
+        self.blocks = load_header_blocks(template_path)
+        self.workbook = Workbook(write_only=True)
+        self.sheets = {}
+        self.titles = set()
+        self.count = 0
+
+    def _title(self, name):
+        title = SHEET_TITLE.sub("_", str(name))[:31]
+        base, n = title, 1
+
+        while title.lower() in self.titles:
+            n += 1
+            title = f"{base[:31 - len(str(n)) - 1]}~{n}"
+
+        self.titles.add(title.lower())
+        return title
+
+    def _sheet(self, key, pattern):
+        if key in self.sheets:
+            return self.sheets[key]
+
+        from openpyxl.worksheet.cell_range import CellRange
+
+        title = f"pattern-{pattern}" if self.group_by == "pattern" else key
+        ws = self.workbook.create_sheet(self._title(title if pattern or key else "unknown"))
+
+        block = self.blocks.get(pattern)
+        columns = EXPORT_COLUMNS.get(pattern) if block else None
+
+        if columns:
+            rows = [list(r) for r in block["rows"]]
+            width = max(len(rows[0]), max(_column_index(c) for c in columns))
+            rows = [r + [None] * (width - len(r)) for r in rows]
+
+            merges = merge_header_groups(rows, list(block["merges"]),
+                                         HEADER_GROUPS.get(pattern, []))
+
+            rows[0][0], rows[0][1] = "NO.", "DOCUMENT"
+            for letter, field in columns.items():
+                if all(r[_column_index(letter) - 1] is None for r in rows):
+                    rows[0][_column_index(letter) - 1] = FIELD_LABELS.get(field)
+
+            if len(rows) > 1:
+                merges += [(1, 1, len(rows), 1), (1, 2, len(rows), 2)]
+        else:
+            rows, merges, columns = [list(GENERIC_HEADER)], [], GENERIC_COLUMNS
+            width = len(GENERIC_HEADER)
+
+        ws.column_dimensions["B"].width = 30
+        for letter in columns:
+            ws.column_dimensions[letter].width = 24 if columns[letter] in (
+                "reinforcement", "stirrups", "beam_and_size") else 12
+
+        for row in rows:
+            ws.append(row)
+
+        for r0, c0, r1, c1 in merges:
+            ws.merged_cells.add(CellRange(min_row=r0, min_col=c0, max_row=r1, max_col=c1))
+
+        sheet = {"ws": ws, "columns": columns, "width": width, "number": 0}
+        self.sheets[key] = sheet
+
+        return sheet
+
+    def add_document(self, name, beams, pattern=None):
+        """
+        Appends one document's beams (any iterable) to its sheet.
+        """
+
+        key = str(pattern) if self.group_by == "pattern" else name
+        sheet = self._sheet(key, pattern)
+
+        for beam in beams:
+            sheet["number"] += 1
+
+            row = [None] * sheet["width"]
+            row[0], row[1] = sheet["number"], name
+
+            for letter, field in sheet["columns"].items():
+                row[_column_index(letter) - 1] = _field(beam, field)
+
+            sheet["ws"].append(row)
+            self.count += 1
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        # A write-only workbook needs at least one sheet
+        if not self.sheets:
+            self.workbook.create_sheet("empty")
+
+        tmp_path = path + ".tmp"
+        self.workbook.save(tmp_path)
+        os.replace(tmp_path, path)
+
+        print(f"📊 Exported {self.count} beams in {len(self.sheets)} sheets to {path}")
+
+        return path
+
+
+# ==============================
+# OUTPUT JSON
+# ==============================
+
+def iter_output_documents(output_dir=OUTPUT_DIR):
+    """
+    (name, pattern, beams) for every output/<name>/<name>.json, one
+    document loaded at a time.
+    """
+
+    for name in sorted(os.listdir(output_dir)):
+        json_path = os.path.join(output_dir, name, f"{name}.json")
+
+        if not os.path.isfile(json_path):
+            continue
+
+        with open(json_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        pattern = data.get("pattern")
+
+        if pattern is None:
+            match = PATTERN_IN_NAME.search(name)
+            pattern = int(match.group(1)) if match else None
+
+        yield name, pattern, data.get("beams", [])
+
+
+def export_workbook(documents, path, group_by="pattern", template_path=EXCEL_TEMPLATE):
+    """
+    Writes `documents` — (name, pattern, beams) tuples, from
+    iter_output_documents or in-memory results — to one workbook.
+    """
+
+    exporter = WorkbookExporter(group_by=group_by, template_path=template_path)
+
+    for name, pattern, beams in documents:
+        exporter.add_document(name, beams, pattern=pattern)
+
+    return exporter.save(path)
+
+
+# ==============================
+# MAIN ENTRY
+# ==============================
+
+def main():
+    """
+    python excel_export.py [pattern|document] [path.xlsx]
+    """
+
+    group_by = sys.argv[1] if len(sys.argv) > 1 else "pattern"
+    path = sys.argv[2] if len(sys.argv) > 2 else os.path.join(OUTPUT_DIR, "beams.xlsx")
+
+    export_workbook(iter_output_documents(), path, group_by=group_by)
+
+
+if __name__ == "__main__":
+    main()
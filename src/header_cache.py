@@ -0,0 +1,248 @@
+import os
+import re
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image
+
+from config import HEADER_CACHE_PATH, HEADER_CACHE_SIZE, HEADER_CACHE_SIMILARITY
+
+
+# ==============================
+# FINGERPRINTS
+# ==============================
+
+# dHash grid: HASH_SIZE x HASH_SIZE gradient bits (256-bit hash)
+HASH_SIZE = 16
+
+# Header text split into tokens; "/" is kept so "D/d" and "L/4" stay whole
+HEADER_SPLIT = re.compile(r"[^A-Z0-9/]+")
+
+# Sub-column labels (C, G, S1, D1, /D, ID): patterns 4 and 5, 6 and 7
+# share nearly every other header word and differ only in these, so
+# they must match exactly
+KEY_TOKEN = re.compile(r"^[A-Z/]{1,2}$|\d|/")
+
+
+def image_hash(image_path):
+    """
+    Difference hash of the header crop as a hex string.
+    Robust to rescaling and small raster noise, unlike a byte hash.
+    """
+
+    with Image.open(image_path) as img:
+        small = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BOX)
+
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+
+    return np.packbits(bits).tobytes().hex()
+
+
+def header_signature(texts):
+    """
+    Sorted unique header tokens of `texts`, e.g. "A B BEAM C D1 DEPTH MM ...".
+    Single letters and alphanumeric labels are kept.
+    """
+
+    found = set()
+
+    for text in texts:
+        found.update(t for t in HEADER_SPLIT.split(text.upper()) if t)
+
+    return " ".join(sorted(found))
+
+
+def header_words(pdf_path, page_number, band, dpi=300):
+    """
+    header_signature of the text-layer words inside the header band.
+    Empty for scanned sheets.
+    """
+
+    import fitz  # pymupdf
+
+    scale = dpi / 72
+    x0, y0, x1, y1 = band
+
+    with fitz.open(pdf_path) as doc:
+        page = doc[page_number - 1]
+        rotation = page.rotation_matrix
+        words = page.get_text("words")
+
+    texts = []
+
+    for w in words:
+        rect = fitz.Rect(w[:4]) * rotation
+        cx = (rect.x0 + rect.x1) / 2 * scale
+        cy = (rect.y0 + rect.y1) / 2 * scale
+
+        if x0 <= cx <= x1 and y0 <= cy <= y1:
+            texts.append(w[4])
+
+    return header_signature(texts)
+
+
+def _hash_similarity(a, b):
+    if len(a) != len(b):
+        return 0.0
+
+    distance = bin(int(a, 16) ^ int(b, 16)).count("1")
+    return 1 - distance / (len(a) * 4)
+
+
+def _word_similarity(a, b):
+    a, b = set(a.split()), set(b.split())
+
+    # A different sub-column label is a different pattern, however
+    # many words the headers share
+    if {t for t in a if KEY_TOKEN.search(t)} != {t for t in b if KEY_TOKEN.search(t)}:
+        return 0.0
+
+    return len(a & b) / len(a | b)
+
+
+# ==============================
+# PERSISTENT CACHE
+# ==============================
+
+class HeaderCache:
+    """
+    Maps header fingerprints to pattern numbers across runs.
+    Text signatures are compared when both sides have one, image hashes
+    otherwise. Least recently used entries are evicted past `max_entries`.
+    Saving merges with the file on disk, so processes sharing the cache
+    keep each other's entries.
+    """
+
+    def __init__(self, path=HEADER_CACHE_PATH, max_entries=HEADER_CACHE_SIZE,
+                 similarity=HEADER_CACHE_SIMILARITY):
+        self.path = path
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.entries = []
+        self.lock = threading.Lock()
+
+        if path:
+            self.entries = self._read()
+
+    def _read(self):
+        if not os.path.isfile(self.path):
+            return []
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f).get("entries", [])
+
+    def _similarity(self, entry, fingerprint, words):
+        if words and entry.get("words"):
+            return _word_similarity(entry["words"], words)
+
+        return _hash_similarity(entry["hash"], fingerprint)
+
+    def _closest(self, fingerprint, words):
+        best, best_score = None, self.similarity
+
+        for entry in self.entries:
+            score = self._similarity(entry, fingerprint, words)
+            if score >= best_score:
+                best, best_score = entry, score
+
+        return best
+
+    def lookup(self, fingerprint, words=""):
+        """
+        Pattern number of the closest cached header, or None when no
+        entry reaches the similarity threshold. A miss re-reads the file
+        for entries other processes saved since.
+        """
+
+        with self.lock:
+            best = self._closest(fingerprint, words)
+
+            if best is None and self.path:
+                with self._file_lock():
+                    self._merge(self._read())
+                best = self._closest(fingerprint, words)
+
+            if best is None:
+                return None
+
+            best["hits"] += 1
+            best["last_used"] = time.time()
+            self._save()
+
+            return best["pattern"]
+
+    def store(self, fingerprint, words, pattern):
+        with self.lock:
+            self.entries.append({
+                "hash": fingerprint,
+                "words": words,
+                "pattern": pattern,
+                "hits": 0,
+                "last_used": time.time()
+            })
+
+            self._save()
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        flock on <path>.lock across processes; callers hold self.lock.
+        """
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        with open(f"{self.path}.lock", "a") as lock_file:
+            try:
+                import fcntl
+            except ImportError:
+                # No flock on Windows: one process at a time there
+                fcntl = None
+
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _merge(self, entries):
+        """
+        Our entries plus those only on disk; for a fingerprint in both,
+        the most recently used one with the larger hit count.
+        """
+
+        merged = {}
+
+        for entry in entries + self.entries:
+            key = (entry["hash"], entry["words"], entry["pattern"])
+            known = merged.get(key)
+
+            if known:
+                entry = dict(max(known, entry, key=lambda e: e["last_used"]),
+                             hits=max(known["hits"], entry["hits"]))
+
+            merged[key] = entry
+
+        self.entries = sorted(merged.values(), key=lambda e: e["last_used"], reverse=True)
+        del self.entries[self.max_entries:]
+
+    def _save(self):
+        if not self.path:
+            self._merge([])
+            return
+
+        with self._file_lock():
+            self._merge(self._read())
+
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": self.entries}, f, indent=2)
+
+            os.replace(tmp_path, self.path)
@@ -1,33 +1,267 @@
-from PIL import Image
 import os
+import math
 import uuid
 
-def slice_image_horizontally(image_path, num_slices=8):
+from config import SLICE_MODE, SLICE_SCALE, VISION_MODEL
+from vision_extractor import tiling_rules, model_image_size, image_tokens
+
+
+def _temp_slice_path(image_path):
+    # Next to the source image rather than the working directory,
+    # so concurrent runs never share a temp folder
+    return os.path.join(
+        os.path.dirname(image_path), f"temp_slice_{uuid.uuid4().hex}.png"
+    )
+
+
+# Longest band row_cuts makes, relative to an equal slice
+MAX_BAND_FACTOR = 1.5
+
+
+def row_cuts(rows, height, num_slices):
     """
-    Splits image into horizontal strips.
+    Cut positions (0 … height) splitting a table into about `num_slices`
+    bands of whole rows. `rows` are table_detector.ruled_rows; a rule is
+    cut at when the digest of the row above it says so, not its position,
+    so an inserted or edited row only moves the cuts next to it and the
+    other bands keep their revisions.band_signature. Stretches without
+    row rules are split equally.
+    """
+
+    target = height / num_slices
+    rules = [(y, digest) for y, digest in rows if target / 2 <= y <= height - target / 2]
+
+    if len(rules) < 2:
+        return [round(i * target) for i in range(num_slices)] + [height]
+
+    gaps = sorted(b[0] - a[0] for a, b in zip(rules, rules[1:]))
+    every = max(round(target / gaps[len(gaps) // 2]), 1)
+
+    cuts = [0]
+    previous = None
+
+    for y, digest in rules:
+        # No content cut for too long: fall back to the last rule
+        if y - cuts[-1] > MAX_BAND_FACTOR * target and previous is not None \
+                and previous > cuts[-1]:
+            cuts.append(previous)
+
+        if y - cuts[-1] >= target / 2 and int(digest[:8], 16) % every == 0:
+            cuts.append(y)
+
+        previous = y
+
+    if height - cuts[-1] > MAX_BAND_FACTOR * target and previous > cuts[-1]:
+        cuts.append(previous)
+
+    cuts.append(height)
+    bands = []
+
+    for top, bottom in zip(cuts, cuts[1:]):
+        pieces = math.ceil((bottom - top) / (MAX_BAND_FACTOR * target))
+        bands += [top + (bottom - top) * i / pieces for i in range(pieces)]
+
+    return [round(y) for y in bands] + [height]
+
+
+def slice_image_horizontally(image_path, num_slices=8, mode=None):
+    """
+    Splits image into horizontal strips, cut on its ruled rows (row_cuts).
     Returns list of temporary slice paths.
+    In "tiled" mode `num_slices` is ignored, see slice_image_for_model.
     """
 
+    if (mode or SLICE_MODE) == "tiled":
+        return slice_image_for_model(image_path)
+
+    from PIL import Image
+    from table_detector import ruled_rows
+
     img = Image.open(image_path)
     width, height = img.size
 
-    slice_height = height // num_slices
+    cuts = row_cuts(ruled_rows(image_path), height, num_slices)
     slice_paths = []
 
+    for top, bottom in zip(cuts, cuts[1:]):
+        cropped = img.crop((0, top, width, bottom))
+
+        temp_name = _temp_slice_path(image_path)
+        cropped.save(temp_name)
+
+        slice_paths.append(temp_name)
+
+    return slice_paths
+
+
+def plan_model_slices(width, height, scale=SLICE_SCALE, model=VISION_MODEL):
+    """
+    Scale and band height (in scaled pixels) so every band is a whole
+    number of the model's patches / tiles and is sent without the model
+    shrinking it. Returns (scale, band_height).
+    """
+
+    rules = tiling_rules(model)
+    unit = rules["unit"]
+
+    # Tile models shrink anything wider than max_side → scale down to it
+    if rules["kind"] == "tile":
+        scale = min(scale, rules["max_side"] / width)
+
+    scaled_width = max(int(width * scale), 1)
+    scaled_height = max(int(height * scale), 1)
+
+    # Tallest band of whole units the model keeps as is
+    band = unit
+    while band < scaled_height and \
+            model_image_size(scaled_width, band + unit, model) == (scaled_width, band + unit):
+        band += unit
+
+    return scale, min(band, scaled_height)
+
+
+def slice_image_for_model(image_path, scale=SLICE_SCALE, model=VISION_MODEL):
+    """
+    Splits the image into bands sized to the vision model's tiling:
+    the fewest requests at `scale` of the rendered resolution, none of
+    them shrunk again by the model. Prints expected image tokens.
+    """
+
+    from PIL import Image
+
+    img = Image.open(image_path)
+    width, height = img.size
+
+    scale, band = plan_model_slices(width, height, scale, model)
+
+    scaled_width = max(int(width * scale), 1)
+    scaled_height = max(int(height * scale), 1)
+    num_slices = math.ceil(scaled_height / band)
+
+    slice_paths = []
+    tokens = []
+
     for i in range(num_slices):
-        top = i * slice_height
-        bottom = (i + 1) * slice_height if i < num_slices - 1 else height
+        top = i * band
+        bottom = min(top + band, scaled_height)
 
-        cropped = img.crop((0, top, width, bottom))
+        cropped = img.crop((0, int(top / scale), width, min(int(bottom / scale), height)))
+
+        if scale != 1:
+            cropped = cropped.resize((scaled_width, bottom - top), Image.LANCZOS)
 
-        temp_name = f"temp_slice_{uuid.uuid4().hex}.png"
+        temp_name = _temp_slice_path(image_path)
         cropped.save(temp_name)
 
         slice_paths.append(temp_name)
+        tokens.append(image_tokens(scaled_width, bottom - top, model))
+
+    print(f"📐 {num_slices} slices of {scaled_width}x{band}px at {scale:.2f} scale, "
+          f"~{tokens[0]} image tokens each ({sum(tokens)} total, {model})")
 
     return slice_paths
 
 
+# ==============================
+# BAND RENDERING
+# ==============================
+
+def slice_pdf_region(pdf_path, page_number, region, dpi, image_path,
+                     num_slices=8, mode=None):
+    """
+    Same bands as slice_image_horizontally / slice_image_for_model, but
+    each one is rendered straight from the PDF with a clip rectangle,
+    so no full-resolution page or table is ever held in memory.
+    `region` is (x0, y0, x1, y1) in pixels at `dpi`; slices are written
+    next to `image_path` (the page preview).
+    """
+
+    from pdf_to_images import render_region
+
+    x0, y0, x1, y1 = region
+    width, height = x1 - x0, y1 - y0
+    slice_paths = []
+
+    if (mode or SLICE_MODE) != "tiled":
+        from table_detector import ruled_rows, _render_dpi
+
+        # Rows are found on the preview, which is already small
+        scale = dpi / _render_dpi(image_path, pdf_path, page_number)
+        rows = ruled_rows(image_path, tuple(round(v / scale) for v in region), reduce=1)
+        cuts = row_cuts([(y * scale, digest) for y, digest in rows], height, num_slices)
+
+        for top, bottom in zip(cuts, cuts[1:]):
+            band = (x0, y0 + top, x1, y0 + bottom)
+
+            slice_paths.append(render_region(
+                pdf_path, page_number, band, dpi, _temp_slice_path(image_path)
+            ))
+
+        return slice_paths
+
+    scale, band = plan_model_slices(width, height)
+    scaled_width = max(int(width * scale), 1)
+    scaled_height = max(int(height * scale), 1)
+    num_slices = math.ceil(scaled_height / band)
+
+    for i in range(num_slices):
+        top = i * band
+        bottom = min(top + band, scaled_height)
+
+        slice_paths.append(render_region(
+            pdf_path, page_number, (x0, y0 + top / scale, x1, y0 + bottom / scale),
+            dpi * scale, _temp_slice_path(image_path), region_dpi=dpi
+        ))
+
+    print(f"📐 {num_slices} slices of {scaled_width}x{band}px at {scale:.2f} scale, "
+          f"~{image_tokens(scaled_width, band)} image tokens each ({VISION_MODEL})")
+
+    return slice_paths
+
+
+def table_slices(image_path, pdf_path, num_slices=8, dpi=300, mode=None):
+    """
+    Yields the slice paths of each table on a page, one table at a time.
+    When `image_path` is a preview (band mode, memory budget) they are rendered
+    from the PDF; otherwise tables are cropped from the page image and
+    sliced. Temporary crops are deleted once every table is yielded.
+    """
+
+    from table_detector import crop_tables, table_boxes, is_preview
+
+    if is_preview(image_path, pdf_path, dpi):
+        page_number, boxes = table_boxes(image_path, pdf_path, dpi)
+
+        for box in boxes:
+            yield slice_pdf_region(
+                pdf_path, page_number, box, dpi, image_path,
+                num_slices=num_slices, mode=mode
+            )
+        return
+
+    table_paths = crop_tables(image_path, pdf_path)
+
+    try:
+        for table_img in table_paths:
+            yield slice_image_horizontally(table_img, num_slices=num_slices, mode=mode)
+    finally:
+        delete_temp_slices([p for p in table_paths if p != image_path])
+
+
+def drop_blank_slices(slice_paths):
+    """
+    Deletes slices with no table content (whitespace, notes).
+    Returns (kept_paths, skipped_count).
+    """
+
+    from table_detector import has_table_content
+
+    kept = [p for p in slice_paths if has_table_content(p)]
+    delete_temp_slices([p for p in slice_paths if p not in kept])
+
+    return kept, len(slice_paths) - len(kept)
+
+
 def delete_temp_slices(slice_paths):
     for path in slice_paths:
         if os.path.exists(path):
@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import uuid
+import queue
+import shutil
+import threading
+import traceback
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from config import (
+    OUTPUT_DIR, API_HOST, API_PORT, API_WORKERS,
+    API_QUEUE_SIZE, API_REQUEST_TIMEOUT, API_MAX_UPLOAD_MB,
+    API_JOB_TTL_HOURS, API_MAX_FINISHED_JOBS
+)
+from auto_runner import process_file
+from watch_service import warm_up
+
+
+JOBS_DIR = os.path.join(OUTPUT_DIR, "jobs")
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _job_dir(job_id):
+    return os.path.join(JOBS_DIR, job_id)
+
+
+def _job_output_dir(job_id):
+    return os.path.join(JOBS_DIR, job_id, "output")
+
+
+# ==============================
+# JOB QUEUE
+# ==============================
+
+class JobManager:
+    """
+    Bounded queue of uploaded drawings shared by a fixed pool of worker
+    threads. Each upload keeps its file name (so manifest globs and
+    revision matching see it) inside its own jobs/<job_id>/ folder, with
+    its outputs under jobs/<job_id>/output/, so clients uploading the
+    same file name never share output folders.
+
+    Finished jobs are forgotten, folder included, once older than
+    `ttl_hours` or beyond the newest `max_finished`.
+    """
+
+    def __init__(self, workers=API_WORKERS, queue_size=API_QUEUE_SIZE,
+                 ttl_hours=API_JOB_TTL_HOURS, max_finished=API_MAX_FINISHED_JOBS):
+        self.jobs = {}
+        # job_id → finish time, oldest first
+        self.finished = {}
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_finished = max_finished
+        self.lock = threading.Lock()
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.workers = [
+            threading.Thread(target=self.worker, daemon=True)
+            for _ in range(workers)
+        ]
+
+    def start(self):
+        os.makedirs(JOBS_DIR, exist_ok=True)
+
+        for t in self.workers:
+            t.start()
+
+    def submit(self, data, filename):
+        """
+        Stores the upload and queues it. Returns the job, or None when
+        the queue is full.
+        """
+
+        self.expire()
+
+        job_id = uuid.uuid4().hex[:12]
+        extension = ".dxf" if filename.lower().endswith(".dxf") else ".pdf"
+
+        name = os.path.basename(filename.replace("\\", "/")).strip() or "upload"
+        if not name.lower().endswith(extension):
+            name += extension
+
+        file_path = os.path.join(_job_dir(job_id), name)
+
+        job = {
+            "job_id": job_id,
+            "filename": filename,
+            "status": "queued",
+            "stage": "queued",
+            "progress": {},
+            "submitted_at": _now(),
+            "outputs": []
+        }
+
+        with self.lock:
+            if self.queue.full():
+                return None
+
+            os.makedirs(_job_dir(job_id), exist_ok=True)
+
+            with open(file_path, "wb") as f:
+                f.write(data)
+
+            self.jobs[job_id] = job
+            self.queue.put((job_id, file_path))
+
+        return self.get(job_id)
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job else None
+
+    def list(self):
+        with self.lock:
+            return [
+                {"job_id": j["job_id"], "filename": j["filename"], "status": j["status"]}
+                for j in self.jobs.values()
+            ]
+
+    def _update(self, job_id, **fields):
+        with self.lock:
+            self.jobs[job_id].update(fields)
+
+    def _finish(self, job_id):
+        with self.lock:
+            self.jobs[job_id]["finished_at"] = _now()
+            self.finished[job_id] = time.time()
+
+    def expire(self):
+        """
+        Drops finished jobs past the TTL or the cap, with their folders.
+        """
+
+        with self.lock:
+            cutoff = time.time() - self.ttl_seconds
+            over = len(self.finished) - self.max_finished
+            expired = [
+                job_id for i, (job_id, t) in enumerate(self.finished.items())
+                if i < over or t < cutoff
+            ]
+
+            for job_id in expired:
+                del self.finished[job_id]
+                del self.jobs[job_id]
+
+        for job_id in expired:
+            shutil.rmtree(_job_dir(job_id), ignore_errors=True)
+
+    def worker(self):
+        while True:
+            job_id, file_path = self.queue.get()
+
+            def progress(stage, **detail):
+                self._update(job_id, stage=stage, progress=detail)
+
+            self._update(job_id, status="running", started_at=_now())
+
+            temp_folder = os.path.join(OUTPUT_DIR, "temp_detection", job_id)
+
+            try:
+                outputs = process_file(
+                    file_path,
+                    temp_folder=temp_folder,
+                    progress=progress,
+                    output_dir=_job_output_dir(job_id)
+                )
+                self._update(job_id, status="done", stage="done", outputs=outputs)
+            except Exception as e:
+                traceback.print_exc()
+                self._update(job_id, status="failed", stage="failed", error=str(e))
+            finally:
+                shutil.rmtree(temp_folder, ignore_errors=True)
+
+            self._finish(job_id)
+
+    def result(self, job_id):
+        job = self.get(job_id)
+
+        documents = {}
+
+        for name in job["outputs"]:
+            json_path = os.path.join(_job_output_dir(job_id), name, f"{name}.json")
+
+            with open(json_path, "r", encoding="utf-8") as f:
+                documents[name] = json.load(f).get("beams", [])
+
+        return {"job_id": job_id, "filename": job["filename"], "documents": documents}
+
+
+# ==============================
+# HTTP HANDLER
+# ==============================
+
+class JobHandler(BaseHTTPRequestHandler):
+    """
+    POST /jobs?filename=plan.pdf   (raw file body)  → 202 {"job_id": ...}
+    GET  /jobs                                      → job list
+    GET  /jobs/<id>                                 → status and stage progress
+    GET  /jobs/<id>/result                          → beam JSON per output
+    """
+
+    # Socket timeout per request so a stalled client can't pin a thread
+    timeout = API_REQUEST_TIMEOUT
+
+    manager = None
+
+    def _send(self, code, payload, headers=None):
+        body = json.dumps(payload, indent=2).encode("utf-8")
+
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+
+        self.wfile.write(body)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+
+        if url.path.rstrip("/") != "/jobs":
+            return self._send(404, {"error": "Not found"})
+
+        length = self.headers.get("Content-Length")
+
+        if length is None:
+            return self._send(411, {"error": "Content-Length required"})
+
+        length = int(length)
+
+        if length > API_MAX_UPLOAD_MB * 1024 * 1024:
+            return self._send(413, {"error": f"Upload exceeds {API_MAX_UPLOAD_MB} MB"})
+
+        data = self.rfile.read(length)
+        filename = parse_qs(url.query).get("filename", ["upload.pdf"])[0]
+
+        if not filename.lower().endswith(".dxf") and not data.startswith(b"%PDF"):
+            return self._send(400, {"error": "Body is not a PDF"})
+
+        job = self.manager.submit(data, os.path.basename(filename))
+
+        if job is None:
+            return self._send(503, {"error": "Job queue is full"}, {"Retry-After": "30"})
+
+        self._send(202, job)
+
+    def do_GET(self):
+        parts = [p for p in urlparse(self.path).path.split("/") if p]
+
+        if parts == ["jobs"]:
+            return self._send(200, self.manager.list())
+
+        if len(parts) < 2 or parts[0] != "jobs" or len(parts) > 3:
+            return self._send(404, {"error": "Not found"})
+
+        job = self.manager.get(parts[1])
+
+        if job is None:
+            return self._send(404, {"error": "Unknown job"})
+
+        if len(parts) == 2:
+            return self._send(200, job)
+
+        if parts[2] != "result":
+            return self._send(404, {"error": "Not found"})
+
+        if job["status"] != "done":
+            return self._send(409, {"error": f"Job is {job['status']}"})
+
+        self._send(200, self.manager.result(job["job_id"]))
+
+
+# ==============================
+# MAIN ENTRY
+# ==============================
+
+def main():
+    warm_up()
+
+    manager = JobManager()
+    manager.start()
+
+    JobHandler.manager = manager
+
+    server = ThreadingHTTPServer((API_HOST, API_PORT), JobHandler)
+    print(f"🚀 Job API listening on http://{API_HOST}:{API_PORT}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Job API stopped")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,14 @@
 import os
 import json
-from tqdm import tqdm
 
 from config import INPUT_DIR, OUTPUT_DIR
-from pdf_to_images import convert_pdf_to_images
-from vision_extractor import extract_from_image
+from pdf_to_images import convert_pdf_to_images, page_image_dpi
+from vision_extractor import get_extractor
+from beam_validator import extract_validated
+from image_slicer import delete_temp_slices
+from table_detector import crop_tables
+from beam_merger import BeamMerger
+from output_writer import BeamWriter
 
 
 # ==============================
@@ -80,70 +84,71 @@ def clean_stirrups(stirrups):
     }
 
 
+def clean_beam(beam):
+    """
+    Final cleanup of a merged beam, also applied to CAD schedules
+    (dxf_extractor).
+    """
+
+    beam["reinforcement"] = normalize_reinforcement(
+        beam.get("reinforcement", [])
+    )
+
+    beam["stirrups"] = clean_stirrups(
+        beam.get("stirrups", {})
+    )
+
+    return beam
+
+
 # ==============================
 # PROCESS PDF
 # ==============================
 
-def process_pdf(pdf_path):
-    file_name = os.path.splitext(os.path.basename(pdf_path))[0]
+def process_pdf(pdf_path, pages=None, output_name=None, output_dir=None,
+                dpi=300, extract=None, backend=None):
+    file_name = output_name or os.path.splitext(os.path.basename(pdf_path))[0]
 
-    file_output_folder = os.path.join(OUTPUT_DIR, file_name)
+    file_output_folder = os.path.join(output_dir or OUTPUT_DIR, file_name)
     os.makedirs(file_output_folder, exist_ok=True)
 
-    print(f"\n📄 Converting {file_name}.pdf to images...")
-    image_paths = convert_pdf_to_images(pdf_path, file_output_folder)
+    print(f"\n📄 Converting {os.path.basename(pdf_path)} to images...")
+    image_paths = convert_pdf_to_images(pdf_path, file_output_folder, pages=pages, dpi=page_image_dpi(dpi))
 
     prompt = load_prompt()
+    extract = extract or get_extractor(2, backend)
     all_beams = []
 
-    for img_path in tqdm(image_paths):
-        result = extract_from_image(img_path, prompt)
-
-        try:
-            parsed = json.loads(result)
-            if "beams" in parsed:
-                all_beams.extend(parsed["beams"])
-        except:
-            print("⚠ JSON parse failed")
-
-    # Deduplicate beams
-    unique_beams = {}
-
-    for beam in all_beams:
-        beam_id = beam.get("beam_id")
-        if not beam_id:
-            continue
-
-        if beam_id not in unique_beams:
-            unique_beams[beam_id] = beam
-        else:
-            existing = unique_beams[beam_id]
-            existing["reinforcement"] += beam.get("reinforcement", [])
-            existing["stirrups"]["dia"] += beam.get("stirrups", {}).get("dia", [])
-            existing["stirrups"]["spacing"] += beam.get("stirrups", {}).get("spacing", [])
+    from tqdm import tqdm
 
-    final_beams = []
+    for img_path in tqdm(image_paths):
 
-    for beam in unique_beams.values():
+        # ✂ Only the schedule tables go to the model
+        table_paths = crop_tables(img_path, pdf_path, dpi=dpi)
 
-        beam["reinforcement"] = normalize_reinforcement(
-            beam.get("reinforcement", [])
-        )
+        for table_img in table_paths:
+            result = extract_validated(table_img, prompt, extract)
 
-        beam["stirrups"] = clean_stirrups(
-            beam.get("stirrups", {})
-        )
+            try:
+                parsed = json.loads(result)
+                if "beams" in parsed:
+                    all_beams.extend(parsed["beams"])
+            except:
+                print("⚠ JSON parse failed")
 
-        final_beams.append(beam)
+        delete_temp_slices([p for p in table_paths if p != img_path])
 
-    final_output = {"beams": final_beams}
+    # Deduplicate beams
+    merger = BeamMerger()
+    merger.extend(all_beams)
+    merger.report()
 
-    output_file = os.path.join(file_output_folder, f"{file_name}.json")
+    writer = BeamWriter(file_output_folder, file_name, pattern=2)
 
-    with open(output_file, "w") as f:
-        json.dump(final_output, f, indent=2)
+    for beam in merger.merged_beams():
+        writer.write([clean_beam(beam)])
 
-    print(f"✅ Output saved to {output_file}")
+    writer.finalize()
 
 
 # ==============================
@@ -1,11 +1,13 @@
 import os
 import json
-from tqdm import tqdm
 
 from config import INPUT_DIR, OUTPUT_DIR
-from pdf_to_images import convert_pdf_to_images
-from vision_extractor import extract_from_image
-from image_slicer import slice_image_horizontally, delete_temp_slices
+from pdf_to_images import convert_pdf_to_images, page_image_dpi
+from vision_extractor import get_extractor
+from beam_validator import extract_validated
+from image_slicer import table_slices, drop_blank_slices, delete_temp_slices
+from beam_merger import BeamMerger
+from output_writer import BeamWriter
 
 
 # ==============================
@@ -89,98 +91,84 @@ def safe_parse_json(result, slice_img):
         return None
 
 
+def clean_beam(beam):
+    """
+    Final cleanup of a merged beam, also applied to CAD schedules
+    (dxf_extractor).
+    """
+
+    beam["reinforcement"] = normalize_reinforcement(
+        beam["reinforcement"]
+    )
+
+    beam["stirrups"]["dia"] = sorted(beam["stirrups"]["dia"])
+
+    beam["stirrups"]["spacing"] = sorted(beam["stirrups"]["spacing"])
+
+    return beam
+
+
 # ==============================
 # PROCESS SINGLE PDF
 # ==============================
 
-def process_pdf(pdf_path):
-    file_name = os.path.splitext(os.path.basename(pdf_path))[0]
+def process_pdf(pdf_path, pages=None, output_name=None, output_dir=None,
+                dpi=300, extract=None, backend=None, num_slices=3):
+    file_name = output_name or os.path.splitext(os.path.basename(pdf_path))[0]
 
-    file_output_folder = os.path.join(OUTPUT_DIR, file_name)
+    file_output_folder = os.path.join(output_dir or OUTPUT_DIR, file_name)
     os.makedirs(file_output_folder, exist_ok=True)
 
-    print(f"\n📄 Converting {file_name}.pdf to images...")
-    image_paths = convert_pdf_to_images(pdf_path, file_output_folder)
+    print(f"\n📄 Converting {os.path.basename(pdf_path)} to images...")
+    image_paths = convert_pdf_to_images(pdf_path, file_output_folder, pages=pages, dpi=page_image_dpi(dpi))
 
     prompt = load_prompt()
+    extract = extract or get_extractor(4, backend)
     all_beams = []
+    skipped = 0
+
+    from tqdm import tqdm
 
     for img_path in tqdm(image_paths):
 
+        # ✂ Only the schedule tables go to the model
         # 🔥 Use 3 slices (more stable)
-        slice_paths = slice_image_horizontally(img_path, num_slices=3)
+        for slice_paths in table_slices(img_path, pdf_path, num_slices=num_slices, dpi=dpi):
+
+            # ⏭ Blank strips and notes never reach the model
+            slice_paths, blank = drop_blank_slices(slice_paths)
+            skipped += blank
 
-        for slice_img in slice_paths:
+            for slice_img in slice_paths:
 
-            result = extract_from_image(slice_img, prompt)
+                result = extract_validated(slice_img, prompt, extract)
 
-            parsed = safe_parse_json(result, slice_img)
+                parsed = safe_parse_json(result, slice_img)
 
-            if parsed and "beams" in parsed:
-                all_beams.extend(parsed["beams"])
+                if parsed and "beams" in parsed:
+                    all_beams.extend(parsed["beams"])
 
-        delete_temp_slices(slice_paths)
+            delete_temp_slices(slice_paths)
+
+    print(f"⏭ Skipped {skipped} slices without table content")
 
     # ==============================
     # MERGE & DEDUPLICATE BEAMS
     # ==============================
 
-    unique_beams = {}
-
-    for beam in all_beams:
-
-        beam_id = beam.get("beam_id")
-        if not beam_id:
-            continue
-
-        if beam_id not in unique_beams:
-            unique_beams[beam_id] = beam
-        else:
-            existing = unique_beams[beam_id]
-
-            # Merge reinforcement
-            merged_reinf = existing.get("reinforcement", []) + beam.get("reinforcement", [])
-            existing["reinforcement"] = normalize_reinforcement(merged_reinf)
-
-            # Merge stirrup dia
-            existing["stirrups"]["dia"] = list(
-                set(existing["stirrups"].get("dia", []) + beam["stirrups"].get("dia", []))
-            )
-
-            # Merge stirrup spacing
-            existing["stirrups"]["spacing"] = list(
-                set(existing["stirrups"].get("spacing", []) + beam["stirrups"].get("spacing", []))
-            )
-
-            unique_beams[beam_id] = existing
+    merger = BeamMerger()
+    merger.extend(all_beams)
+    merger.report()
 
     # ==============================
-    # FINAL CLEANUP PASS
+    # FINAL CLEANUP PASS (ONCE PER BEAM)
     # ==============================
 
-    for beam in unique_beams.values():
-        beam["reinforcement"] = normalize_reinforcement(
-            beam.get("reinforcement", [])
-        )
-
-        beam["stirrups"]["dia"] = sorted(
-            list(set(beam["stirrups"].get("dia", [])))
-        )
-
-        beam["stirrups"]["spacing"] = sorted(
-            list(set(beam["stirrups"].get("spacing", [])))
-        )
-
-    final_output = {
-        "beams": list(unique_beams.values())
-    }
-
-    output_file = os.path.join(file_output_folder, f"{file_name}.json")
-
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(final_output, f, indent=2)
+    merged_beams = [clean_beam(beam) for beam in merger.merged_beams()]
 
-    print(f"✅ Output saved to {output_file}")
+    writer = BeamWriter(file_output_folder, file_name, pattern=4)
+    writer.write(merged_beams)
+    writer.finalize()
 
 
 # ==============================
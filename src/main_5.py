@@ -1,10 +1,13 @@
 import os
 import json
-from tqdm import tqdm
 
 from config import INPUT_DIR, OUTPUT_DIR
-from pdf_to_images import convert_pdf_to_images
-from vision_extractor import extract_from_image
+from pdf_to_images import convert_pdf_to_images, page_image_dpi
+from vision_extractor import get_extractor
+from beam_validator import extract_validated
+from image_slicer import delete_temp_slices
+from table_detector import crop_tables
+from output_writer import BeamWriter
 
 
 # ==============================
@@ -41,48 +44,62 @@ def safe_parse_json(result):
         return None
 
 
+def clean_beam(beam):
+    """
+    None for empty rows (like B6/B7 null rows); also applied to CAD
+    schedules (dxf_extractor).
+    """
+
+    if beam["size"]["width"] is None and not beam["reinforcement"]:
+        return None
+
+    return beam
+
+
 # ==============================
 # PROCESS PDF (NO SLICING)
 # ==============================
 
-def process_pdf(pdf_path):
+def process_pdf(pdf_path, pages=None, output_name=None, output_dir=None,
+                dpi=300, extract=None, backend=None):
 
-    file_name = os.path.splitext(os.path.basename(pdf_path))[0]
-    file_output_folder = os.path.join(OUTPUT_DIR, file_name)
+    file_name = output_name or os.path.splitext(os.path.basename(pdf_path))[0]
+    file_output_folder = os.path.join(output_dir or OUTPUT_DIR, file_name)
     os.makedirs(file_output_folder, exist_ok=True)
 
-    print(f"\n📄 Converting {file_name}.pdf to images...")
-    image_paths = convert_pdf_to_images(pdf_path, file_output_folder)
+    print(f"\n📄 Converting {os.path.basename(pdf_path)} to images...")
+    image_paths = convert_pdf_to_images(pdf_path, file_output_folder, pages=pages, dpi=page_image_dpi(dpi))
+
+    # Combined mode passes an extractor holding the answer it already fetched
+    extract = extract or get_extractor(5, backend)
 
     prompt = load_prompt()
 
-    all_beams = []
+    writer = BeamWriter(file_output_folder, file_name, pattern=5)
+
+    from tqdm import tqdm
 
     for img_path in tqdm(image_paths):
 
-        result = extract_from_image(img_path, prompt)
-        parsed = safe_parse_json(result)
+        # ✂ Only the schedule tables go to the model
+        table_paths = crop_tables(img_path, pdf_path, dpi=dpi)
 
-        if parsed and "beams" in parsed:
-            all_beams.extend(parsed["beams"])
+        for table_img in table_paths:
+            result = extract_validated(table_img, prompt, extract)
+            parsed = safe_parse_json(result)
 
-    # Remove empty beams (like B6/B7 null rows)
-    cleaned_beams = []
-    for beam in all_beams:
-        if beam["size"]["width"] is None and not beam["reinforcement"]:
-            continue
-        cleaned_beams.append(beam)
+            if not parsed or "beams" not in parsed:
+                continue
 
-    final_output = {
-        "beams": cleaned_beams
-    }
+            # Remove empty beams (like B6/B7 null rows)
+            cleaned_beams = [b for b in map(clean_beam, parsed["beams"]) if b]
 
-    output_file = os.path.join(file_output_folder, f"{file_name}.json")
+            # Page beams are final here, stream them out
+            writer.write(cleaned_beams)
 
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(final_output, f, indent=2)
+        delete_temp_slices([p for p in table_paths if p != img_path])
 
-    print(f"✅ Output saved to {output_file}")
+    writer.finalize()
 
 
 # ==============================
@@ -1,10 +1,13 @@
 import os
 import json
-from tqdm import tqdm
 
 from config import INPUT_DIR, OUTPUT_DIR
-from pdf_to_images import convert_pdf_to_images
-from vision_extractor import extract_from_image
+from pdf_to_images import convert_pdf_to_images, page_image_dpi
+from vision_extractor import get_extractor
+from beam_validator import extract_validated
+from image_slicer import delete_temp_slices
+from table_detector import crop_tables
+from output_writer import BeamWriter
 
 
 # ==============================
@@ -41,54 +44,71 @@ def normalize_reinforcement(reinf_list):
     return sorted(list(cleaned))
 
 
+def clean_beam(beam):
+    """
+    Per-beam cleanup (no cross merge), also applied to CAD schedules
+    (dxf_extractor).
+    """
+
+    beam["reinforcement"] = normalize_reinforcement(beam["reinforcement"])
+    beam["stirrups"]["dia"] = sorted(list(set(beam["stirrups"]["dia"])))
+    beam["stirrups"]["spacing"] = sorted(list(set(beam["stirrups"]["spacing"])))
+
+    return beam
+
+
 # ==============================
 # PROCESS PDF
 # ==============================
 
-def process_pdf(pdf_path):
-    file_name = os.path.splitext(os.path.basename(pdf_path))[0]
+def process_pdf(pdf_path, pages=None, output_name=None, output_dir=None,
+                dpi=300, extract=None, backend=None):
+    file_name = output_name or os.path.splitext(os.path.basename(pdf_path))[0]
 
-    file_output_folder = os.path.join(OUTPUT_DIR, file_name)
+    file_output_folder = os.path.join(output_dir or OUTPUT_DIR, file_name)
     os.makedirs(file_output_folder, exist_ok=True)
 
-    print(f"\n📄 Converting {file_name}.pdf to images...")
-    image_paths = convert_pdf_to_images(pdf_path, file_output_folder)
+    print(f"\n📄 Converting {os.path.basename(pdf_path)} to images...")
+    image_paths = convert_pdf_to_images(pdf_path, file_output_folder, pages=pages, dpi=page_image_dpi(dpi))
+
+    # Combined mode passes an extractor holding the answer it already fetched
+    extract = extract or get_extractor(6, backend)
 
     prompt = load_prompt()
-    all_beams = []
+    writer = BeamWriter(file_output_folder, file_name, pattern=6)
+
+    from tqdm import tqdm
 
     for img_path in tqdm(image_paths):
 
-        result = extract_from_image(img_path, prompt)
-        result = result.strip()
+        # ✂ Only the schedule tables go to the model
+        table_paths = crop_tables(img_path, pdf_path, dpi=dpi)
 
-        if result.startswith("{"):
-            try:
-                parsed = json.loads(result)
-                if "beams" in parsed:
-                    all_beams.extend(parsed["beams"])
-            except:
-                print("⚠ Invalid JSON:", img_path)
-        else:
-            print("⚠ Non-JSON response skipped:", img_path)
+        for table_img in table_paths:
+            result = extract_validated(table_img, prompt, extract)
+            result = result.strip()
 
-    # ==============================
-    # CLEAN PER BEAM (NO CROSS MERGE)
-    # ==============================
+            page_beams = []
 
-    for beam in all_beams:
-        beam["reinforcement"] = normalize_reinforcement(beam["reinforcement"])
-        beam["stirrups"]["dia"] = sorted(list(set(beam["stirrups"]["dia"])))
-        beam["stirrups"]["spacing"] = sorted(list(set(beam["stirrups"]["spacing"])))
+            if result.startswith("{"):
+                try:
+                    parsed = json.loads(result)
+                    if "beams" in parsed:
+                        page_beams = parsed["beams"]
+                except:
+                    print("⚠ Invalid JSON:", table_img)
+            else:
+                print("⚠ Non-JSON response skipped:", table_img)
 
-    final_output = {"beams": all_beams}
+            # ==============================
+            # CLEAN PER BEAM (NO CROSS MERGE)
+            # ==============================
 
-    output_file = os.path.join(file_output_folder, f"{file_name}.json")
+            writer.write([clean_beam(beam) for beam in page_beams])
 
-    with open(output_file, "w") as f:
-        json.dump(final_output, f, indent=2)
+        delete_temp_slices([p for p in table_paths if p != img_path])
 
-    print(f"✅ Output saved to {output_file}")
+    writer.finalize()
 
 
 # ==============================
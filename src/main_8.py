@@ -110,11 +110,12 @@
 
 import os
 import json
-from tqdm import tqdm
 
 from config import INPUT_DIR, OUTPUT_DIR
 from pdf_to_images import convert_pdf_to_images
-from vision_extractor import extract_from_image
+from vision_extractor import get_extractor
+from beam_validator import extract_validated
+from output_writer import BeamWriter
 
 
 # ==============================
@@ -202,20 +203,29 @@ def clean_beam(beam):
 # PROCESS SINGLE PDF
 # ==============================
 
-def process_pdf(pdf_path):
-    file_name = os.path.splitext(os.path.basename(pdf_path))[0]
+def process_pdf(pdf_path, pages=None, output_name=None, output_dir=None,
+                dpi=300, extract=None, backend=None):
+    file_name = output_name or os.path.splitext(os.path.basename(pdf_path))[0]
 
-    file_output_folder = os.path.join(OUTPUT_DIR, file_name)
+    file_output_folder = os.path.join(output_dir or OUTPUT_DIR, file_name)
     os.makedirs(file_output_folder, exist_ok=True)
 
-    print(f"\n📄 Converting {file_name}.pdf to images...")
-    image_paths = convert_pdf_to_images(pdf_path, file_output_folder)
+    print(f"\n📄 Converting {os.path.basename(pdf_path)} to images...")
+    # The whole page goes to the model, there are no table crops to
+    # re-render at full DPI: render it at `dpi` whatever the memory budget
+    image_paths = convert_pdf_to_images(pdf_path, file_output_folder, pages=pages, dpi=dpi,
+                                        budget_mb=0)
+
+    # Combined mode passes an extractor holding the answer it already fetched
+    extract = extract or get_extractor(8, backend)
 
     prompt = load_prompt()
-    all_beams = []
+    writer = BeamWriter(file_output_folder, file_name, pattern=8)
+
+    from tqdm import tqdm
 
     for img_path in tqdm(image_paths):
-        result = extract_from_image(img_path, prompt)
+        result = extract_validated(img_path, prompt, extract)
 
         try:
             # 🔒 Extract JSON safely even if model adds spaces/newlines
@@ -225,8 +235,7 @@ def process_pdf(pdf_path):
 
             parsed = json.loads(cleaned_json)
 
-            if "beams" in parsed:
-                all_beams.extend(parsed["beams"])
+            page_beams = parsed.get("beams", [])
 
         except Exception as e:
             print("⚠ JSON parse failed.")
@@ -234,19 +243,10 @@ def process_pdf(pdf_path):
             print(result)
             raise e  # 🔥 do NOT silently continue
 
-    # FINAL CLEAN
-    cleaned_beams = []
-    for beam in all_beams:
-        cleaned_beams.append(clean_beam(beam))
-
-    final_output = {"beams": cleaned_beams}
-
-    output_file = os.path.join(file_output_folder, f"{file_name}.json")
-
-    with open(output_file, "w") as f:
-        json.dump(final_output, f, indent=2)
+        # CLEAN + STREAM PAGE BEAMS
+        writer.write([clean_beam(beam) for beam in page_beams])
 
-    print(f"✅ Output saved to {output_file}")
+    writer.finalize()
 
 
 
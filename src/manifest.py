@@ -0,0 +1,77 @@
+import os
+import json
+import fnmatch
+
+from config import MANIFEST_PATH
+
+
+# Per-document settings forwarded to main_N.process_pdf
+OVERRIDE_KEYS = ("dpi", "num_slices", "backend")
+
+
+# ==============================
+# LOAD
+# ==============================
+
+def load_manifest(path=MANIFEST_PATH):
+    """
+    Reads the drawing register. Entries are checked in order, the first
+    matching file name or glob wins:
+
+    {
+      "documents": [
+        {"match": "S-201.pdf", "pattern": 1, "num_slices": 8},
+        {"match": "ABC-BS-*.pdf", "pattern": 3, "dpi": 200},
+        {"match": "SCAN-*.pdf", "pattern": 5, "backend": "ocr"},
+        {"match": "URGENT-*.pdf", "priority": 10, "project": "TOWER-B"}
+      ]
+    }
+
+    "pattern" may be left out to keep detection but apply the overrides.
+    "priority" (higher runs sooner) and "project" only affect scheduling.
+    Returns [] when there is no manifest.
+    """
+
+    if not path or not os.path.isfile(path):
+        return []
+
+    with open(path, "r", encoding="utf-8") as f:
+        entries = json.load(f).get("documents", [])
+
+    for entry in entries:
+        if "match" not in entry:
+            raise Exception(f"Manifest entry without 'match': {entry}")
+
+        pattern = entry.get("pattern")
+        if pattern is not None and pattern not in range(1, 9):
+            raise Exception(f"Manifest pattern must be 1-8: {entry}")
+
+        if not isinstance(entry.get("priority", 0), (int, float)):
+            raise Exception(f"Manifest priority must be a number: {entry}")
+
+    return entries
+
+
+def lookup(entries, file_path):
+    """
+    First entry matching the file name (case-insensitive), or None.
+    """
+
+    name = os.path.basename(file_path).lower()
+
+    for entry in entries:
+        if fnmatch.fnmatch(name, entry["match"].lower()):
+            return entry
+
+    return None
+
+
+def overrides(entry):
+    """
+    {"dpi": 200, "num_slices": 8} from an entry, leaving out unset keys.
+    """
+
+    if not entry:
+        return {}
+
+    return {key: entry[key] for key in OVERRIDE_KEYS if key in entry}
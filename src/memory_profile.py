@@ -0,0 +1,178 @@
+import os
+import time
+import threading
+import tracemalloc
+
+from config import MEMORY_PROFILE, RSS_SAMPLE_SECONDS
+
+
+MB = 1024 * 1024
+
+
+# ==============================
+# RESIDENT MEMORY
+# ==============================
+
+def rss_bytes():
+    """
+    Current resident set size of this process, or None where the
+    platform doesn't expose it (/proc is Linux only).
+    """
+
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RssSampler(threading.Thread):
+    """
+    Samples RSS in the background: PyMuPDF pixmaps and PIL buffers are
+    allocated in C and never show up in tracemalloc.
+    """
+
+    def __init__(self, interval=RSS_SAMPLE_SECONDS):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = rss_bytes() or 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, rss_bytes() or 0)
+
+    def reset(self):
+        self.peak = rss_bytes() or 0
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+# ==============================
+# STAGE PROFILER
+# ==============================
+
+# tracemalloc is process-wide: the first profiler to start starts it and
+# the last one to finish stops it (unless it was tracing before them,
+# e.g. under -X tracemalloc). Its peak is process-wide too, so a stage
+# only gets a heap peak if no other profiler started or ran during it
+_tracing_users = 0
+_tracing_starts = 0
+_tracing_owned = False
+_tracing_lock = threading.Lock()
+
+
+def _start_tracing():
+    global _tracing_users, _tracing_starts, _tracing_owned
+
+    with _tracing_lock:
+        if _tracing_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_owned = True
+        _tracing_users += 1
+        _tracing_starts += 1
+
+
+def _solo_tracing():
+    """
+    Start count if this is the only profiler tracing, else None.
+    """
+
+    with _tracing_lock:
+        return _tracing_starts if _tracing_users == 1 else None
+
+
+def _stop_tracing():
+    global _tracing_users, _tracing_owned
+
+    with _tracing_lock:
+        _tracing_users -= 1
+        if _tracing_users == 0 and _tracing_owned:
+            tracemalloc.stop()
+            _tracing_owned = False
+
+
+class StageProfiler:
+    """
+    Wall time, Python heap peak (tracemalloc) and RSS peak per pipeline
+    stage. mark(stage) closes the running stage and starts the next, so
+    it can sit behind the progress callback.
+    Both peaks are process-wide: the heap peak is left out (None) for
+    stages that overlapped another profiled job, the RSS peak includes
+    whatever else the process was running.
+    Does nothing unless `enabled` (MEMORY_PROFILE).
+    """
+
+    def __init__(self, name, enabled=MEMORY_PROFILE):
+        self.name = name
+        self.enabled = enabled
+        self.stages = []
+        self.current = None
+        self.sampler = None
+        self.tracing = False
+        self.solo = None
+
+    def mark(self, stage):
+        if not self.enabled:
+            return
+
+        if self.sampler is None:
+            _start_tracing()
+            self.tracing = True
+
+            self.sampler = RssSampler()
+            self.sampler.start()
+
+        self._close()
+
+        # Resetting the peak mid-stage would distort a concurrent job's
+        self.solo = _solo_tracing()
+        if self.solo is not None:
+            tracemalloc.reset_peak()
+
+        self.sampler.reset()
+        self.current = (stage, time.perf_counter())
+
+    def _close(self):
+        if self.current is None:
+            return
+
+        stage, started = self.current
+
+        heap_peak = None
+        if self.solo is not None and _solo_tracing() == self.solo:
+            heap_peak = round(tracemalloc.get_traced_memory()[1] / MB, 1)
+
+        self.stages.append({
+            "stage": stage,
+            "seconds": round(time.perf_counter() - started, 2),
+            "heap_peak_mb": heap_peak,
+            "rss_peak_mb": round(max(self.sampler.peak, rss_bytes() or 0) / MB, 1)
+        })
+        self.current = None
+
+    def finish(self):
+        """
+        Prints the per-stage table and returns the rows.
+        """
+
+        if not self.enabled or self.sampler is None:
+            return []
+
+        self._close()
+        self.sampler.stop()
+
+        if self.tracing:
+            _stop_tracing()
+            self.tracing = False
+
+        print(f"⏱ {self.name}")
+        for row in self.stages:
+            heap = row["heap_peak_mb"]
+            heap = f"{heap:8.1f} MB" if heap is not None else "  shared   "
+            print(f"   {row['stage']:<12} {row['seconds']:8.2f} s   "
+                  f"heap {heap}   process rss {row['rss_peak_mb']:8.1f} MB")
+
+        return self.stages
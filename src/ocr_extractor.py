@@ -0,0 +1,356 @@
+import re
+import json
+
+from PIL import Image
+
+from config import OCR_CONFIG, OCR_MIN_CONFIDENCE
+from beam_merger import canonical_beam_id
+from beam_validator import BEAM_ID
+from table_detector import ROW_RULE_FRACTION, _ink, _line_mask, _runs, find_regions_in_image
+
+
+# ==============================
+# COLUMN MAPPING
+# ==============================
+
+# Header cell text → beam field, first match wins. A cell whose header
+# matches nothing (or a rule mapping to None) takes the field of the
+# header spanning it (e.g. the A / B / C sub-columns under TOP
+# REINFORCEMENT). "ignore" drops a column.
+COMMON_COLUMNS = (
+    (r"\bS\.?\s*NO\b|\bSR\b|REMARK|NOTE", "ignore"),
+    (r"WIDTH", "width"),
+    (r"DEPTH", "depth"),
+    (r"SIZE|\bB\s*[X×]\s*D\b", "size"),
+    (r"SPAN|LENGTH", "length"),
+    (r"SPACING|C/C", "spacing"),
+    (r"LEGS", "legs"),
+    (r"STIRRUP|SHEAR", "stirrups"),
+    (r"TOP|BOTTOM|\bBOT\b|REINF|EXTRA|CURTAIL|STRAIGHT", "reinforcement"),
+    (r"BEAM|MARK", "beam_id"),
+)
+
+# Patterns 6 / 7: BEAM SIZE over BREADTH / DEPTH over B / D, SPAN over
+# the bars (LEFT SUPPORT / MID SPAN / RIGHT SUPPORT) and the stirrups
+# (NO OF LEGS / DIA / … SPACING), side face bars kept out
+SPAN_TABLE_COLUMNS = (
+    (r"SIDE\s*FACE", "ignore"),
+    (r"SPACING", "spacing"),
+    (r"^DIA", "stirrup_dia"),
+    (r"^B$", "width"),
+    (r"^D$", "depth"),
+    (r"SUPPORT|MID", "reinforcement"),
+)
+
+# Pattern-specific rules, checked before the common ones.
+# Pattern 8 lists beams along columns, not rows, and has no mapping.
+PATTERN_COLUMNS = {
+    # LEFT / MID SPAN / RIGHT under both the bars and SHEAR STIRRUPS:
+    # they belong to whichever header spans them, MID SPAN is no length
+    1: (
+        (r"^(?:LEFT|MID\s*SPAN|RIGHT)$", None),
+        (r"^B$", "width"),
+        (r"^D$", "depth"),
+    ),
+    2: (),
+    3: (),
+    4: ((r"^D[12]\b", "ignore"),),
+    5: (),
+    6: SPAN_TABLE_COLUMNS,
+    7: SPAN_TABLE_COLUMNS,
+}
+
+# A header row names at least this many different fields, in at least
+# this share of its cells (data rows can mention TOP or C/C in passing)
+MIN_HEADER_FIELDS = 2
+MIN_HEADER_SHARE = 0.5
+
+# Column rules span at least this fraction of their row's height
+COLUMN_RULE_FRACTION = 0.9
+
+# Thinner bands are the gap between doubled rules, not rows
+MIN_ROW_HEIGHT = 8
+
+NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def column_rules(pattern_number):
+    if pattern_number not in PATTERN_COLUMNS:
+        raise Exception(f"OCR backend has no column mapping for pattern {pattern_number}")
+
+    return PATTERN_COLUMNS[pattern_number] + COMMON_COLUMNS
+
+
+def _column_field(text, rules):
+    text = " ".join(text.upper().split())
+
+    for pattern, field in rules:
+        if re.search(pattern, text):
+            return field
+
+    return None
+
+
+# ==============================
+# TABLE GRID
+# ==============================
+
+def _grid(dark):
+    """
+    Rows between full-width rules and, per row, the spans between its
+    column rules. Returns ([((y0, y1), [(x0, x1), ...])], rule_mask).
+    """
+
+    height, width = dark.shape
+
+    h_mask = _line_mask(dark, max(int(width * ROW_RULE_FRACTION), 1), axis=1)
+    rules = h_mask.copy()
+    rows = []
+
+    for y0, y1 in _runs(~h_mask.any(axis=1)):
+        if y1 - y0 < MIN_ROW_HEIGHT:
+            continue
+
+        v_mask = _line_mask(dark[y0:y1], max(int((y1 - y0) * COLUMN_RULE_FRACTION), 1), axis=0)
+        rules[y0:y1] |= v_mask
+
+        cells = [(x0, x1) for x0, x1 in _runs(~v_mask.any(axis=0)) if x1 - x0 >= MIN_ROW_HEIGHT]
+        rows.append(((y0, y1), cells))
+
+    return rows, rules
+
+
+def _read_words(img):
+    """
+    [(text, center_x, center_y, height)] for each word tesseract reads.
+    """
+
+    import pytesseract
+
+    data = pytesseract.image_to_data(img, config=OCR_CONFIG, output_type=pytesseract.Output.DICT)
+    words = []
+
+    for text, conf, left, top, w, h in zip(
+        data["text"], data["conf"], data["left"], data["top"], data["width"], data["height"]
+    ):
+        if text.strip() and float(conf) >= OCR_MIN_CONFIDENCE:
+            words.append((text.strip(), left + w / 2, top + h / 2, h))
+
+    return words
+
+
+def _cell_lines(words):
+    """
+    Words of one cell → text lines, top to bottom.
+    """
+
+    lines = []
+
+    for text, x, y, h in sorted(words, key=lambda w: w[2]):
+        if lines and y - lines[-1][0] <= h / 2:
+            lines[-1][1].append((x, text))
+        else:
+            lines.append([y, [(x, text)]])
+
+    return [" ".join(t for _, t in sorted(line)) for _, line in lines]
+
+
+def read_rows(img):
+    """
+    Cell text lines of each ruled row: [[(x0, x1, [line, ...]), ...]].
+    """
+
+    dark = _ink(img)
+    rows, rules = _grid(dark)
+
+    # Ruling lines read as | and _ noise, blank them before OCR
+    pixels = img.load()
+    for y, x in zip(*rules.nonzero()):
+        pixels[int(x), int(y)] = (255, 255, 255)
+
+    words = _read_words(img)
+    table = []
+
+    for (y0, y1), cells in rows:
+        row_words = [w for w in words if y0 <= w[2] < y1]
+        row = [
+            (x0, x1, _cell_lines([w for w in row_words if x0 <= w[1] < x1]))
+            for x0, x1 in cells
+        ]
+
+        if any(lines for _, _, lines in row):
+            table.append(row)
+
+    return table
+
+
+# ==============================
+# ROWS → BEAMS
+# ==============================
+
+def _number(text):
+    match = NUMBER.search(text or "")
+
+    if not match:
+        return None
+
+    value = float(match.group())
+    return int(value) if value.is_integer() else value
+
+
+def _beam_ids(lines):
+    # Stacked IDs sharing one data row become one beam each
+    ids = [line.strip() for line in lines if line.strip()]
+
+    if len(ids) > 1 and all(BEAM_ID.match(canonical_beam_id(i)) for i in ids):
+        return ids
+
+    return [" ".join(ids)] if ids else []
+
+
+def _row_beams(row, layout, width):
+    values = {"width": None, "depth": None, "length": None, "legs": None, "stirrup_dia": None}
+    ids, reinforcement, dia, spacing = [], [], [], []
+
+    for x0, x1, lines in row:
+        field = _field_at((x0 + x1) / 2 / width, layout)
+        text = "\n".join(lines)
+
+        if not lines or field in (None, "ignore"):
+            continue
+
+        if field == "beam_id":
+            ids.extend(_beam_ids(lines))
+        elif field == "size":
+            numbers = NUMBER.findall(text)
+            values["width"] = values["width"] or _number(numbers[0] if numbers else None)
+            values["depth"] = values["depth"] or _number(numbers[1] if len(numbers) > 1 else None)
+        elif field in values:
+            values[field] = values[field] or _number(text)
+        elif field == "reinforcement":
+            reinforcement.extend(
+                spec.replace(" ", "") for spec in re.split(r"[\n+,]", text)
+                if re.search(r"\d", spec)
+            )
+        elif field == "spacing":
+            spacing.extend(f"{_number(s)} C/C" for s in NUMBER.findall(text))
+        elif field == "stirrups":
+            for line in lines:
+                before, at, after = line.partition("@")
+                if at:
+                    dia.append(before.replace(" ", ""))
+                    spacing.extend(f"{_number(s)} C/C" for s in NUMBER.findall(after)[:1])
+                elif "C/C" in line.upper():
+                    spacing.extend(f"{_number(s)} C/C" for s in NUMBER.findall(line)[:1])
+                elif re.search(r"\d", line):
+                    dia.append(line.replace(" ", ""))
+
+    if values["legs"] and values["stirrup_dia"]:
+        dia.append(f"{values['legs']}L-T{values['stirrup_dia']}")
+
+    return [
+        {
+            "beam_id": beam_id,
+            "size": {"width": values["width"], "depth": values["depth"], "length": values["length"]},
+            "reinforcement": list(dict.fromkeys(reinforcement)),
+            "stirrups": {
+                "dia": list(dict.fromkeys(dia)),
+                "spacing": list(dict.fromkeys(spacing))
+            }
+        }
+        for beam_id in ids
+    ]
+
+
+def _field_at(x, layout):
+    # Deeper header rows are appended later and win over their parents
+    for x0, x1, field in reversed(layout):
+        if x0 <= x < x1:
+            return field
+
+    return None
+
+
+def table_beams(img, rules, state):
+    """
+    Beams of one table image. Header rows set the column layout (kept
+    in `state` as fractions of the width, so the later, headerless
+    slices of the same table reuse it); every other row is data.
+    """
+
+    width = img.size[0]
+    beams = []
+    in_header = False
+
+    for row in read_rows(img):
+        fields = [
+            (x0 / width, x1 / width, _column_field(" ".join(lines), rules))
+            for x0, x1, lines in row if lines
+        ]
+        named = {field for _, _, field in fields if field}
+
+        is_header = (
+            len(named) >= MIN_HEADER_FIELDS
+            and sum(1 for f in fields if f[2]) >= MIN_HEADER_SHARE * len(fields)
+        )
+
+        if is_header and not in_header:
+            state["layout"] = []
+            in_header = True
+
+        if in_header and not any(
+            _field_at((x0 + x1) / 2 / width, state["layout"]) == "beam_id"
+            and any(re.search(r"\d", line) for line in lines)
+            for x0, x1, lines in row
+        ):
+            state["layout"].extend(f for f in fields if f[2])
+            continue
+
+        in_header = False
+
+        if not state.get("layout"):
+            print("⚠ OCR found no header to map columns, skipping row")
+            continue
+
+        beams.extend(_row_beams(row, state["layout"], width))
+
+    return beams
+
+
+# ==============================
+# BACKEND
+# ==============================
+
+def ocr_extractor(pattern_number):
+    """
+    extract_from_image stand-in that reads the table cells with
+    tesseract on the CPU and returns the same {"beams": [...]} JSON,
+    so the pattern's normalizers and validation run unchanged.
+    One extractor per run: it carries the header layout across slices.
+    """
+
+    rules = column_rules(pattern_number)
+    state = {"layout": None, "last": (None, None)}
+
+    def extract(image_path, prompt_text):
+        # Validation retries resend the slice with a longer prompt;
+        # OCR would read it the same way again
+        if state["last"][0] == image_path:
+            return state["last"][1]
+
+        with Image.open(image_path) as img:
+            img = img.convert("RGB")
+
+        # Only the ruled tables, not the crop margin around them
+        regions = find_regions_in_image(image_path) or [(0, 0) + img.size]
+        beams = []
+
+        for region in regions:
+            beams.extend(table_beams(img.crop(region), rules, state))
+
+        result = json.dumps({"beams": beams})
+        state["last"] = (image_path, result)
+
+        return result
+
+    return extract
@@ -0,0 +1,112 @@
+import os
+import json
+
+from config import OUTPUT_MODE, BEAM_DB_PATH
+
+
+# ==============================
+# FORMAT HELPERS
+# ==============================
+
+def _format_beam(beam):
+    """
+    Renders one beam exactly as json.dump({"beams": [...]}, indent=2)
+    would place it inside the list.
+    """
+
+    text = json.dumps(beam, indent=2)
+    return "\n".join("    " + line for line in text.split("\n"))
+
+
+# ==============================
+# BEAM WRITER
+# ==============================
+
+class BeamWriter:
+    """
+    Writes a document's beams to output/<name>/<name>.json.
+
+    json mode   → beams are buffered and dumped on finalize (default)
+    ndjson mode → each beam is appended to <name>.ndjson as soon as it
+                  is written, and finalize streams the lines into the
+                  usual {"beams": [...]} file without loading them all.
+
+    The final JSON is written to a temp file and swapped in with
+    os.replace, so readers never see a half-written result. The pattern,
+    when known, is recorded next to the beams for the Excel export. When
+    BEAM_DB_PATH is set the beams are also stored in the SQLite store.
+    """
+
+    def __init__(self, file_output_folder, file_name, mode=None, pattern=None):
+        self.mode = mode or OUTPUT_MODE
+        self.file_name = file_name
+        self.pattern = pattern
+        self.output_file = os.path.join(file_output_folder, f"{file_name}.json")
+        self.ndjson_file = os.path.join(file_output_folder, f"{file_name}.ndjson")
+        self.count = 0
+
+        self._buffer = []
+        self._stream = None
+
+        if self.mode == "ndjson":
+            self._stream = open(self.ndjson_file, "w", encoding="utf-8")
+        elif self.mode != "json":
+            raise Exception(f"Unknown output mode: {self.mode}")
+
+    def write(self, beams):
+        for beam in beams:
+            if self._stream:
+                self._stream.write(json.dumps(beam) + "\n")
+            else:
+                self._buffer.append(beam)
+            self.count += 1
+
+        # Make finished beams visible to downstream readers immediately
+        if self._stream:
+            self._stream.flush()
+
+    def iter_beams(self):
+        if not self._stream:
+            yield from self._buffer
+            return
+
+        with open(self.ndjson_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def finalize(self):
+        if self._stream:
+            self._stream.close()
+
+        temp_file = self.output_file + ".tmp"
+
+        with open(temp_file, "w", encoding="utf-8") as f:
+            f.write('{\n')
+            if self.pattern is not None:
+                f.write(f'  "pattern": {self.pattern},\n')
+            f.write('  "beams": [')
+
+            first = True
+            for beam in self.iter_beams():
+                f.write("\n" if first else ",\n")
+                f.write(_format_beam(beam))
+                first = False
+
+            f.write("]\n}" if first else "\n  ]\n}")
+
+        os.replace(temp_file, self.output_file)
+
+        print(f"✅ Output saved to {self.output_file}")
+
+        if BEAM_DB_PATH:
+            # Imported here so runs without a store never touch sqlite
+            from beam_store import connect, store_document
+
+            conn = connect(BEAM_DB_PATH)
+            store_document(conn, self.file_name, self.iter_beams(), pattern=self.pattern)
+            conn.close()
+
+            print(f"🗄 Stored {self.count} beams in {BEAM_DB_PATH}")
+
+        return self.output_file
@@ -0,0 +1,109 @@
+import os
+import sys
+import uuid
+import shutil
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config import INPUT_DIR, WORK_DIR, PARALLEL_WORKERS
+from scheduler import schedule
+from work_queue import INPUT_EXTENSIONS, commit_outputs
+
+
+# ==============================
+# WORKER PROCESS
+# ==============================
+
+def run_isolated(file_path):
+    """
+    Processes one document in its own workspace under WORK_DIR, so
+    concurrent documents never share temp images or half-written
+    outputs, then moves the finished folders into OUTPUT_DIR.
+    Returns (file_path, output_names, error).
+    """
+
+    from auto_runner import process_file
+
+    workspace = os.path.join(WORK_DIR, f"parallel-{os.getpid()}-{uuid.uuid4().hex[:8]}")
+    os.makedirs(workspace)
+
+    try:
+        output_names = process_file(
+            file_path,
+            temp_folder=os.path.join(workspace, "temp_detection"),
+            output_dir=workspace
+        )
+        commit_outputs(workspace, output_names)
+
+        return file_path, output_names, None
+    except Exception as e:
+        traceback.print_exc()
+        return file_path, [], str(e)
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+# ==============================
+# PARALLEL RUN
+# ==============================
+
+def run_parallel(file_paths, workers=PARALLEL_WORKERS):
+    """
+    Spreads documents across worker processes, one document per process
+    at a time. API requests from all of them draw on the shared rate
+    limiter (API_REQUESTS_PER_MINUTE / API_TOKENS_PER_MINUTE).
+    Documents are handed out in the given order.
+    Returns {file_path: output_names}; failed documents are reported
+    and left out.
+    """
+
+    workers = min(workers or os.cpu_count() or 1, len(file_paths)) or 1
+    results = {}
+
+    print(f"🚀 Processing {len(file_paths)} documents in {workers} processes")
+
+    # Spawned, not forked: the parent may already hold PyMuPDF and
+    # client threads that a fork would copy in a broken state
+    context = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(run_isolated, path) for path in file_paths]
+
+        for future in as_completed(futures):
+            path, output_names, error = future.result()
+
+            if error:
+                print(f"🔥 {os.path.basename(path)} failed: {error}")
+            else:
+                results[path] = output_names
+                print(f"✅ {os.path.basename(path)} → {', '.join(output_names)}")
+
+    return results
+
+
+# ==============================
+# MAIN ENTRY
+# ==============================
+
+def main():
+    """
+    python parallel_runner.py [workers]
+    """
+
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else PARALLEL_WORKERS
+
+    file_paths = [
+        os.path.join(INPUT_DIR, f) for f in os.listdir(INPUT_DIR)
+        if f.lower().endswith(INPUT_EXTENSIONS)
+    ]
+
+    if not file_paths:
+        print("⚠ No PDF files found.")
+        return
+
+    run_parallel(schedule(file_paths), workers=workers)
+
+
+if __name__ == "__main__":
+    main()
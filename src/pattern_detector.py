@@ -198,21 +198,31 @@
 
 #     return int(result)
 
+import os
 import json
-from pdf_to_images import convert_pdf_to_images
-from vision_extractor import extract_from_image
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
+from PIL import Image
 
-def detect_pattern(pdf_path, temp_folder):
+from config import DETECTION_WORKERS, HEADER_CACHE_PATH, RENDER_MODE
+from header_cache import HeaderCache, image_hash, header_words
+from pdf_to_images import convert_pdf_to_images
+from table_detector import PAGE_NAME, find_header_band, crop_tables, is_preview
+from vision_extractor import extract_from_image, image_digest
 
-    image_paths = convert_pdf_to_images(pdf_path, temp_folder)
 
-    if not image_paths:
-        raise Exception("No image generated for detection.")
+# Header crops are downscaled to this width: column names stay legible
+# while the request carries a fraction of the full-page pixels
+HEADER_MAX_WIDTH = 2048
 
-    first_image = image_paths[0]
 
-    classification_prompt = """
+# ==============================
+# CLASSIFICATION PROMPT
+# ==============================
+
+CLASSIFICATION_PROMPT = """
 You are an expert at identifying RCC beam schedule HEADER patterns.
 
 IMPORTANT:
@@ -464,10 +474,241 @@ FINAL DECISION PRIORITY:
 Return ONLY the number.
 """
 
-    result = extract_from_image(first_image, classification_prompt)
+
+# ==============================
+# CLASSIFY ONE PAGE
+# ==============================
+
+def classify_image(image_path):
+
+    result = extract_from_image(image_path, CLASSIFICATION_PROMPT)
     result = result.strip()
 
     if not result.isdigit():
         raise Exception(f"Pattern detection failed. Model returned: {result}")
 
     return int(result)
+
+
+# Loaded on first use so every page of a run shares one cache
+_header_cache = None
+
+
+def get_header_cache():
+    global _header_cache
+
+    if _header_cache is None:
+        _header_cache = HeaderCache()
+
+    return _header_cache
+
+
+def crop_header(image_path, band=None):
+    """
+    Saves the header band (or the whole page when no band is given)
+    next to the page image, downscaled to HEADER_MAX_WIDTH.
+    """
+
+    with Image.open(image_path) as img:
+        header = img.crop(band) if band else img.copy()
+
+    if header.width > HEADER_MAX_WIDTH:
+        height = max(round(header.height * HEADER_MAX_WIDTH / header.width), 1)
+        header = header.resize((HEADER_MAX_WIDTH, height), Image.LANCZOS)
+
+    header_path = os.path.join(
+        os.path.dirname(image_path), f"temp_header_{uuid.uuid4().hex}.png"
+    )
+    header.save(header_path)
+
+    return header_path
+
+
+def classify_page(image_path, pdf_path=None):
+    """
+    Classifies a page from its header band only.
+    Headers seen before (same consultant, same schedule layout) are
+    answered from the fingerprint cache without a vision request.
+    """
+
+    band = find_header_band(image_path, pdf_path)
+    header_path = crop_header(image_path, band)
+
+    try:
+        if not HEADER_CACHE_PATH:
+            return classify_image(header_path)
+
+        fingerprint = image_hash(header_path)
+        match = PAGE_NAME.search(os.path.basename(image_path))
+
+        words = ""
+        if pdf_path and band and match:
+            words = header_words(pdf_path, int(match.group(1)), band)
+
+        cache = get_header_cache()
+        pattern = cache.lookup(fingerprint, words)
+
+        if pattern is not None:
+            print(f"🔎 Header cache hit: {os.path.basename(image_path)} → Pattern {pattern}")
+            return pattern
+
+        pattern = classify_image(header_path)
+        cache.store(fingerprint, words, pattern)
+
+        return pattern
+    finally:
+        os.remove(header_path)
+
+
+# ==============================
+# PER-PAGE DETECTION
+# ==============================
+
+def detect_page_patterns(pdf_path, temp_folder, max_workers=DETECTION_WORKERS):
+    """
+    Classifies the first page, then the rest concurrently: pages usually
+    share the first page's header, and it is in the header cache by then.
+    Returns {page_number: pattern_number} with 1-based page numbers.
+    """
+
+    image_paths = convert_pdf_to_images(pdf_path, temp_folder)
+
+    if not image_paths:
+        raise Exception("No image generated for detection.")
+
+    classify = partial(classify_page, pdf_path=pdf_path)
+    patterns = [classify(image_paths[0])]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        patterns += pool.map(classify, image_paths[1:])
+
+    return {
+        page_number: pattern
+        for page_number, pattern in enumerate(patterns, start=1)
+    }
+
+
+def group_pages_by_pattern(page_patterns):
+    """
+    {1: 6, 2: 8, 3: 6} → {6: [1, 3], 8: [2]}
+    """
+
+    groups = {}
+
+    for page_number, pattern in sorted(page_patterns.items()):
+        groups.setdefault(pattern, []).append(page_number)
+
+    return groups
+
+
+def detect_pattern(pdf_path, temp_folder):
+
+    image_paths = convert_pdf_to_images(pdf_path, temp_folder)
+
+    if not image_paths:
+        raise Exception("No image generated for detection.")
+
+    return classify_page(image_paths[0], pdf_path)
+
+
+
+# ==============================
+# COMBINED CLASSIFY + EXTRACT
+# ==============================
+
+# Patterns whose module sends the first table crop without slicing, so one
+# response can carry both the pattern number and the beams. Not 8: main_8
+# sends the whole page, so a crop's answer would never be used
+COMBINED_PATTERNS = (3, 5, 6, 7)
+
+COMBINED_PROMPT = """
+Two tasks on this image.
+
+TASK 1: Identify the beam schedule pattern using the guide below.
+(Ignore the guide's instruction to return only the number.)
+
+{classification}
+
+TASK 2: If the pattern is {patterns}, extract every beam following
+that pattern's instructions below. For any other pattern return an
+empty beams list.
+
+{instructions}
+
+Return ONLY JSON:
+{{"pattern": <number>, "beams": [ ... beams in that pattern's schema ... ]}}
+"""
+
+
+def build_combined_prompt():
+    import importlib
+
+    instructions = "\n\n".join(
+        f"==================== PATTERN {n} INSTRUCTIONS ====================\n"
+        + importlib.import_module(f"main_{n}").load_prompt()
+        for n in COMBINED_PATTERNS
+    )
+
+    return COMBINED_PROMPT.format(
+        classification=CLASSIFICATION_PROMPT,
+        patterns=", ".join(str(n) for n in COMBINED_PATTERNS),
+        instructions=instructions
+    )
+
+
+# Render DPI of the pattern modules, whose first crop must match ours
+COMBINED_DPI = 300
+
+
+def classify_and_extract(pdf_path, temp_folder):
+    """
+    Single-page documents only: one request that both classifies the
+    page and extracts its first table.
+
+    Returns (pattern, responses) where `responses` maps the sent image's
+    digest to the beams in the pattern module's response format, for
+    vision_extractor.prefetched_extractor. None for multi-page documents
+    and for pages that would only be a preview (band mode, or lowered by
+    the memory budget): the pattern module renders those tables from the
+    PDF, so its crop would never match the one sent here.
+    """
+
+    if RENDER_MODE == "bands":
+        return None
+
+    image_paths = convert_pdf_to_images(pdf_path, temp_folder, dpi=COMBINED_DPI)
+
+    if len(image_paths) != 1:
+        return None
+
+    if is_preview(image_paths[0], pdf_path, COMBINED_DPI):
+        print("⚠ Page rendered below full DPI, skipping combined extraction")
+        return None
+
+    # The pattern module will render and crop the page the same way,
+    # so its first table crop has the same bytes as this one
+    table_paths = crop_tables(image_paths[0], pdf_path, dpi=COMBINED_DPI)
+    target = table_paths[0]
+
+    try:
+        result = extract_from_image(target, build_combined_prompt())
+        digest = image_digest(target)
+    finally:
+        for path in table_paths:
+            if path != image_paths[0]:
+                os.remove(path)
+
+    start, end = result.find("{"), result.rfind("}")
+
+    try:
+        parsed = json.loads(result[start:end + 1])
+        pattern = int(parsed["pattern"])
+    except Exception:
+        raise Exception(f"Combined detection failed. Model returned: {result}")
+
+    responses = {}
+
+    if pattern in COMBINED_PATTERNS:
+        responses[digest] = json.dumps({"beams": parsed.get("beams") or []})
+
+    return pattern, responses
@@ -1,12 +1,67 @@
-import fitz  # pymupdf
 import os
+import math
+
+from config import RENDER_MODE, PREVIEW_DPI, MEMORY_BUDGET_MB
+from memory_profile import MB, rss_bytes
+
+
+# Peak bytes per page pixel while a page is processed: the RGB pixmap,
+# PIL's decode of the PNG and the RGB copy detection / cropping makes
+PAGE_BYTES_PER_PIXEL = 9
+
+
+def page_image_dpi(dpi):
+    """
+    DPI for the page_N.png images. In band mode pages are only a
+    preview; tables and slices are rendered from the PDF at `dpi`.
+    """
+
+    return PREVIEW_DPI if RENDER_MODE == "bands" else dpi
+
+
+def budget_dpi(page, dpi, budget_mb=MEMORY_BUDGET_MB):
+    """
+    Highest DPI (at most `dpi`, at least PREVIEW_DPI) whose page image
+    fits in what is left of the memory budget. A page rendered below
+    `dpi` is treated as a preview: crop_tables / table_slices render its
+    tables from the PDF at full DPI, one clip at a time.
+    """
+
+    if not budget_mb:
+        return dpi
+
+    available = budget_mb * MB - (rss_bytes() or 0)
+    needed = page.rect.width * page.rect.height * (dpi / 72) ** 2 * PAGE_BYTES_PER_PIXEL
+
+    if needed <= available:
+        return dpi
+
+    reduced = max(int(dpi * math.sqrt(max(available, 0) / needed)), PREVIEW_DPI)
+
+    print(f"⚠ Page {page.number + 1} at {dpi} dpi needs ~{needed / MB:.0f} MB, "
+          f"{max(available, 0) / MB:.0f} MB left in budget → rendering at {reduced} dpi")
+
+    return reduced
+
+
+def convert_pdf_to_images(pdf_path, output_folder, pages=None, dpi=300,
+                          budget_mb=MEMORY_BUDGET_MB):
+    """
+    Renders pages to PNG. `pages` limits rendering to the given
+    1-based page numbers; file names keep the original numbering.
+    Pages that don't fit `budget_mb` come out at a lower DPI (0 keeps
+    `dpi` whatever the budget).
+    """
+    import fitz  # pymupdf
 
-def convert_pdf_to_images(pdf_path, output_folder):
     doc = fitz.open(pdf_path)
     image_paths = []
 
     for page_number, page in enumerate(doc):
-        pix = page.get_pixmap(dpi=300)
+        if pages is not None and page_number + 1 not in pages:
+            continue
+
+        pix = page.get_pixmap(dpi=budget_dpi(page, dpi, budget_mb))
         image_path = os.path.join(
             output_folder,
             f"page_{page_number + 1}.png"
@@ -15,3 +70,28 @@ def convert_pdf_to_images(pdf_path, output_folder):
         image_paths.append(image_path)
 
     return image_paths
+
+
+def render_region(pdf_path, page_number, region, dpi, output_path, region_dpi=None):
+    """
+    Renders only `region` of a page with get_pixmap(clip=...), so memory
+    follows the region's size rather than the sheet's.
+    `region` is (x0, y0, x1, y1) in pixels at `region_dpi` (default `dpi`)
+    in the rotated page as displayed.
+    """
+
+    import fitz  # pymupdf
+
+    # Snapped to whole output pixels so the image has the region's size
+    zoom = dpi / 72
+    box = [round(value * dpi / (region_dpi or dpi)) for value in region]
+
+    with fitz.open(pdf_path) as doc:
+        page = doc[page_number - 1]
+        clip = fitz.Rect(*(value / zoom for value in box)) & page.rect
+
+        # A matrix rather than dpi=, which only takes whole numbers
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), clip=clip)
+        pix.save(output_path)
+
+    return output_path
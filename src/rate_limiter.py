@@ -0,0 +1,179 @@
+import os
+import time
+import sqlite3
+
+from config import API_REQUESTS_PER_MINUTE, API_TOKENS_PER_MINUTE, RATE_LIMIT_DB_PATH
+
+
+# ==============================
+# SHARED TOKEN BUCKET
+# ==============================
+
+# One row per bucket; every process on the host opens the same file, and
+# BEGIN IMMEDIATE serialises the read-refill-take of each acquire
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    level REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+# Completion allowance taken up front, settled against the real usage
+ESTIMATED_OUTPUT_TOKENS = 1500
+
+# Longest single sleep while waiting, so a refund from another process
+# is noticed
+MAX_WAIT_SECONDS = 2.0
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute buckets shared by every
+    process that points at the same database, so parallel workers stay
+    within the account's limits together. A limit of 0 is unlimited.
+
+    acquire(tokens) blocks until one request and `tokens` are available
+    and takes them; settle(estimated, actual) returns or charges the
+    difference once the response reports its usage.
+    """
+
+    def __init__(self, requests_per_minute=API_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=API_TOKENS_PER_MINUTE, db_path=RATE_LIMIT_DB_PATH):
+        self.limits = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+        self.db_path = db_path
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    def _connect(self):
+        # Per call: extraction threads must not share a connection
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _levels(self, conn, now):
+        """
+        Current level of each limited bucket, refilled for the time since
+        its last update. Runs inside the caller's transaction.
+        """
+
+        levels = {}
+
+        for name, limit in self.limits.items():
+            if not limit:
+                continue
+
+            row = conn.execute("SELECT level, updated FROM buckets WHERE name = ?",
+                               (name,)).fetchone()
+            level = limit if row is None else row[0] + (now - row[1]) * limit / 60
+            levels[name] = min(level, limit)
+
+        return levels
+
+    def _store(self, conn, levels, now):
+        for name, level in levels.items():
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)",
+                (name, level, now)
+            )
+
+    def acquire(self, tokens):
+        if not any(self.limits.values()):
+            return 0
+
+        # A request larger than a whole minute's budget waits for a full bucket
+        tokens = min(tokens, self.limits["tokens"]) if self.limits["tokens"] else tokens
+        need = {"requests": 1, "tokens": tokens}
+        waited = 0.0
+
+        conn = self._connect()
+
+        try:
+            while True:
+                now = time.time()
+                conn.execute("BEGIN IMMEDIATE")
+
+                try:
+                    levels = self._levels(conn, now)
+                    short = {n: need[n] - level for n, level in levels.items() if level < need[n]}
+
+                    if not short:
+                        self._store(conn, {n: level - need[n] for n, level in levels.items()}, now)
+
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+
+                if not short:
+                    return waited
+
+                wait = max(deficit * 60 / self.limits[n] for n, deficit in short.items())
+                wait = min(wait, MAX_WAIT_SECONDS)
+
+                time.sleep(wait)
+                waited += wait
+        finally:
+            conn.close()
+
+    def settle(self, estimated, actual):
+        """
+        Gives back (or takes) the difference between the tokens taken at
+        acquire and the tokens the request really used.
+        """
+
+        if not self.limits["tokens"] or actual is None or actual == estimated:
+            return
+
+        conn = self._connect()
+
+        try:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+
+            try:
+                levels = self._levels(conn, now)
+                # May go negative: the next acquires wait off the overdraft
+                levels["tokens"] = min(levels["tokens"] + estimated - actual,
+                                       self.limits["tokens"])
+                self._store(conn, levels, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+
+def estimate_tokens(image_path, prompt_text):
+    """
+    Tokens one extraction request is expected to use: the image as the
+    model bills it, the prompt at ~4 characters a token, and the reply.
+    """
+
+    from PIL import Image
+    from vision_extractor import image_tokens
+
+    with Image.open(image_path) as img:
+        width, height = img.size
+
+    return image_tokens(width, height) + len(prompt_text) // 4 + ESTIMATED_OUTPUT_TOKENS
+
+
+_limiter = None
+
+
+def get_limiter():
+    """
+    The process-wide limiter, or None when no limit is configured.
+    """
+
+    global _limiter
+
+    if not (API_REQUESTS_PER_MINUTE or API_TOKENS_PER_MINUTE):
+        return None
+
+    if _limiter is None:
+        _limiter = RateLimiter()
+
+    return _limiter
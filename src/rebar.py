@@ -0,0 +1,86 @@
+import re
+
+
+# ==============================
+# REBAR SPEC PATTERNS
+# ==============================
+
+# 3-T25 / 7T25 / 3-Y16-A16 (qty, dia, optional bar mark)
+BAR_PREFIX_DIA = re.compile(r"^(\d+)-?[TYR](\d+)")
+
+# 3-32T / 2-16T (pattern 8 writes the diameter before the grade)
+BAR_SUFFIX_DIA = re.compile(r"^(\d+)-(\d+)[TYR]$")
+
+# 3-A23 / 3-A92B (bar mark only, diameter not written in the cell)
+BAR_MARK_ONLY = re.compile(r"^(\d+)-[A-Z]+\d*[A-Z]?$")
+
+# 2L-T8 / 6L-10T / T8 / 8T
+STIRRUP_LEGGED = re.compile(r"^(?:(\d+)L-?)?(?:[TYR](\d+)|(\d+)[TYR])$")
+
+# 47-A13-Y8 / 14-Y8-A24 / 15-A27 (stirrup count, bar mark, optional dia)
+STIRRUP_COUNTED = re.compile(r"^(\d+)-(?:[TYR](\d+)-)?[A-Z]+\d*(?:-[TYR](\d+))?$")
+
+SPACING = re.compile(r"(\d+)")
+
+
+def _clean(spec):
+    return str(spec).strip().upper().replace(" ", "")
+
+
+# ==============================
+# PARSERS
+# ==============================
+
+def parse_bar(spec):
+    """
+    Returns (qty, dia) for a main-bar spec. Unknown parts are None.
+    '3-T25' → (3, 25)   '3-32T' → (3, 32)   '3-A23' → (3, None)
+    """
+
+    spec = _clean(spec)
+
+    m = BAR_PREFIX_DIA.match(spec)
+    if m:
+        return int(m.group(1)), int(m.group(2))
+
+    m = BAR_SUFFIX_DIA.match(spec)
+    if m:
+        return int(m.group(1)), int(m.group(2))
+
+    m = BAR_MARK_ONLY.match(spec)
+    if m:
+        return int(m.group(1)), None
+
+    return None, None
+
+
+def parse_stirrup(spec):
+    """
+    Returns (legs, dia, count) for a stirrup spec. Unknown parts are None.
+    '2L-T8' → (2, 8, None)   '6L-10T' → (6, 10, None)
+    '47-A13-Y8' → (None, 8, 47)   '14-Y8-A24' → (None, 8, 14)
+    """
+
+    spec = _clean(spec)
+
+    m = STIRRUP_LEGGED.match(spec)
+    if m:
+        legs = int(m.group(1)) if m.group(1) else None
+        dia = int(m.group(2) or m.group(3))
+        return legs, dia, None
+
+    m = STIRRUP_COUNTED.match(spec)
+    if m:
+        dia = m.group(2) or m.group(3)
+        return None, int(dia) if dia else None, int(m.group(1))
+
+    return None, None, None
+
+
+def parse_spacing(spec):
+    """
+    '100 C/C' → 100. Returns None when no number is present.
+    """
+
+    m = SPACING.search(str(spec))
+    return int(m.group(1)) if m else None
@@ -0,0 +1,315 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from PIL import Image
+
+from config import OUTPUT_DIR, VISION_MODEL
+from beam_merger import canonical_beam_id
+
+
+# ==============================
+# REVISION MATCHING
+# ==============================
+
+# Issue tokens at the end of a drawing name: R0 / R05 / GR0 / REV-2,
+# dated issues (16.03.2019, 30-12-22) and letter suffixes after a
+# drawing number (S-201_A). A letter after a word is a sheet name, not
+# an issue: BLOCK_A and BLOCK_B are different drawings.
+TRAILING_REVISION = re.compile(
+    r"(?:[\s_\-.]+(?:G?R\d+[A-Z]?|REV[\s.\-]*\w+|\d{1,2}[.\-]\d{1,2}[.\-]\d{2,4})"
+    r"|(?<=\d)[_\-][A-Z])$"
+)
+
+# Issue date in front: 20231215_ / 220517_
+LEADING_DATE = re.compile(r"^\d{6,8}_")
+
+# Index of the latest output per drawing, under OUTPUT_DIR
+INDEX_NAME = "revisions.json"
+
+# Revision key of an output, written next to it until it is published
+MARKER_SUFFIX = ".revision.json"
+
+_index_lock = threading.Lock()
+
+
+def document_key(file_name):
+    """
+    Drawing name with revision and issue-date tokens removed, so every
+    issue of a sheet maps to the same key:
+    "DTN-005-SLAB DETAIL.- R0 30-12-22.pdf" → "DTN-005-SLAB DETAIL"
+    """
+
+    name = os.path.splitext(os.path.basename(file_name))[0].upper().strip()
+    name = LEADING_DATE.sub("", name)
+
+    while True:
+        stripped = TRAILING_REVISION.sub("", name)
+        if stripped == name or not stripped:
+            return name
+        name = stripped
+
+
+def _index_path():
+    return os.path.join(OUTPUT_DIR, INDEX_NAME)
+
+
+def load_index():
+    if not os.path.isfile(_index_path()):
+        return {}
+
+    with open(_index_path(), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@contextmanager
+def _locked_index():
+    """
+    Holds the index for a read-modify-write: a thread lock within the
+    process and an flock on revisions.json.lock across processes (queue
+    workers, parallel runner).
+    """
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    with _index_lock, open(_index_path() + ".lock", "a") as lock_file:
+        try:
+            import fcntl
+        except ImportError:
+            # No flock on Windows: one process at a time there
+            fcntl = None
+
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _record(key, output_name):
+    with _locked_index():
+        index = load_index()
+        index[key] = output_name
+
+        tmp_path = f"{_index_path()}.{os.getpid()}.tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+
+        os.replace(tmp_path, _index_path())
+
+
+def publish(output_name, output_dir=OUTPUT_DIR):
+    """
+    Makes output_dir/<output_name> the latest issue of its drawing, once
+    it sits in OUTPUT_DIR. Does nothing for outputs written without
+    delta extraction.
+    """
+
+    marker = os.path.join(output_dir, output_name, f"{output_name}{MARKER_SUFFIX}")
+
+    if not os.path.isfile(marker):
+        return
+
+    with open(marker, "r", encoding="utf-8") as f:
+        _record(json.load(f)["key"], output_name)
+
+
+# ==============================
+# BAND SIGNATURES
+# ==============================
+
+# Ink threshold for signatures; anti-aliased edges fall either side
+# the same way for the same PDF at the same DPI
+SIGNATURE_INK = 160
+
+
+def band_signature(image_path):
+    """
+    Hash of a slice / table image's ink at full resolution, trimmed to
+    the ink bounding box: a re-plotted sheet whose table moved a few
+    pixels still matches, and a changed digit always changes the hash.
+    """
+
+    with Image.open(image_path) as img:
+        dark = np.asarray(img.convert("L")) < SIGNATURE_INK
+
+    rows, cols = np.flatnonzero(dark.any(axis=1)), np.flatnonzero(dark.any(axis=0))
+
+    if not len(rows):
+        return "blank"
+
+    ink = dark[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+    return hashlib.sha1(np.packbits(ink).tobytes() + str(ink.shape).encode()).hexdigest()
+
+
+# ==============================
+# CHANGE REPORT
+# ==============================
+
+def _beam_fields(beam):
+    size = beam.get("size") or {}
+    stirrups = beam.get("stirrups") or {}
+
+    return {
+        "size": [size.get("width"), size.get("depth"), size.get("length")],
+        "reinforcement": sorted(beam.get("reinforcement") or []),
+        "stirrup_dia": sorted(stirrups.get("dia") or []),
+        "stirrup_spacing": sorted(stirrups.get("spacing") or []),
+    }
+
+
+def compare_beams(previous, current):
+    """
+    Beam-level differences between two revisions, by canonical beam ID.
+    """
+
+    old = {canonical_beam_id(b.get("beam_id")): b for b in previous}
+    new = {canonical_beam_id(b.get("beam_id")): b for b in current}
+
+    changed = []
+
+    for key in new.keys() & old.keys():
+        before, after = _beam_fields(old[key]), _beam_fields(new[key])
+        fields = {
+            field: {"before": before[field], "after": after[field]}
+            for field in before if before[field] != after[field]
+        }
+
+        if fields:
+            changed.append({"beam_id": new[key].get("beam_id"), "changes": fields})
+
+    return {
+        "added": [new[k].get("beam_id") for k in new if k not in old],
+        "removed": [old[k].get("beam_id") for k in old if k not in new],
+        "changed": sorted(changed, key=lambda c: str(c["beam_id"])),
+        "unchanged": len(new.keys() & old.keys()) - len(changed),
+    }
+
+
+# ==============================
+# DELTA EXTRACTION
+# ==============================
+
+class RevisionDelta:
+    """
+    Extracts a new issue of a drawing against its predecessor: bands
+    whose signature the previous issue already had reuse its stored
+    responses, only changed bands reach the extractor.
+
+    Band responses are kept in <name>.bands.json next to the output,
+    and <name>_changes.json lists the beams added, removed and changed.
+    Responses are only reused for the same backend and model.
+
+    Written into a workspace (output_dir other than OUTPUT_DIR), the
+    issue is only published as the predecessor of the next one when
+    work_queue.commit_outputs moves it into OUTPUT_DIR.
+    """
+
+    def __init__(self, pdf_path, pattern_number, output_name, output_dir=None, backend="vision"):
+        self.key = f"{document_key(pdf_path)}#{pattern_number}"
+        self.output_name = output_name
+        self.output_dir = output_dir or OUTPUT_DIR
+        self.output_folder = os.path.join(self.output_dir, output_name)
+
+        # Another backend or model may answer differently for the same band
+        self.source = backend if backend != "vision" else f"{backend}/{VISION_MODEL}"
+
+        self.previous_name = load_index().get(self.key)
+        self.previous_bands = {}
+        self.previous_beams = None
+
+        self.bands = {}
+        self.reused = 0
+        self.extracted = 0
+        self.lock = threading.Lock()
+
+        # Read now: a re-issue under the same name overwrites the folder
+        if self.previous_name:
+            folder = os.path.join(OUTPUT_DIR, self.previous_name)
+            bands_path = os.path.join(folder, f"{self.previous_name}.bands.json")
+            beams_path = os.path.join(folder, f"{self.previous_name}.json")
+
+            if os.path.isfile(bands_path) and os.path.isfile(beams_path):
+                with open(bands_path, "r", encoding="utf-8") as f:
+                    self.previous_bands = json.load(f)
+                with open(beams_path, "r", encoding="utf-8") as f:
+                    self.previous_beams = json.load(f).get("beams", [])
+
+                print(f"🔁 Previous issue: {self.previous_name}")
+
+    def wrap(self, extract):
+        """
+        extract(image_path, prompt_text) that answers unchanged bands
+        from the previous issue.
+        """
+
+        def delta_extract(image_path, prompt_text):
+            # Prompt included: validation retries are cached separately
+            key = band_signature(image_path) + ":" + hashlib.sha1(
+                f"{self.source}\n{prompt_text}".encode("utf-8")
+            ).hexdigest()[:12]
+
+            result = self.previous_bands.get(key)
+
+            if result is None:
+                result = extract(image_path, prompt_text)
+                with self.lock:
+                    self.extracted += 1
+            else:
+                with self.lock:
+                    self.reused += 1
+
+            with self.lock:
+                self.bands[key] = result
+
+            return result
+
+        return delta_extract
+
+    def finish(self):
+        """
+        Stores this issue's bands, writes the change report and, when
+        written straight to OUTPUT_DIR, makes this issue the predecessor
+        of the next one.
+        """
+
+        bands_path = os.path.join(self.output_folder, f"{self.output_name}.bands.json")
+
+        with open(bands_path, "w", encoding="utf-8") as f:
+            json.dump(self.bands, f)
+
+        print(f"🔁 Bands: {self.extracted} extracted, {self.reused} carried forward")
+
+        if self.previous_beams is not None:
+            with open(os.path.join(self.output_folder, f"{self.output_name}.json"),
+                      "r", encoding="utf-8") as f:
+                beams = json.load(f).get("beams", [])
+
+            report = {
+                "previous": self.previous_name,
+                "bands": {"extracted": self.extracted, "carried_forward": self.reused},
+                **compare_beams(self.previous_beams, beams)
+            }
+
+            with open(os.path.join(self.output_folder, f"{self.output_name}_changes.json"),
+                      "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+            print(f"📋 Changes since {self.previous_name}: {len(report['added'])} added, "
+                  f"{len(report['removed'])} removed, {len(report['changed'])} changed")
+
+        with open(os.path.join(self.output_folder, f"{self.output_name}{MARKER_SUFFIX}"),
+                  "w", encoding="utf-8") as f:
+            json.dump({"key": self.key}, f)
+
+        if os.path.abspath(self.output_dir) == os.path.abspath(OUTPUT_DIR):
+            publish(self.output_name)
@@ -0,0 +1,137 @@
+import os
+import re
+
+from config import SCHEDULING
+from manifest import load_manifest, lookup
+
+
+# ==============================
+# COST ESTIMATE
+# ==============================
+
+# Extraction requests per A1-sized page, relative to one table crop.
+# Patterns 1 and 4 slice every table into bands; patterns 2, 6 and 7
+# usually carry several tables a sheet.
+PATTERN_COST = {1: 3.0, 2: 1.5, 3: 1.0, 4: 3.0, 5: 1.0, 6: 1.5, 7: 1.5, 8: 1.0}
+
+# Pattern not in the manifest: an average pattern plus the detection request
+UNKNOWN_PATTERN_COST = 2.0
+DETECTION_COST = 0.25
+
+# CAD exports are read locally, no rendering and no requests
+DXF_COST = 0.05
+
+# A1 in PDF points; smaller sheets cost proportionally less
+A1_AREA = 1684 * 2384
+
+# Project from the drawing number when the manifest names none: "DTN-005-…" → "DTN"
+PROJECT_PREFIX = re.compile(r"^[A-Z0-9]+")
+
+
+def estimate_cost(file_path, entry=None):
+    """
+    Relative cost of a document from its page count, sheet sizes and
+    (manifest) pattern. Reads only the page boxes, nothing is rendered.
+    """
+
+    if file_path.lower().endswith(".dxf"):
+        return DXF_COST
+
+    pattern = (entry or {}).get("pattern")
+
+    if pattern:
+        per_page = PATTERN_COST[pattern]
+    else:
+        per_page = UNKNOWN_PATTERN_COST + DETECTION_COST
+
+    import fitz
+
+    try:
+        with fitz.open(file_path) as doc:
+            sheets = sum(page.rect.width * page.rect.height / A1_AREA for page in doc)
+    except Exception as e:
+        # Sorted last rather than failing the run; processing reports it
+        print(f"⚠ Could not read {os.path.basename(file_path)} for scheduling: {e}")
+        return float("inf")
+
+    return round(sheets * per_page, 3)
+
+
+def document_project(file_path, entry=None):
+    if entry and entry.get("project"):
+        return str(entry["project"])
+
+    # revisions pulls in numpy and PIL, which entry points load late
+    from revisions import document_key
+
+    match = PROJECT_PREFIX.match(document_key(file_path))
+    return match.group() if match else ""
+
+
+# ==============================
+# ORDERING
+# ==============================
+
+def plan(file_paths, entries=None):
+    """
+    [{"path", "cost", "priority", "project"}] for each document, using
+    the manifest's "priority" (higher first, default 0) and "project".
+    """
+
+    entries = load_manifest() if entries is None else entries
+    jobs = []
+
+    for path in file_paths:
+        entry = lookup(entries, path)
+
+        jobs.append({
+            "path": path,
+            "cost": estimate_cost(path, entry),
+            "priority": (entry or {}).get("priority", 0),
+            "project": document_project(path, entry),
+        })
+
+    return jobs
+
+
+def schedule(file_paths, entries=None, mode=SCHEDULING):
+    """
+    Processing order for a batch of documents.
+
+    cost → higher priorities first; within a priority, shortest job
+           first across projects, fairly: each project's next (cheapest)
+           document competes on the work its project has had so far
+           plus its own cost, so one large set cannot hold back the
+           others' small drawings, nor a stream of small ones starve it
+    name → alphabetical, the order before scheduling
+    """
+
+    if mode == "name":
+        return sorted(file_paths)
+
+    if mode != "cost":
+        raise Exception(f"Unknown scheduling mode: {mode}")
+
+    jobs = plan(file_paths, entries)
+    order = []
+
+    for priority in sorted({job["priority"] for job in jobs}, reverse=True):
+        queues = {}
+
+        for job in sorted(jobs, key=lambda j: (j["cost"], j["path"])):
+            if job["priority"] == priority:
+                queues.setdefault(job["project"], []).append(job)
+
+        served = dict.fromkeys(queues, 0.0)
+
+        while queues:
+            project = min(queues, key=lambda p: (served[p] + queues[p][0]["cost"], p))
+            job = queues[project].pop(0)
+
+            served[project] += job["cost"]
+            order.append(job["path"])
+
+            if not queues[project]:
+                del queues[project]
+
+    return order
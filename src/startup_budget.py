@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import subprocess
+
+
+# ==============================
+# BUDGETS
+# ==============================
+
+# Import time of each entry point in a fresh interpreter, in ms (best of RUNS)
+STARTUP_BUDGET_MS = {
+    "config": 20,
+    "vision_extractor": 20,
+    "auto_runner": 50,
+    "dxf_extractor": 50,
+    "beam_store": 50,
+    "watch_service": 100,
+    "work_queue": 100,
+    "job_api": 150,
+    "takeoff": 200,
+    "main_1": 100,
+    "main_2": 100,
+    "main_3": 100,
+    "main_4": 100,
+    "main_5": 100,
+    "main_6": 100,
+    "main_7": 100,
+    "main_8": 50,
+    "manifest": 20,
+    "scheduler": 20,
+    "excel_export": 20,
+    "parallel_runner": 100,
+    "revisions": 200,
+}
+
+# Modules that must only load on first use
+LAZY_MODULES = ["openai", "fitz", "tqdm", "dotenv", "ezdxf", "openpyxl", "numpy", "PIL"]
+
+# Entry points built on one of them: takeoff's arrays, revisions' band hashing
+EAGER_ALLOWED = {"takeoff": ["numpy"], "revisions": ["numpy", "PIL"]}
+
+RUNS = 5
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def time_import(module_name, runs=RUNS):
+    """
+    (best import time in ms, lazy modules it loaded that it shouldn't).
+    """
+
+    code = (
+        "import sys, time, json\n"
+        "start = time.perf_counter()\n"
+        f"import {module_name}\n"
+        "elapsed = (time.perf_counter() - start) * 1000\n"
+        f"print(json.dumps([elapsed, [m for m in {LAZY_MODULES!r} if m in sys.modules]]))\n"
+    )
+
+    best, loaded = None, []
+
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=SRC_DIR, capture_output=True, text=True, check=True
+        )
+        elapsed, loaded = json.loads(result.stdout.strip().splitlines()[-1])
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, [m for m in loaded if m not in EAGER_ALLOWED.get(module_name, [])]
+
+
+# ==============================
+# CHECK
+# ==============================
+
+def check_startup(budgets=STARTUP_BUDGET_MS):
+    """
+    Imports each CLI entry point in a fresh interpreter and compares the
+    import time with its budget. Returns the list of failures.
+    """
+
+    failures = []
+
+    for module_name, budget in budgets.items():
+        elapsed, loaded = time_import(module_name)
+
+        ok = elapsed <= budget and not loaded
+        mark = "✅" if ok else "⚠"
+        extra = f"  eagerly loads {', '.join(loaded)}" if loaded else ""
+
+        print(f"{mark} {module_name:<18} {elapsed:7.1f} ms / {budget} ms{extra}")
+
+        if not ok:
+            failures.append(module_name)
+
+    return failures
+
+
+def main():
+    failures = check_startup()
+
+    if failures:
+        print(f"\n⚠ Startup budget exceeded: {', '.join(failures)}")
+        sys.exit(1)
+
+    print("\n✅ All entry points within startup budget")
+
+
+if __name__ == "__main__":
+    main()
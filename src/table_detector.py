@@ -0,0 +1,583 @@
+import os
+import re
+import uuid
+import hashlib
+
+from config import CROP_TABLES
+
+
+# ==============================
+# SETTINGS
+# ==============================
+
+# Raster detection runs on a reduced copy of the page
+DETECTION_SCALE = 4
+
+# A ruling line spans at least this fraction of the page side
+MIN_LINE_FRACTION = 0.03
+
+# A region covering more than this fraction of the page is the sheet
+# frame; its border rules are dropped and the inside searched again
+FRAME_AREA_FRACTION = 0.85
+
+# Regions mostly solid ink are white-on-black (inverted) tables
+INVERTED_FILL = 0.5
+
+# Gaps narrower than this fraction of the page side do not split tables
+MERGE_GAP_FRACTION = 0.01
+
+# A region needs this many ruled rows / columns to count as a table
+MIN_TABLE_ROWS = 3
+MIN_TABLE_COLS = 2
+
+# Padding (pixels at render DPI) kept around each crop so borders survive
+CROP_MARGIN = 20
+
+# Row separators span at least this fraction of the table width
+ROW_RULE_FRACTION = 0.9
+
+# Data rows kept under the header so row-level cues (stacked IDs) stay visible
+HEADER_DATA_ROWS = 2
+
+# Header share of the table when its rows can't be resolved (inverted tables)
+HEADER_FALLBACK_FRACTION = 0.5
+
+# Tables with fewer row rules than this are small enough to send whole
+MIN_HEADER_RULES = 4
+
+# Slices with less ink than this are blank paper
+BLANK_INK_FRACTION = 0.002
+
+# Column rules in a slice span at least this fraction of its height
+# (short: the table may start near the bottom of the strip)
+SLICE_RULE_FRACTION = 0.05
+
+PAGE_NAME = re.compile(r"page_(\d+)\.png$")
+
+
+# ==============================
+# RUN HELPERS
+# ==============================
+
+def _runs(flags, merge_gap=0):
+    """
+    [0,1,1,0,0,1] → [(1, 3), (5, 6)], merging gaps up to merge_gap.
+    """
+
+    import numpy as np
+
+    padded = np.concatenate([[0], flags.astype(np.int8), [0]])
+    edges = np.flatnonzero(np.diff(padded))
+    runs = [[int(s), int(e)] for s, e in zip(edges[::2], edges[1::2])]
+
+    merged = []
+    for run in runs:
+        if merged and run[0] - merged[-1][1] <= merge_gap:
+            merged[-1][1] = run[1]
+        else:
+            merged.append(run)
+
+    return [tuple(r) for r in merged]
+
+
+def _line_mask(dark, length, axis):
+    """
+    Marks pixels that belong to a dark run of at least `length`
+    along `axis` (1 = horizontal, 0 = vertical).
+    """
+
+    import numpy as np
+
+    if axis == 0:
+        return _line_mask(dark.T, length, axis=1).T
+
+    rows, n = dark.shape
+
+    if n < length:
+        return np.zeros_like(dark, dtype=bool)
+
+    pad = np.zeros((rows, 1), dtype=np.int32)
+
+    # Windows of `length` pixels that are entirely dark
+    csum = np.hstack([pad, np.cumsum(dark, axis=1, dtype=np.int32)])
+    full = (csum[:, length:] - csum[:, :-length]) == length
+
+    # A pixel is covered when any full window starting in [j - length + 1, j] exists
+    fsum = np.hstack([pad, np.cumsum(full, axis=1, dtype=np.int32)])
+    idx = np.arange(n)
+    hi = np.minimum(idx + 1, full.shape[1])
+    lo = np.maximum(idx - length + 1, 0)
+
+    return (fsum[:, hi] - fsum[:, lo]) > 0
+
+
+def _regions_from_masks(h_mask, v_mask, scale_x, scale_y, split_frame=True):
+    height, width = h_mask.shape
+    ruled = h_mask | v_mask
+    regions = []
+
+    # Side-by-side tables are separated by columns with no ruling at all
+    for x0, x1 in _runs(ruled.any(axis=0), int(width * MERGE_GAP_FRACTION)):
+        for y0, y1 in _runs(ruled[:, x0:x1].any(axis=1), int(height * MERGE_GAP_FRACTION)):
+            h_box = h_mask[y0:y1, x0:x1]
+            v_box = v_mask[y0:y1, x0:x1]
+
+            if split_frame and (x1 - x0) * (y1 - y0) > FRAME_AREA_FRACTION * width * height:
+                band = max(int(min(width, height) * MERGE_GAP_FRACTION), 2)
+                h_inner = h_box.copy()
+                v_inner = v_box.copy()
+                for mask in (h_inner, v_inner):
+                    mask[:band, :] = mask[-band:, :] = False
+                    mask[:, :band] = mask[:, -band:] = False
+
+                for rx0, ry0, rx1, ry1 in _regions_from_masks(h_inner, v_inner, 1, 1, split_frame=False):
+                    regions.append((
+                        int((x0 + rx0) * scale_x), int((y0 + ry0) * scale_y),
+                        int((x0 + rx1) * scale_x), int((y0 + ry1) * scale_y)
+                    ))
+                continue
+
+            rows = len(_runs(h_box.any(axis=1)))
+            cols = len(_runs(v_box.any(axis=0)))
+            inverted = (
+                h_box.mean() > INVERTED_FILL
+                and y1 - y0 >= height * MIN_LINE_FRACTION
+                and x1 - x0 >= width * MIN_LINE_FRACTION
+            )
+
+            if (rows >= MIN_TABLE_ROWS and cols >= MIN_TABLE_COLS) or inverted:
+                regions.append((
+                    int(x0 * scale_x), int(y0 * scale_y),
+                    int(x1 * scale_x), int(y1 * scale_y)
+                ))
+
+    return regions
+
+
+# ==============================
+# RASTER DETECTION
+# ==============================
+
+def _ink(img):
+    import numpy as np
+
+    return np.asarray(img.convert("RGB")).min(axis=2) < 224
+
+
+def find_regions_in_image(image_path, reduce=DETECTION_SCALE):
+    """
+    Finds ruled table regions from line density.
+    Returns [(x0, y0, x1, y1)] in full-resolution pixels, left → right.
+    """
+
+    from PIL import Image
+
+    with Image.open(image_path) as img:
+        full_width, full_height = img.size
+        small = img.convert("RGB").resize(
+            (max(full_width // reduce, 1), max(full_height // reduce, 1)),
+            Image.BOX
+        )
+
+    # Any channel well below white is ink: keeps coloured CAD rules
+    # (yellow has no blue) and box-averaged 1px rules
+    dark = _ink(small)
+    height, width = dark.shape
+
+    h_mask = _line_mask(dark, max(int(width * MIN_LINE_FRACTION), 8), axis=1)
+    v_mask = _line_mask(dark, max(int(height * MIN_LINE_FRACTION), 8), axis=0)
+
+    return _regions_from_masks(h_mask, v_mask, full_width / width, full_height / height)
+
+
+def has_table_content(image_path):
+    """
+    Cheap check that a slice is worth an extraction request: some ink,
+    and the vertical rules of at least MIN_TABLE_COLS columns. Blank
+    strips, unruled notes and bare frame borders fail; anything ruled
+    into columns is kept, so a title block may still pass.
+    """
+
+    from PIL import Image
+
+    with Image.open(image_path) as img:
+        width, height = img.size
+        small = img.convert("RGB").resize(
+            (max(width // DETECTION_SCALE, 1), max(height // DETECTION_SCALE, 1)),
+            Image.BOX
+        )
+
+    dark = _ink(small)
+
+    if dark.mean() < BLANK_INK_FRACTION:
+        return False
+
+    v_mask = _line_mask(dark, max(int(dark.shape[0] * SLICE_RULE_FRACTION), 8), axis=0)
+
+    # n columns are bounded by n + 1 rules
+    return len(_runs(v_mask.any(axis=0))) >= MIN_TABLE_COLS + 1
+
+
+# ==============================
+# VECTOR DETECTION
+# ==============================
+
+def find_regions_in_pdf(pdf_path, page_number, dpi=300):
+    """
+    Same as find_regions_in_image but from the page's vector drawings.
+    Returns [] when the page has no line art (scans).
+    """
+
+    import fitz  # pymupdf
+    import numpy as np
+
+    with fitz.open(pdf_path) as doc:
+        page = doc[page_number - 1]
+        page_width, page_height = page.rect.width, page.rect.height
+
+        # Drawings are in unrotated page space, the render is rotated
+        rotation = page.rotation_matrix
+
+        h_lines, v_lines = [], []
+
+        for drawing in page.get_drawings():
+            for item in drawing["items"]:
+                if item[0] == "l":
+                    p0, p1 = item[1] * rotation, item[2] * rotation
+                    if abs(p0.y - p1.y) < 0.5:
+                        h_lines.append((min(p0.x, p1.x), p0.y, max(p0.x, p1.x)))
+                    elif abs(p0.x - p1.x) < 0.5:
+                        v_lines.append((p0.x, min(p0.y, p1.y), max(p0.y, p1.y)))
+                elif item[0] == "re":
+                    r = item[1] * rotation
+                    h_lines += [(r.x0, r.y0, r.x1), (r.x0, r.y1, r.x1)]
+                    v_lines += [(r.x0, r.y0, r.y1), (r.x1, r.y0, r.y1)]
+
+    if not h_lines or not v_lines:
+        return []
+
+    # Rasterize the line art into a coarse 1pt grid and reuse the run logic
+    width, height = int(page_width) + 1, int(page_height) + 1
+    h_mask = np.zeros((height, width), dtype=bool)
+    v_mask = np.zeros((height, width), dtype=bool)
+
+    def clip(value, limit):
+        return min(max(int(value), 0), limit - 1)
+
+    for x0, y, x1 in h_lines:
+        if x1 - x0 >= page_width * MIN_LINE_FRACTION:
+            h_mask[clip(y, height), clip(x0, width):clip(x1, width) + 1] = True
+
+    for x, y0, y1 in v_lines:
+        if y1 - y0 >= page_height * MIN_LINE_FRACTION:
+            v_mask[clip(y0, height):clip(y1, height) + 1, clip(x, width)] = True
+
+    scale = dpi / 72
+
+    return _regions_from_masks(h_mask, v_mask, scale, scale)
+
+
+def _keep_beam_tables(pdf_path, page_number, regions, dpi=300):
+    """
+    Drops title blocks and legends when the text layer can tell:
+    keeps regions that contain the word BEAM. Scans keep everything.
+    """
+
+    import fitz  # pymupdf
+
+    with fitz.open(pdf_path) as doc:
+        page = doc[page_number - 1]
+        words = page.get_text("words")
+        rotation = page.rotation_matrix
+
+    scale = dpi / 72
+    anchors = []
+
+    for w in words:
+        if "BEAM" in w[4].upper():
+            center = fitz.Point((w[0] + w[2]) / 2, (w[1] + w[3]) / 2) * rotation
+            anchors.append((center.x * scale, center.y * scale))
+
+    if not anchors:
+        return regions
+
+    kept = [
+        r for r in regions
+        if any(r[0] <= x <= r[2] and r[1] <= y <= r[3] for x, y in anchors)
+    ]
+
+    return kept or regions
+
+
+def _render_dpi(image_path, pdf_path, page_number):
+    """
+    DPI the page image was rendered at, so vector coordinates line up
+    with renders made at a non-default resolution.
+    """
+
+    import fitz  # pymupdf
+    from PIL import Image
+
+    with Image.open(image_path) as img:
+        width = img.width
+
+    with fitz.open(pdf_path) as doc:
+        page_width = doc[page_number - 1].rect.width
+
+    return width / page_width * 72
+
+
+def detect_table_regions(image_path, pdf_path=None):
+    """
+    Raster line density first (bounded cost on any sheet), vector
+    drawings as the fallback for faint rules the raster pass misses.
+    Page number is read from the page_N.png name.
+    """
+
+    match = PAGE_NAME.search(os.path.basename(image_path))
+    page_number = int(match.group(1)) if match else None
+
+    if not pdf_path or not page_number:
+        return find_regions_in_image(image_path)
+
+    dpi = _render_dpi(image_path, pdf_path, page_number)
+
+    # Line detection always runs near 75 dpi, whatever the render DPI
+    regions = find_regions_in_image(
+        image_path, reduce=max(1, round(DETECTION_SCALE * dpi / 300))
+    )
+
+    if not regions:
+        regions = find_regions_in_pdf(pdf_path, page_number, dpi)
+
+    if regions:
+        regions = _keep_beam_tables(pdf_path, page_number, regions, dpi)
+
+    return regions
+
+
+# ==============================
+# HEADER BAND
+# ==============================
+
+def _header_end(lines):
+    """
+    Index of the rule closing the header: the first rule after which
+    row heights settle to the regular data-row height.
+    """
+
+    import numpy as np
+
+    gaps = np.diff(lines)
+    if len(gaps) < 3:
+        return None
+
+    row_height = np.median(gaps)
+    regular = np.abs(gaps - row_height) <= row_height * 0.25
+
+    for i in range(len(gaps) - 1):
+        if regular[i] and regular[i + 1]:
+            return i
+
+    return None
+
+
+def ruled_rows(image_path, region=None, reduce=DETECTION_SCALE):
+    """
+    Row rules of a table image, or of `region` of a page image:
+    [(y, digest)] with y in pixels from the top of the table and digest
+    a hash of the ink of the row above the rule.
+    """
+
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(image_path) as img:
+        crop = img.crop(region) if region else img
+        small = crop.resize(
+            (max(crop.width // reduce, 1), max(crop.height // reduce, 1)),
+            Image.BOX
+        )
+
+    dark = _ink(small)
+    h_mask = _line_mask(dark, max(int(dark.shape[1] * ROW_RULE_FRACTION), 8), axis=1)
+
+    rows = []
+    top = 0
+
+    for a, b in _runs(h_mask.any(axis=1)):
+        digest = hashlib.sha1(np.packbits(dark[top:a]).tobytes()).hexdigest()
+        rows.append(((a + b) / 2 * reduce, digest))
+        top = b
+
+    return rows
+
+
+def _band_from_rules(image_path, region):
+    x0, y0, x1, y1 = region
+
+    lines = [y for y, _ in ruled_rows(image_path, region)]
+
+    if len(lines) < MIN_HEADER_RULES:
+        return region
+
+    end = _header_end(lines)
+
+    if end is None:
+        return (x0, y0, x1, y0 + int((y1 - y0) * HEADER_FALLBACK_FRACTION))
+
+    last = min(end + HEADER_DATA_ROWS, len(lines) - 1)
+    return (x0, y0, x1, min(y0 + int(lines[last]) + CROP_MARGIN, y1))
+
+
+def _band_from_text(pdf_path, page_number, dpi=300):
+    import fitz  # pymupdf
+
+    with fitz.open(pdf_path) as doc:
+        page = doc[page_number - 1]
+        words = page.get_text("words")
+        rotation = page.rotation_matrix
+        width = page.rect.width
+
+    boxes = [
+        fitz.Rect(w[:4]) * rotation
+        for w in words if "BEAM" in w[4].upper()
+    ]
+
+    if not boxes:
+        return None
+
+    scale = dpi / 72
+    line = max(b.height for b in boxes)
+    top = min(b.y0 for b in boxes) - 2 * line
+    bottom = max(b.y1 for b in boxes) + 6 * line
+
+    return (0, int(max(top, 0) * scale), int(width * scale), int(bottom * scale))
+
+
+def find_header_band(image_path, pdf_path=None):
+    """
+    (x0, y0, x1, y1) covering the main table's header and a couple of
+    data rows, from its ruled rows or from the text layer's BEAM words.
+    None when neither is available.
+    """
+
+    regions = detect_table_regions(image_path, pdf_path)
+
+    if regions:
+        # The schedule is the largest table; legends and notes are smaller
+        largest = max(regions, key=lambda r: (r[2] - r[0]) * (r[3] - r[1]))
+        return _band_from_rules(image_path, largest)
+
+    match = PAGE_NAME.search(os.path.basename(image_path))
+
+    if pdf_path and match:
+        page_number = int(match.group(1))
+        return _band_from_text(
+            pdf_path, page_number, _render_dpi(image_path, pdf_path, page_number)
+        )
+
+    return None
+
+
+# ==============================
+# CROPPING
+# ==============================
+
+def is_preview(image_path, pdf_path, dpi):
+    """
+    True when the page image was rendered below `dpi` (band mode, or
+    the memory budget lowered it), so tables must come from the PDF.
+    """
+
+    match = PAGE_NAME.search(os.path.basename(image_path))
+
+    if not (pdf_path and dpi and match):
+        return False
+
+    return _render_dpi(image_path, pdf_path, int(match.group(1))) < dpi * 0.98
+
+
+def _temp_table_path(image_path):
+    return os.path.join(
+        os.path.dirname(image_path), f"temp_table_{uuid.uuid4().hex}.png"
+    )
+
+
+def table_boxes(image_path, pdf_path, dpi):
+    """
+    Table regions of a preview page image, padded and scaled to `dpi`.
+    The whole page when cropping is disabled or no table is found.
+    Returns (page_number, boxes).
+    """
+
+    from PIL import Image
+
+    page_number = int(PAGE_NAME.search(os.path.basename(image_path)).group(1))
+    preview_dpi = _render_dpi(image_path, pdf_path, page_number)
+    scale = dpi / preview_dpi
+
+    with Image.open(image_path) as img:
+        width, height = img.size
+
+    regions = detect_table_regions(image_path, pdf_path) if CROP_TABLES else []
+    margin = CROP_MARGIN / scale
+
+    boxes = [
+        (
+            max(x0 - margin, 0) * scale, max(y0 - margin, 0) * scale,
+            min(x1 + margin, width) * scale, min(y1 + margin, height) * scale
+        )
+        for x0, y0, x1, y1 in regions
+    ] or [(0, 0, width * scale, height * scale)]
+
+    return page_number, boxes
+
+
+def crop_tables(image_path, pdf_path=None, dpi=None):
+    """
+    Returns one temp PNG per detected table, or [image_path] when
+    cropping is disabled or nothing table-like was found.
+    Delete the crops with image_slicer.delete_temp_slices.
+
+    When `image_path` is a preview rendered below `dpi` (band mode or
+    the memory budget), each table is rendered from the PDF at `dpi`.
+    """
+
+    from PIL import Image
+
+    if is_preview(image_path, pdf_path, dpi):
+        from pdf_to_images import render_region
+
+        page_number, boxes = table_boxes(image_path, pdf_path, dpi)
+
+        return [
+            render_region(pdf_path, page_number, box, dpi, _temp_table_path(image_path))
+            for box in boxes
+        ]
+
+    if not CROP_TABLES:
+        return [image_path]
+
+    regions = detect_table_regions(image_path, pdf_path)
+
+    if not regions:
+        return [image_path]
+
+    crop_paths = []
+
+    with Image.open(image_path) as img:
+        width, height = img.size
+
+        for x0, y0, x1, y1 in regions:
+            box = (
+                max(x0 - CROP_MARGIN, 0), max(y0 - CROP_MARGIN, 0),
+                min(x1 + CROP_MARGIN, width), min(y1 + CROP_MARGIN, height)
+            )
+
+            # Next to the page image, so each job's temp files stay in its folder
+            temp_name = _temp_table_path(image_path)
+            img.crop(box).save(temp_name)
+            crop_paths.append(temp_name)
+
+    return crop_paths
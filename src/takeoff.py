@@ -0,0 +1,260 @@
+import os
+import json
+from functools import lru_cache
+
+import numpy as np
+
+from config import OUTPUT_DIR
+from rebar import parse_bar, parse_stirrup, parse_spacing
+
+
+# ==============================
+# CONSTANTS
+# ==============================
+
+# Unit weight of steel bar in kg/m is dia² / 162.2 (dia in mm)
+STEEL_UNIT_WEIGHT_DIVISOR = 162.2
+
+# Stirrups without a written leg count are plain 2-legged ties
+DEFAULT_STIRRUP_LEGS = 2
+
+# Clear cover (mm) deducted from the section for stirrup cut length
+DEFAULT_COVER = 40
+
+# Hook allowance per stirrup, in bar diameters
+STIRRUP_HOOK_D = 20
+
+
+# Specs repeat heavily across beams, parse each string once
+_parse_bar = lru_cache(maxsize=None)(parse_bar)
+_parse_stirrup = lru_cache(maxsize=None)(parse_stirrup)
+_parse_spacing = lru_cache(maxsize=None)(parse_spacing)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+# ==============================
+# BUILD ARRAYS
+# ==============================
+
+def build_arrays(documents):
+    """
+    Flattens {document_name: beams} into parallel NumPy arrays.
+    Missing numbers become NaN so they drop out of totals.
+    """
+
+    names = list(documents)
+
+    beam_doc, beam_ids, width, depth, length = [], [], [], [], []
+    bar_beam, bar_qty, bar_dia = [], [], []
+    stirrup_beam, stirrup_legs, stirrup_dia, stirrup_count = [], [], [], []
+    spacing_beam, spacing_mm = [], []
+
+    index = 0
+
+    for doc_index, name in enumerate(names):
+        for beam in documents[name]:
+            size = beam.get("size") or {}
+            stirrups = beam.get("stirrups") or {}
+
+            beam_doc.append(doc_index)
+            beam_ids.append(beam.get("beam_id"))
+            width.append(_number(size.get("width")))
+            depth.append(_number(size.get("depth")))
+            length.append(_number(size.get("length")))
+
+            for spec in beam.get("reinforcement") or []:
+                qty, dia = _parse_bar(spec)
+                bar_beam.append(index)
+                bar_qty.append(np.nan if qty is None else qty)
+                bar_dia.append(np.nan if dia is None else dia)
+
+            for spec in stirrups.get("dia") or []:
+                legs, dia, count = _parse_stirrup(spec)
+                stirrup_beam.append(index)
+                stirrup_legs.append(DEFAULT_STIRRUP_LEGS if legs is None else legs)
+                stirrup_dia.append(np.nan if dia is None else dia)
+                stirrup_count.append(np.nan if count is None else count)
+
+            for spec in stirrups.get("spacing") or []:
+                mm = _parse_spacing(spec)
+                if mm:
+                    spacing_beam.append(index)
+                    spacing_mm.append(mm)
+
+            index += 1
+
+    return {
+        "documents": names,
+        "beam_ids": beam_ids,
+        "beam_doc": np.array(beam_doc, dtype=np.int64),
+        "width": np.array(width, dtype=float),
+        "depth": np.array(depth, dtype=float),
+        "length": np.array(length, dtype=float),
+        "bar_beam": np.array(bar_beam, dtype=np.int64),
+        "bar_qty": np.array(bar_qty, dtype=float),
+        "bar_dia": np.array(bar_dia, dtype=float),
+        "stirrup_beam": np.array(stirrup_beam, dtype=np.int64),
+        "stirrup_legs": np.array(stirrup_legs, dtype=float),
+        "stirrup_dia": np.array(stirrup_dia, dtype=float),
+        "stirrup_count": np.array(stirrup_count, dtype=float),
+        "spacing_beam": np.array(spacing_beam, dtype=np.int64),
+        "spacing_mm": np.array(spacing_mm, dtype=float),
+    }
+
+
+# ==============================
+# VECTORIZED TAKEOFF
+# ==============================
+
+def _group_sum(keys, values, size):
+    mask = ~np.isnan(values)
+    return np.bincount(keys[mask], weights=values[mask], minlength=size)
+
+
+def compute_takeoff(arrays, anchorage_d=0, cover=DEFAULT_COVER):
+    """
+    Main-bar and stirrup weights (kg) per beam, per document and per
+    diameter in one vectorized pass.
+
+    Main bars run the clear span plus `anchorage_d` bar diameters at
+    each end. Stirrup count comes from the spec when written (47-A13-Y8),
+    otherwise the span is split equally between the listed spacings.
+    Beams without a length contribute nothing and are counted in
+    `missing_length`.
+    """
+
+    n_beams = len(arrays["beam_ids"])
+    n_docs = len(arrays["documents"])
+    length = arrays["length"]
+
+    # ---------- main bars ----------
+    bar_beam = arrays["bar_beam"]
+    bar_dia = arrays["bar_dia"]
+    bar_len_m = (length[bar_beam] + 2 * anchorage_d * bar_dia) / 1000
+    bar_kg = arrays["bar_qty"] * bar_len_m * bar_dia ** 2 / STEEL_UNIT_WEIGHT_DIVISOR
+
+    # ---------- stirrup counts ----------
+    spacing_count = np.bincount(arrays["spacing_beam"], minlength=n_beams)
+    inverse_spacing = np.bincount(
+        arrays["spacing_beam"], weights=1 / arrays["spacing_mm"], minlength=n_beams
+    )
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Equal share of span per spacing → L * mean(1 / s) + 1
+        spaced_count = np.where(
+            spacing_count > 0,
+            np.floor(length * inverse_spacing / spacing_count) + 1,
+            np.nan
+        )
+
+    stirrup_beam = arrays["stirrup_beam"]
+    specs_per_beam = np.bincount(stirrup_beam, minlength=n_beams)
+
+    stirrup_count = np.where(
+        np.isnan(arrays["stirrup_count"]),
+        spaced_count[stirrup_beam] / np.maximum(specs_per_beam[stirrup_beam], 1),
+        arrays["stirrup_count"]
+    )
+
+    # ---------- stirrup cut length ----------
+    stirrup_dia = arrays["stirrup_dia"]
+    inner_width = arrays["width"][stirrup_beam] - 2 * cover
+    inner_depth = arrays["depth"][stirrup_beam] - 2 * cover
+
+    cut_len_m = (
+        2 * inner_width
+        + arrays["stirrup_legs"] * inner_depth
+        + STIRRUP_HOOK_D * stirrup_dia
+    ) / 1000
+
+    stirrup_kg = stirrup_count * cut_len_m * stirrup_dia ** 2 / STEEL_UNIT_WEIGHT_DIVISOR
+
+    # ---------- group totals ----------
+    beam_main = _group_sum(bar_beam, bar_kg, n_beams)
+    beam_stirrup = _group_sum(stirrup_beam, stirrup_kg, n_beams)
+
+    beam_doc = arrays["beam_doc"]
+    doc_main = np.bincount(beam_doc, weights=beam_main, minlength=n_docs)
+    doc_stirrup = np.bincount(beam_doc, weights=beam_stirrup, minlength=n_docs)
+
+    all_dia = np.concatenate([bar_dia, stirrup_dia])
+    all_kg = np.concatenate([bar_kg, stirrup_kg])
+    valid = ~np.isnan(all_dia) & ~np.isnan(all_kg)
+    dia_keys, dia_index = np.unique(all_dia[valid].astype(np.int64), return_inverse=True)
+    dia_kg = np.bincount(dia_index, weights=all_kg[valid], minlength=len(dia_keys))
+
+    return {
+        "beams": [
+            {
+                "document": arrays["documents"][d],
+                "beam_id": beam_id,
+                "main_kg": round(float(m), 2),
+                "stirrup_kg": round(float(s), 2)
+            }
+            for beam_id, d, m, s in zip(arrays["beam_ids"], beam_doc, beam_main, beam_stirrup)
+        ],
+        "documents": {
+            name: {
+                "main_kg": round(float(doc_main[i]), 2),
+                "stirrup_kg": round(float(doc_stirrup[i]), 2),
+                "total_kg": round(float(doc_main[i] + doc_stirrup[i]), 2)
+            }
+            for i, name in enumerate(arrays["documents"])
+        },
+        "by_diameter": {
+            f"T{int(dia)}": round(float(kg), 2)
+            for dia, kg in zip(dia_keys, dia_kg)
+        },
+        "total_kg": round(float(beam_main.sum() + beam_stirrup.sum()), 2),
+        "missing_length": int(np.isnan(length).sum())
+    }
+
+
+# ==============================
+# MAIN ENTRY
+# ==============================
+
+def load_documents(output_dir=OUTPUT_DIR):
+    documents = {}
+
+    for name in sorted(os.listdir(output_dir)):
+        json_path = os.path.join(output_dir, name, f"{name}.json")
+        if os.path.isfile(json_path):
+            with open(json_path, "r", encoding="utf-8") as f:
+                documents[name] = json.load(f).get("beams", [])
+
+    return documents
+
+
+def main():
+    documents = load_documents()
+
+    if not documents:
+        print("⚠ No output JSON files found.")
+        return
+
+    result = compute_takeoff(build_arrays(documents))
+
+    for name, totals in result["documents"].items():
+        print(f"📦 {name}: {totals['total_kg']} kg "
+              f"(main {totals['main_kg']}, stirrups {totals['stirrup_kg']})")
+
+    if result["missing_length"]:
+        print(f"⚠ {result['missing_length']} beams have no length and were not weighed")
+
+    output_file = os.path.join(OUTPUT_DIR, "takeoff.json")
+
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+    print(f"✅ Takeoff saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,22 @@
+import math
 import base64
-from openai import OpenAI
-from config import OPENAI_API_KEY
+import hashlib
+from config import OPENAI_API_KEY, VISION_MODEL, EXTRACTION_BACKEND, PATTERN_BACKENDS
+from rate_limiter import get_limiter, estimate_tokens
+
+# Built on the first request: importing openai costs about a second
+_client = None
+
+
+def get_client():
+    global _client
+
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI(api_key=OPENAI_API_KEY)
+
+    return _client
 
-client = OpenAI(api_key=OPENAI_API_KEY)
 
 def encode_image(image_path):
     with open(image_path, "rb") as img:
@@ -11,8 +25,19 @@ def encode_image(image_path):
 def extract_from_image(image_path, prompt_text):
     base64_image = encode_image(image_path)
 
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
+    # Shared with every other process when API limits are configured
+    limiter = get_limiter()
+    estimated = None
+
+    if limiter:
+        estimated = estimate_tokens(image_path, prompt_text)
+        waited = limiter.acquire(estimated)
+
+        if waited >= 1:
+            print(f"⏳ Rate limit: waited {waited:.1f}s")
+
+    response = get_client().chat.completions.create(
+        model=VISION_MODEL,
         messages=[
             {
                 "role": "user",
@@ -30,4 +55,170 @@ def extract_from_image(image_path, prompt_text):
         temperature=0
     )
 
+    if limiter:
+        usage = getattr(response, "usage", None)
+        limiter.settle(estimated, getattr(usage, "total_tokens", None))
+
     return response.choices[0].message.content
+
+
+def image_digest(image_path):
+    with open(image_path, "rb") as img:
+        return hashlib.sha1(img.read()).hexdigest()
+
+
+def prefetched_extractor(responses):
+    """
+    extract_from_image stand-in that answers from `responses`
+    ({image_digest: model output}) and falls back to a real request.
+    """
+
+    def extract(image_path, prompt_text):
+        cached = responses.pop(image_digest(image_path), None)
+
+        if cached is not None:
+            return cached
+
+        return extract_from_image(image_path, prompt_text)
+
+    return extract
+
+
+# ==============================
+# BACKENDS
+# ==============================
+
+BACKENDS = ("vision", "ocr")
+
+
+# Patterns the OCR backend cannot read: pattern 8 lists beams along
+# columns, not rows
+OCR_UNSUPPORTED = (8,)
+
+
+def vision_configured():
+    """
+    True when some pattern extracts with the vision backend and there is
+    an API key to build the client with.
+    """
+
+    uses_vision = EXTRACTION_BACKEND == "vision" or "vision" in PATTERN_BACKENDS.values()
+
+    return uses_vision and bool(OPENAI_API_KEY)
+
+
+def resolve_backend(pattern_number, backend=None):
+    backend = backend or PATTERN_BACKENDS.get(pattern_number) or EXTRACTION_BACKEND
+
+    if backend == "ocr" and pattern_number in OCR_UNSUPPORTED:
+        print(f"⚠ OCR backend cannot read pattern {pattern_number}, using vision")
+        return "vision"
+
+    return backend
+
+
+def get_extractor(pattern_number, backend=None):
+    """
+    The extract(image_path, prompt_text) → JSON text function for one
+    run of a pattern. `backend` (per run) wins over PATTERN_BACKENDS
+    (per pattern) and EXTRACTION_BACKEND.
+    """
+
+    backend = resolve_backend(pattern_number, backend)
+
+    if backend == "vision":
+        return extract_from_image
+
+    if backend == "ocr":
+        # Pulls in numpy and pytesseract, only when asked for
+        from ocr_extractor import ocr_extractor
+        return ocr_extractor(pattern_number)
+
+    raise Exception(f"Unknown extraction backend '{backend}', expected one of {BACKENDS}")
+
+
+
+# ==============================
+# IMAGE TOKEN COST
+# ==============================
+
+# How each model resizes and bills an image.
+# "patch": 32px patches, capped (image shrunk to fit), times a multiplier
+# "tile": fit max_side, shrink shortest side to short_side, 512px tiles
+MODEL_TILING = {
+    "gpt-4.1-mini": {"kind": "patch", "unit": 32, "max_patches": 1536, "multiplier": 1.62},
+    "gpt-4.1-nano": {"kind": "patch", "unit": 32, "max_patches": 1536, "multiplier": 2.46},
+    "o4-mini": {"kind": "patch", "unit": 32, "max_patches": 1536, "multiplier": 1.72},
+    "gpt-4.1": {"kind": "tile", "unit": 512, "max_side": 2048, "short_side": 768,
+                "base": 85, "per_tile": 170},
+    "gpt-4o": {"kind": "tile", "unit": 512, "max_side": 2048, "short_side": 768,
+               "base": 85, "per_tile": 170},
+    "gpt-4o-mini": {"kind": "tile", "unit": 512, "max_side": 2048, "short_side": 768,
+                    "base": 2833, "per_tile": 5667},
+}
+
+# Models missing from MODEL_TILING are costed as this one
+FALLBACK_TILING_MODEL = "gpt-4o"
+
+_warned_models = set()
+
+
+def tiling_rules(model=VISION_MODEL):
+    """
+    MODEL_TILING entry of `model`, or the fallback's (with a warning,
+    once per model) for models the table doesn't know yet.
+    """
+
+    if model in MODEL_TILING:
+        return MODEL_TILING[model]
+
+    if model not in _warned_models:
+        _warned_models.add(model)
+        print(f"⚠ No image tiling known for {model}, assuming {FALLBACK_TILING_MODEL}'s")
+
+    return MODEL_TILING[FALLBACK_TILING_MODEL]
+
+
+def model_image_size(width, height, model=VISION_MODEL):
+    """
+    Size the model actually looks at after its own resizing.
+    """
+
+    rules = tiling_rules(model)
+
+    if rules["kind"] == "patch":
+        unit = rules["unit"]
+        patches = math.ceil(width / unit) * math.ceil(height / unit)
+
+        if patches <= rules["max_patches"]:
+            return width, height
+
+        # Shrink so the patch grid fits the cap
+        scale = math.sqrt(rules["max_patches"] * unit * unit / (width * height))
+        scale *= min(
+            math.floor(width * scale / unit) / (width * scale / unit),
+            math.floor(height * scale / unit) / (height * scale / unit)
+        )
+        return int(width * scale), int(height * scale)
+
+    scale = min(1, rules["max_side"] / max(width, height))
+    width, height = width * scale, height * scale
+
+    scale = min(1, rules["short_side"] / min(width, height))
+    return int(width * scale), int(height * scale)
+
+
+def image_tokens(width, height, model=VISION_MODEL):
+    """
+    Expected input tokens for one image of the given size.
+    """
+
+    rules = tiling_rules(model)
+    width, height = model_image_size(width, height, model)
+    unit = rules["unit"]
+    units = math.ceil(width / unit) * math.ceil(height / unit)
+
+    if rules["kind"] == "patch":
+        return math.ceil(min(units, rules["max_patches"]) * rules["multiplier"])
+
+    return rules["base"] + rules["per_tile"] * units
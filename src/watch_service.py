@@ -0,0 +1,267 @@
+import os
+import json
+import queue
+import signal
+import importlib
+import threading
+import traceback
+from datetime import datetime
+
+from config import INPUT_DIR, OUTPUT_DIR, WATCH_INTERVAL, WATCH_WORKERS, MAX_ATTEMPTS
+from auto_runner import process_file
+from scheduler import schedule
+
+
+STATUS_FILE = os.path.join(OUTPUT_DIR, "watch_status.json")
+
+# Finished / failed jobs kept in the status file
+HISTORY_SIZE = 50
+
+INPUT_EXTENSIONS = (".pdf", ".dxf")
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+# ==============================
+# WARM UP
+# ==============================
+
+def warm_up():
+    """
+    Imports every pattern module and the libraries they load on first
+    use, and builds the OpenAI client when vision extraction is set up,
+    so the first drawing doesn't pay for them. OCR, DXF and manifest-only
+    setups start without an API key.
+    """
+
+    for pattern_number in range(1, 9):
+        importlib.import_module(f"main_{pattern_number}")
+
+    # Lazy in the pattern modules since the startup budget
+    import fitz
+    import tqdm
+    from PIL import Image
+
+    from vision_extractor import get_client, vision_configured
+
+    if not vision_configured():
+        print("🔥 Pattern modules, PyMuPDF and PIL loaded (no vision client: "
+              "OCR backend or no OPENAI_API_KEY)")
+        return
+
+    get_client()
+
+    print("🔥 Pattern modules, PyMuPDF, PIL and the OpenAI client loaded")
+
+
+# ==============================
+# WATCH SERVICE
+# ==============================
+
+class WatchService:
+    """
+    Polls INPUT_DIR, queues new or changed drawings once their size and
+    mtime are stable across two scans, and runs them on warm worker
+    threads. Progress is mirrored to a status file. A drawing that fails
+    is queued again on later scans, up to MAX_ATTEMPTS times per version.
+    """
+
+    def __init__(self, input_dir=INPUT_DIR, workers=WATCH_WORKERS,
+                 interval=WATCH_INTERVAL, status_file=STATUS_FILE):
+        self.input_dir = input_dir
+        self.workers = workers
+        self.interval = interval
+        self.status_file = status_file
+
+        self.jobs = queue.Queue()
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+
+        self.pending = {}       # name → (mtime, size) seen on the last scan
+        self.queued = []
+        self.in_flight = {}
+        self.history = []
+        self.processed = {}     # name → mtime processed successfully
+        self.failed = {}        # name → {"mtime", "attempts"} of failing versions
+
+        if os.path.isfile(status_file):
+            with open(status_file, "r", encoding="utf-8") as f:
+                status = json.load(f)
+
+            self.processed = status.get("processed", {})
+            self.failed = status.get("failed", {})
+
+    # ---------- status ----------
+
+    def write_status(self):
+        with self.lock:
+            status = {
+                "updated_at": _now(),
+                "running": not self.stop_event.is_set(),
+                "queued": list(self.queued),
+                "in_flight": dict(self.in_flight),
+                "history": self.history[-HISTORY_SIZE:],
+                "processed": self.processed,
+                "failed": self.failed
+            }
+
+            tmp_path = f"{self.status_file}.tmp"
+
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(status, f, indent=2)
+
+            os.replace(tmp_path, self.status_file)
+
+    # ---------- scanning ----------
+
+    def scan(self):
+        ready = {}
+
+        for name in sorted(os.listdir(self.input_dir)):
+            if not name.lower().endswith(INPUT_EXTENSIONS):
+                continue
+
+            stat = os.stat(os.path.join(self.input_dir, name))
+            signature = (stat.st_mtime, stat.st_size)
+
+            if self.processed.get(name) == stat.st_mtime:
+                continue
+
+            # Failed jobs are retried up to MAX_ATTEMPTS per file version
+            failure = self.failed.get(name)
+            if failure and failure["mtime"] == stat.st_mtime and failure["attempts"] >= MAX_ATTEMPTS:
+                continue
+
+            with self.lock:
+                if name in self.queued or name in self.in_flight:
+                    continue
+
+            # Still being copied in → wait for a stable signature
+            if self.pending.get(name) != signature:
+                self.pending[name] = signature
+                continue
+
+            del self.pending[name]
+            ready[os.path.join(self.input_dir, name)] = stat.st_mtime
+
+        # Files that became ready together are queued cheapest first
+        for path in schedule(list(ready)):
+            name = os.path.basename(path)
+
+            with self.lock:
+                self.queued.append(name)
+
+            self.jobs.put((name, ready[path]))
+            print(f"📥 Queued {name}")
+
+        if ready:
+            self.write_status()
+
+    # ---------- workers ----------
+
+    def worker(self):
+        while True:
+            job = self.jobs.get()
+
+            if job is None:
+                return
+
+            name, mtime = job
+            entry = {"file": name, "started_at": _now()}
+
+            with self.lock:
+                # Shutdown may have cleared the list after this job was taken
+                if name in self.queued:
+                    self.queued.remove(name)
+                self.in_flight[name] = entry["started_at"]
+
+            self.write_status()
+
+            try:
+                process_file(
+                    os.path.join(self.input_dir, name),
+                    temp_folder=os.path.join(
+                        OUTPUT_DIR, "temp_detection", os.path.splitext(name)[0]
+                    )
+                )
+                entry["status"] = "done"
+            except Exception as e:
+                traceback.print_exc()
+                entry["status"] = "failed"
+                entry["error"] = str(e)
+
+            entry["finished_at"] = _now()
+
+            with self.lock:
+                del self.in_flight[name]
+                self.history.append(entry)
+
+                if entry["status"] == "done":
+                    self.processed[name] = mtime
+                    self.failed.pop(name, None)
+                else:
+                    failure = self.failed.get(name)
+                    attempts = failure["attempts"] + 1 if failure and failure["mtime"] == mtime else 1
+                    self.failed[name] = {"mtime": mtime, "attempts": attempts}
+
+            self.write_status()
+
+    # ---------- lifecycle ----------
+
+    def stop(self, *args):
+        if not self.stop_event.is_set():
+            print("\n🛑 Stopping: finishing in-flight jobs...")
+            self.stop_event.set()
+
+    def run(self):
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+        warm_up()
+
+        threads = [
+            threading.Thread(target=self.worker, daemon=True)
+            for _ in range(self.workers)
+        ]
+        for t in threads:
+            t.start()
+
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        print(f"👀 Watching {self.input_dir}")
+        self.write_status()
+
+        while not self.stop_event.is_set():
+            self.scan()
+            self.stop_event.wait(self.interval)
+
+        # Queued jobs are dropped (they are picked up again on restart),
+        # in-flight jobs run to completion
+        with self.lock:
+            dropped = len(self.queued)
+
+            while True:
+                try:
+                    self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+
+            self.queued.clear()
+
+        for _ in threads:
+            self.jobs.put(None)
+        for t in threads:
+            t.join()
+
+        self.write_status()
+        print(f"✅ Watch service stopped ({dropped} queued jobs left for next start)")
+
+
+def main():
+    WatchService().run()
+
+
+if __name__ == "__main__":
+    main()
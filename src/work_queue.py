@@ -0,0 +1,377 @@
+import os
+import sys
+import json
+import time
+import uuid
+import shutil
+import socket
+import sqlite3
+import threading
+import traceback
+
+from config import (
+    INPUT_DIR, OUTPUT_DIR, QUEUE_DB_PATH, WORK_DIR, LEASE_SECONDS, MAX_ATTEMPTS, SCHEDULING
+)
+from scheduler import plan
+
+
+# ==============================
+# SCHEMA
+# ==============================
+
+# Jobs are whole documents: patterns 1-4 merge beams across pages, so a
+# document's pages must be extracted by the same worker.
+# cost / priority come from scheduler.plan when the job is (re-)queued;
+# claim hands out higher priorities first, cheapest first within one.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    outputs TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    cost REAL NOT NULL DEFAULT 0,
+    priority INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, lease_expires);
+"""
+
+# Columns added since the first schema, for databases created before them
+ADDED_COLUMNS = {
+    "cost": "REAL NOT NULL DEFAULT 0",
+    "priority": "INTEGER NOT NULL DEFAULT 0",
+}
+
+INPUT_EXTENSIONS = (".pdf", ".dxf")
+
+
+def connect(db_path=QUEUE_DB_PATH):
+    """
+    The database must sit on a filesystem with working file locks;
+    every node opens the same file.
+    """
+
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.executescript(SCHEMA)
+
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+
+    for name, definition in ADDED_COLUMNS.items():
+        if name not in columns:
+            try:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+            except sqlite3.OperationalError:
+                # Another node migrated it first
+                pass
+
+    return conn
+
+
+# ==============================
+# QUEUE OPERATIONS
+# ==============================
+
+def enqueue(conn, input_dir=INPUT_DIR):
+    """
+    Adds new drawings and re-queues changed ones. Returns the count.
+    Only those are planned (scheduler.plan opens each PDF); their cost
+    and priority are stored for claim to order by.
+    """
+
+    added = 0
+    now = time.time()
+
+    known = dict(conn.execute("SELECT path, mtime FROM jobs"))
+    mtimes = {}
+
+    for name in sorted(os.listdir(input_dir)):
+        if name.lower().endswith(INPUT_EXTENSIONS):
+            path = os.path.join(input_dir, name)
+            mtimes[path] = os.path.getmtime(path)
+
+    changed = [path for path, mtime in mtimes.items() if known.get(path) != mtime]
+
+    if not changed:
+        return 0
+
+    # Planned outside the write lock; "name" keeps insertion order
+    if SCHEDULING == "name":
+        jobs = [{"path": path, "cost": 0, "priority": 0} for path in changed]
+    else:
+        jobs = plan(changed)
+
+    conn.execute("BEGIN IMMEDIATE")
+
+    try:
+        for job in jobs:
+            path, mtime = job["path"], mtimes[job["path"]]
+
+            row = conn.execute("SELECT mtime FROM jobs WHERE path = ?", (path,)).fetchone()
+
+            if row is None:
+                conn.execute(
+                    "INSERT INTO jobs (path, mtime, cost, priority, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (path, mtime, job["cost"], job["priority"], now)
+                )
+                added += 1
+            elif row[0] != mtime:
+                conn.execute(
+                    "UPDATE jobs SET mtime = ?, cost = ?, priority = ?, status = 'pending', "
+                    "worker = NULL, lease_expires = NULL, attempts = 0, error = NULL, "
+                    "updated_at = ? WHERE path = ?",
+                    (mtime, job["cost"], job["priority"], now, path)
+                )
+                added += 1
+
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    return added
+
+
+def claim(conn, worker, lease_seconds=LEASE_SECONDS):
+    """
+    Leases the next pending job, or one whose lease has expired:
+    highest priority first, then cheapest, then oldest.
+    Returns (job_id, path) or None when nothing is claimable.
+    """
+
+    now = time.time()
+
+    conn.execute("BEGIN IMMEDIATE")
+
+    try:
+        # Jobs whose worker died with the last attempt are given up on
+        conn.execute(
+            "UPDATE jobs SET status = 'failed', error = 'Lease expired too many times', "
+            "updated_at = ? WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, MAX_ATTEMPTS)
+        )
+
+        row = conn.execute(
+            "SELECT id, path FROM jobs "
+            "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+            "ORDER BY priority DESC, cost, id LIMIT 1",
+            (now,)
+        ).fetchone()
+
+        if row:
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', worker = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker, now + lease_seconds, now, row[0])
+            )
+
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    return row
+
+
+def renew(conn, job_id, worker, lease_seconds=LEASE_SECONDS):
+    """
+    Extends a lease. False when the job was reclaimed by another worker.
+    """
+
+    cursor = conn.execute(
+        "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+        "WHERE id = ? AND worker = ? AND status = 'leased'",
+        (time.time() + lease_seconds, time.time(), job_id, worker)
+    )
+
+    return cursor.rowcount == 1
+
+
+def finish(conn, job_id, worker, outputs=None, error=None):
+    """
+    Marks the job done (or failed, or pending again for a retry).
+    Only the lease holder can finish a job.
+    """
+
+    if error is None:
+        status = "done"
+    else:
+        attempts = conn.execute("SELECT attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        status = "failed" if attempts >= MAX_ATTEMPTS else "pending"
+
+    cursor = conn.execute(
+        "UPDATE jobs SET status = ?, outputs = ?, error = ?, worker = NULL, "
+        "lease_expires = NULL, updated_at = ? WHERE id = ? AND worker = ?",
+        (status, json.dumps(outputs or []), error, time.time(), job_id, worker)
+    )
+
+    return cursor.rowcount == 1
+
+
+def summary(conn):
+    return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+
+# ==============================
+# WORKSPACES
+# ==============================
+
+def commit_outputs(workspace, output_names, output_dir=OUTPUT_DIR):
+    """
+    Moves finished output folders from the job workspace into OUTPUT_DIR.
+    A folder is never visible half-written, but replacing a previous
+    folder of the same name takes two renames: between them the output
+    is briefly missing, so readers should retry rather than assume the
+    job has no result. Revisions are published only once their folder
+    is in place.
+    """
+
+    # numpy / PIL, only once there is something to commit
+    from revisions import publish
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    for name in output_names:
+        target = os.path.join(output_dir, name)
+        old = None
+
+        if os.path.exists(target):
+            old = f"{target}.old-{uuid.uuid4().hex[:8]}"
+            os.rename(target, old)
+
+        try:
+            os.rename(os.path.join(workspace, name), target)
+        except Exception:
+            if old:
+                os.rename(old, target)
+            raise
+
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+
+        publish(name, output_dir)
+
+
+class LeaseKeeper(threading.Thread):
+    """
+    Renews a job's lease in the background while it is being extracted.
+    """
+
+    def __init__(self, job_id, worker, lease_seconds=LEASE_SECONDS):
+        super().__init__(daemon=True)
+        self.job_id = job_id
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.stopped = threading.Event()
+        self.lost = False
+
+    def run(self):
+        conn = connect()
+
+        while not self.stopped.wait(self.lease_seconds / 3):
+            if not renew(conn, self.job_id, self.worker, self.lease_seconds):
+                self.lost = True
+                break
+
+        conn.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def run_worker(worker=None, once=False, poll_seconds=5):
+    """
+    Claims and processes jobs until the queue is empty (`once`) or forever.
+    """
+
+    from auto_runner import process_file
+
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    conn = connect()
+
+    print(f"🚀 Worker {worker} started")
+
+    while True:
+        job = claim(conn, worker)
+
+        if job is None:
+            if once:
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        job_id, path = job
+        workspace = os.path.join(WORK_DIR, f"{job_id}-{worker}")
+        shutil.rmtree(workspace, ignore_errors=True)
+        os.makedirs(workspace)
+
+        keeper = LeaseKeeper(job_id, worker)
+        keeper.start()
+
+        try:
+            output_names = process_file(
+                path,
+                temp_folder=os.path.join(workspace, "temp_detection"),
+                output_dir=workspace
+            )
+        except Exception as e:
+            traceback.print_exc()
+            keeper.stop()
+            finish(conn, job_id, worker, error=str(e))
+            shutil.rmtree(workspace, ignore_errors=True)
+            continue
+
+        keeper.stop()
+
+        # Reclaimed while we worked → the new holder's result wins
+        if keeper.lost or not renew(conn, job_id, worker):
+            print(f"⚠ Lease lost for {os.path.basename(path)}, discarding result")
+        else:
+            commit_outputs(workspace, output_names)
+            finish(conn, job_id, worker, outputs=output_names)
+            print(f"✅ Committed {os.path.basename(path)} → {', '.join(output_names)}")
+
+        shutil.rmtree(workspace, ignore_errors=True)
+
+    conn.close()
+
+
+# ==============================
+# MAIN ENTRY
+# ==============================
+
+def main():
+    """
+    python work_queue.py enqueue    → queue everything in INPUT_DIR
+    python work_queue.py worker     → process jobs until stopped
+    python work_queue.py drain      → process jobs until the queue is empty
+    python work_queue.py status     → job counts per status
+    """
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "drain"
+
+    if command == "enqueue":
+        conn = connect()
+        print(f"📥 Queued {enqueue(conn)} documents")
+    elif command in ("worker", "drain"):
+        conn = connect()
+        enqueue(conn)
+        conn.close()
+        run_worker(once=command == "drain")
+    elif command == "status":
+        print(json.dumps(summary(connect()), indent=2))
+    else:
+        raise Exception(f"Unknown command: {command}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import pytest
+
+ezdxf = pytest.importorskip("ezdxf")
+
+from dxf_extractor import read_entities, split_tables, extract_table
+
+
+HEADER = ["BEAM", "WIDTH", "DEPTH", "TOP REINF", "STIRRUPS"]
+
+
+def _schedule(msp, left, rows):
+    cols = [left + x for x in (0, 100, 200, 300, 500, 700)]
+    ys = [400 - 50 * i for i in range(len(rows) + 2)]
+
+    for y in ys:
+        msp.add_line((cols[0], y), (cols[-1], y))
+    for x in cols:
+        msp.add_line((x, ys[-1]), (x, ys[0]))
+
+    for r, row in enumerate([HEADER] + rows):
+        for c, text in enumerate(row):
+            msp.add_text(text, dxfattribs={"height": 10, "insert": (cols[c] + 5, ys[r] - 25)})
+
+
+def test_side_by_side_schedules_are_read_separately(tmp_path):
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+
+    _schedule(msp, 0, [["B1", "300", "600", "3-T16", "2L-T8@100"],
+                       ["B2", "230", "450", "2-T12", "2L-T8@150"]])
+    _schedule(msp, 900, [["B8", "300", "700", "3-T20", "2L-T10@100"],
+                         ["B9", "300", "700", "3-T20", "2L-T10@100"],
+                         ["B10", "230", "600", "2-T16", "2L-T8@150"]])
+
+    path = str(tmp_path / "two.dxf")
+    doc.saveas(path)
+
+    tables = split_tables(*read_entities(path))
+    assert len(tables) == 2
+
+    sizes = {}
+    for table in tables:
+        beams, header = extract_table(*table)
+        assert header == HEADER
+        sizes.update({b["beam_id"]: (b["size"]["width"], b["size"]["depth"]) for b in beams})
+
+    assert sizes == {"B1": (300, 600), "B2": (230, 450), "B8": (300, 700),
+                     "B9": (300, 700), "B10": (230, 600)}
@@ -0,0 +1,55 @@
+import pytest
+
+from header_cache import HeaderCache, header_signature
+
+
+# Header cells of each pattern, as in Beam Formats.xlsx
+HEADERS = {
+    4: ["S.NO", "BEAM", "ELEVATION", "TYPE", "SIZE", "CLEAR SPAN (L)", "TOP REINFORCEMENT",
+        "BOTTOM REINFORCEMENT", "STIRRUPS", "WIDTH (W)", "DEPTH (D)", "A", "B", "C",
+        "D1(mm)", "G", "E", "D2(mm)"],
+    5: ["S.NO", "BEAM", "ELEVATION", "TYPE", "SIZE", "CLEAR SPAN (L)", "TOP REINF.",
+        "BOTTOM REINF.", "STIRRUPS", "WIDTH (W)", "DEPTH (D)", "A", "B", "S1"],
+    6: ["BEAM NO", "BEAM SIZE", "SPAN", "SIDE FACE REINFORCEMENT ON EACH FACE", "BREADTH",
+        "DEPTH", "BOTTOM REINFORCEMENT", "TOP REINFORCEMENT", "STIRRUPS", "LEFT SUPPORT",
+        "MID SPAN", "RIGHT SUPPORT", "NO OF LEGS", "DIA", "LEFT SUPPORT SPACING",
+        "MID SPACING", "RIGHT SUPPORT SPACING", "B", "D", "LAYER-1", "LAYER-2"],
+}
+HEADERS[7] = HEADERS[6][:2] + ["GRID ID"] + HEADERS[6][2:]
+
+HASH = "00" * 32
+
+
+def _cache(pattern):
+    cache = HeaderCache(path=None)
+    cache.store(HASH, header_signature(HEADERS[pattern]), pattern)
+    return cache
+
+
+def test_signature_keeps_letters_and_labels():
+    words = header_signature(HEADERS[4]).split()
+
+    for token in ("C", "G", "E", "D1", "D2", "MM"):
+        assert token in words
+
+
+@pytest.mark.parametrize("cached, other", [(4, 5), (5, 4), (6, 7), (7, 6)])
+def test_similar_patterns_do_not_cross_hit(cached, other):
+    assert _cache(cached).lookup(HASH, header_signature(HEADERS[other])) is None
+
+
+@pytest.mark.parametrize("pattern", [4, 5, 6, 7])
+def test_same_header_hits(pattern):
+    # Cell order differs between text layers, the signature does not
+    assert _cache(pattern).lookup(HASH, header_signature(reversed(HEADERS[pattern]))) == pattern
+
+
+def test_processes_keep_each_others_entries(tmp_path):
+    path = str(tmp_path / "header_cache.json")
+    first, second = HeaderCache(path=path), HeaderCache(path=path)
+
+    first.store(HASH, header_signature(HEADERS[4]), 4)
+    second.store(HASH, header_signature(HEADERS[6]), 6)
+
+    assert HeaderCache(path=path).lookup(HASH, header_signature(HEADERS[4])) == 4
+    assert first.lookup(HASH, header_signature(HEADERS[6])) == 6
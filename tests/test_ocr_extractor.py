@@ -0,0 +1,71 @@
+from PIL import Image
+
+import ocr_extractor
+from ocr_extractor import column_rules, table_beams
+from vision_extractor import resolve_backend
+
+
+def _cells(*cells, width=100):
+    """
+    (first column, columns spanned, text) → read_rows cells.
+    """
+
+    return [(c * width, (c + span) * width, [text] if text else []) for c, span, text in cells]
+
+
+def _read(monkeypatch, pattern, rows, columns):
+    monkeypatch.setattr(ocr_extractor, "read_rows", lambda img: rows)
+    img = Image.new("RGB", (columns * 100, 100), "white")
+
+    return table_beams(img, column_rules(pattern), {"layout": None})
+
+
+def test_pattern_1_mid_span_bars_and_size(monkeypatch):
+    groups = ["BOTTOM REINFORCEMENT", "TOP REINFORCEMENT", "SHEAR STIRRUPS"]
+    rows = [
+        _cells((0, 1, "BEAM NUMBERS"), (1, 2, "SIZE"),
+               *[(3 + 3 * i, 3, label) for i, label in enumerate(groups)]),
+        _cells((0, 1, ""), (1, 1, "B"), (2, 1, "D"),
+               *[(3 + 3 * i + k, 1, side) for i in range(3)
+                 for k, side in enumerate(["LEFT", "MID SPAN", "RIGHT"])]),
+        _cells(*[(c, 1, text) for c, text in enumerate([
+            "B1", "300", "600", "2-T16", "3-T16", "2-T16", "2-T20", "2-T12", "2-T20",
+            "2L-T8@100", "2L-T8@150", "2L-T8@100"])]),
+    ]
+
+    [beam] = _read(monkeypatch, 1, rows, 12)
+
+    assert beam["size"] == {"width": 300, "depth": 600, "length": None}
+    assert {"3-T16", "2-T12"} <= set(beam["reinforcement"])
+    assert beam["stirrups"] == {"dia": ["2L-T8"], "spacing": ["100 C/C", "150 C/C"]}
+
+
+def test_pattern_6_layers_stirrups_and_side_face(monkeypatch):
+    sides = [(0, 1, "LEFT SUPPORT"), (1, 2, "MID SPAN"), (3, 1, "RIGHT SUPPORT")]
+    rows = [
+        _cells((0, 1, "BEAM NO"), (1, 2, "BEAM SIZE"), (3, 13, "SPAN"),
+               (16, 1, "SIDE FACE REINFORCEMENT ON EACH FACE")),
+        _cells((1, 1, "BREADTH"), (2, 1, "DEPTH"), (3, 4, "BOTTOM REINFORCEMENT"),
+               (7, 4, "TOP REINFORCEMENT"), (11, 5, "STIRRUPS")),
+        _cells(*[(3 + c, s, label) for c, s, label in sides],
+               *[(7 + c, s, label) for c, s, label in sides],
+               (11, 1, "NO OF LEGS"), (12, 1, "DIA"), (13, 1, "LEFT SUPPORT SPACING"),
+               (14, 1, "MID SPACING"), (15, 1, "RIGHT SUPPORT SPACING")),
+        _cells((1, 1, "B"), (2, 1, "D"),
+               *[(c, 1, "LAYER-2" if c in (5, 9) else "LAYER-1") for c in range(3, 11)]),
+        _cells(*[(c, 1, text) for c, text in enumerate([
+            "RB6", "300", "600", "2-T16", "3-T16", "1-T12", "2-T16", "2-T20", "2-T16",
+            "1-T12", "2-T20", "2", "8", "100", "150", "100", "2-T10"])]),
+    ]
+
+    [beam] = _read(monkeypatch, 6, rows, 17)
+
+    assert beam["size"] == {"width": 300, "depth": 600, "length": None}
+    assert {"3-T16", "1-T12", "2-T20"} <= set(beam["reinforcement"])
+    assert "2-T10" not in beam["reinforcement"]
+    assert beam["stirrups"] == {"dia": ["2L-T8"], "spacing": ["100 C/C", "150 C/C"]}
+
+
+def test_pattern_8_falls_back_to_vision():
+    assert resolve_backend(8, "ocr") == "vision"
+    assert resolve_backend(5, "ocr") == "ocr"
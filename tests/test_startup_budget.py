@@ -0,0 +1,28 @@
+from functools import lru_cache
+
+import pytest
+
+from startup_budget import STARTUP_BUDGET_MS, time_import
+
+
+# Wall-clock limits only catch gross regressions (openai or PyMuPDF
+# imported eagerly costs ~1 s); the budgets are for startup_budget.py
+# on a quiet machine
+SLACK = 5
+MIN_LIMIT_MS = 250
+
+
+@lru_cache(maxsize=None)
+def _import(module_name):
+    return time_import(module_name, runs=1)
+
+
+@pytest.mark.parametrize("module_name", sorted(STARTUP_BUDGET_MS))
+def test_entry_point_loads_heavy_modules_lazily(module_name):
+    assert _import(module_name)[1] == []
+
+
+@pytest.mark.parametrize("module_name", sorted(STARTUP_BUDGET_MS))
+def test_entry_point_starts_quickly(module_name):
+    limit = max(STARTUP_BUDGET_MS[module_name] * SLACK, MIN_LIMIT_MS)
+    assert _import(module_name)[0] <= limit